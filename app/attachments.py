@@ -0,0 +1,262 @@
+"""Photos attached to cars, stored by content hash.
+
+Everything lives in a directory next to the store (car.attachments/):
+
+- objects/ab/abcd...jpg: each distinct image once, named by the SHA-256 of
+  its bytes, so attaching the same photo twice or to several cars stores it
+  only once
+- thumbs/ab/abcd...-80.jpg: card-sized thumbnails, generated when a photo is
+  attached
+- index.json: car id -> photo hashes in order, and hash -> extension and size
+
+Thumbnails are served from an in-memory LRU bounded by bytes, backed by the
+thumbs directory, which is bounded too: past its limit the least recently
+used thumbnails are deleted, to be regenerated from the originals when next
+needed. Generating them needs Pillow; without it, small originals double as
+their own thumbnails and larger ones have none.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from .data import FileIO
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: only needed to generate thumbnails
+    Image = None
+
+# Cards show 40 px avatars; thumbnails are twice that for high-density screens
+THUMB_SIZE = 80
+MEMORY_CACHE_BYTES = 8 << 20
+DISK_CACHE_BYTES = 64 << 20
+# Without Pillow, originals up to this size are used as thumbnails
+RAW_THUMB_LIMIT = 256 << 10
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp")
+
+
+class LRUBytesCache:
+    """key -> bytes, dropping the least recently used entries beyond max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, key) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+
+
+class AttachmentStore:
+    def __init__(self, store_path: str, thumb_size: int = THUMB_SIZE,
+                 memory_bytes: int = MEMORY_CACHE_BYTES, disk_bytes: int = DISK_CACHE_BYTES):
+        self.store_path = store_path
+        self.dir = FileIO.store_base(store_path) + ".attachments"
+        self.thumb_size = thumb_size
+        self.disk_bytes = disk_bytes
+        self.memory = LRUBytesCache(memory_bytes)
+        self._index_path = os.path.join(self.dir, "index.json")
+        self._index: Optional[Dict[str, dict]] = None
+        # Bytes in thumbs/, measured on the first thumbnail written
+        self._disk_usage: Optional[int] = None
+        self._lock = threading.RLock()
+
+    def _load(self) -> Dict[str, dict]:
+        if self._index is None:
+            data = FileIO.read_json_dict(self._index_path)
+            self._index = {"cars": data.get("cars", {}), "objects": data.get("objects", {})}
+        return self._index
+
+    def _save(self) -> bool:
+        return FileIO.write_json(self._index_path, self._index, indent=None)
+
+    def object_path(self, digest: str) -> str:
+        ext = self._load()["objects"].get(digest, {}).get("ext", "")
+        return os.path.join(self.dir, "objects", digest[:2], digest + ext)
+
+    def _thumb_path(self, digest: str) -> str:
+        return os.path.join(self.dir, "thumbs", digest[:2], f"{digest}-{self.thumb_size}.jpg")
+
+    def photos(self, car_id: str) -> List[str]:
+        """Hashes of the car's photos, in the order they were attached"""
+        with self._lock:
+            return list(self._load()["cars"].get(car_id, []))
+
+    def add(self, car_id: str, path: str) -> Optional[str]:
+        """Attach the image at path to a car and pre-generate its thumbnail; returns its hash"""
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in IMAGE_EXTENSIONS:
+            print(f"Unsupported image type {ext or '(none)'}: use one of {', '.join(IMAGE_EXTENSIONS)}")
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except (IOError, OSError) as e:
+            print(f"Error reading image: {e}")
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            index = self._load()
+            if digest not in index["objects"]:
+                index["objects"][digest] = {"ext": ext, "size": len(data)}
+                if not FileIO.write_bytes(self.object_path(digest), data):
+                    del index["objects"][digest]
+                    return None
+            photos = index["cars"].setdefault(car_id, [])
+            if digest not in photos:
+                photos.append(digest)
+            if not self._save():
+                return None
+        self.thumbnail(digest)
+        return digest
+
+    def remove(self, car_id: str, digest: Optional[str] = None) -> int:
+        """Detach one photo (or all) from a car; returns how many were detached"""
+        with self._lock:
+            cars = self._load()["cars"]
+            photos = cars.get(car_id, [])
+            detached = [d for d in photos if digest is None or d == digest]
+            if not detached:
+                return 0
+            remaining = [d for d in photos if d not in detached]
+            if remaining:
+                cars[car_id] = remaining
+            else:
+                cars.pop(car_id, None)
+            self._collect(detached)
+            return len(detached) if self._save() else 0
+
+    def prune(self, car_ids: Iterable[str]) -> int:
+        """Detach the photos of cars that no longer exist; returns how many cars were dropped"""
+        keep = set(car_ids)
+        with self._lock:
+            cars = self._load()["cars"]
+            gone = [car_id for car_id in cars if car_id not in keep]
+            if not gone:
+                return 0
+            detached = [d for car_id in gone for d in cars.pop(car_id)]
+            self._collect(detached)
+            return len(gone) if self._save() else 0
+
+    def _collect(self, digests: Iterable[str]) -> None:
+        """Delete the files of photos no car refers to any more"""
+        index = self._load()
+        referenced = {d for photos in index["cars"].values() for d in photos}
+        for digest in set(digests) - referenced:
+            path = self.object_path(digest)
+            index["objects"].pop(digest, None)
+            self.memory.discard(digest)
+            for stale in (path, self._thumb_path(digest)):
+                try:
+                    size = os.path.getsize(stale)
+                    os.remove(stale)
+                    if stale != path and self._disk_usage is not None:
+                        self._disk_usage -= size
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error removing attachment file: {e}")
+
+    def thumbnail(self, digest: str) -> Optional[bytes]:
+        """Card-sized JPEG of a photo from memory, disk or the original, or None if unavailable"""
+        data = self.memory.get(digest)
+        if data is not None:
+            return data
+        path = self._thumb_path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # The modification time orders the disk cache for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            data = self._make_thumbnail(digest)
+        except OSError as e:
+            print(f"Error reading thumbnail: {e}")
+            return None
+        if data is not None:
+            self.memory.put(digest, data)
+        return data
+
+    def _make_thumbnail(self, digest: str) -> Optional[bytes]:
+        source = self.object_path(digest)
+        try:
+            if Image is None:
+                if os.path.getsize(source) > RAW_THUMB_LIMIT:
+                    return None
+                with open(source, "rb") as f:
+                    return f.read()
+            with Image.open(source) as image:
+                image = ImageOps.exif_transpose(image).convert("RGB")
+                thumb = ImageOps.fit(image, (self.thumb_size, self.thumb_size))
+            buffer = io.BytesIO()
+            thumb.save(buffer, "JPEG", quality=85)
+            data = buffer.getvalue()
+        except (OSError, ValueError) as e:
+            print(f"Error making thumbnail: {e}")
+            return None
+        if FileIO.write_bytes(self._thumb_path(digest), data):
+            self._track_disk_usage(len(data))
+        return data
+
+    def _track_disk_usage(self, added: int) -> None:
+        """Count a new thumbnail file and evict the least recently used ones past the limit"""
+        thumbs_dir = os.path.join(self.dir, "thumbs")
+        with self._lock:
+            if self._disk_usage is None:
+                self._disk_usage = sum(entry.stat().st_size for entry in self._thumb_files(thumbs_dir))
+            else:
+                self._disk_usage += added
+            if self._disk_usage <= self.disk_bytes:
+                return
+            # Evict down to 80% so a full cache doesn't evict on every write
+            files = sorted(self._thumb_files(thumbs_dir), key=lambda entry: entry.stat().st_mtime)
+            for entry in files:
+                if self._disk_usage <= self.disk_bytes * 0.8:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    self._disk_usage -= size
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _thumb_files(thumbs_dir: str):
+        try:
+            shards = [entry for entry in os.scandir(thumbs_dir) if entry.is_dir()]
+        except FileNotFoundError:
+            return []
+        return [entry for shard in shards for entry in os.scandir(shard.path)
+                if entry.is_file() and entry.name.endswith(".jpg")]
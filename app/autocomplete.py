@@ -0,0 +1,107 @@
+"""Prefix suggestions for free-text car fields.
+
+Each field keeps a sorted array of distinct normalized values (case and
+whitespace folded) and the number of cars using each one, so a prefix lookup
+is a bisect plus a scan over the matching slice. Suggestions use the most
+common original spelling, which nudges users towards "Aston Martin" rather
+than adding "aston martin" as yet another manufacturer.
+"""
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from .models import Car
+
+SUGGEST_FIELDS = ("model", "manufacturer", "category", "country_of_origin", "replica_model")
+
+# Upper bound on keys ranked per lookup; only very short prefixes over
+# high-cardinality fields (model names) get near it
+MAX_SCAN = 5000
+
+
+def normalize_value(value: str) -> str:
+    return " ".join(str(value).split()).casefold()
+
+
+class PrefixIndex:
+    def __init__(self, values: Iterable[str] = ()):
+        self.keys: List[str] = []
+        self.counts: Dict[str, int] = {}
+        self.spellings: Dict[str, Counter] = {}
+        for value in values:
+            self._count(value)
+        # Bulk load sorts once instead of inserting key by key
+        self.keys = sorted(self.spellings)
+
+    def _count(self, value: str) -> str:
+        """Record one use of value; returns its key if it was not seen before"""
+        key = normalize_value(value)
+        if not key:
+            return ""
+        spellings = self.spellings.get(key)
+        is_new = spellings is None
+        if is_new:
+            spellings = self.spellings[key] = Counter()
+        spellings[" ".join(str(value).split())] += 1
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return key if is_new else ""
+
+    def add(self, value: str) -> None:
+        key = self._count(value)
+        if key:
+            insort(self.keys, key)
+
+    def remove(self, value: str) -> None:
+        key = normalize_value(value)
+        spellings = self.spellings.get(key)
+        if spellings is None:
+            return
+        spelling = " ".join(str(value).split())
+        if spelling not in spellings:
+            return
+        spellings[spelling] -= 1
+        self.counts[key] -= 1
+        if spellings[spelling] <= 0:
+            del spellings[spelling]
+        if not spellings:
+            del self.spellings[key]
+            del self.counts[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[Dict]:
+        """Most used values starting with prefix, as {"value", "count"} dicts"""
+        prefix = normalize_value(prefix)
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", lo=start)
+        candidates = self.keys[start:min(end, start + MAX_SCAN)]
+        results = []
+        for key in heapq.nlargest(limit, candidates, key=self.counts.__getitem__):
+            count = self.counts[key]
+            spelling = self.spellings[key].most_common(1)[0][0]
+            results.append({"value": spelling, "count": count})
+        return results
+
+
+class FieldSuggester:
+    """One PrefixIndex per suggestible field, kept in step with the collection"""
+
+    def __init__(self, cars: Iterable[Car] = ()):
+        cars = list(cars)
+        self.indexes = {
+            field: PrefixIndex(getattr(car, field) for car in cars)
+            for field in SUGGEST_FIELDS
+        }
+
+    def add(self, car: Car) -> None:
+        for field, index in self.indexes.items():
+            index.add(getattr(car, field))
+
+    def remove(self, car: Car) -> None:
+        for field, index in self.indexes.items():
+            index.remove(getattr(car, field))
+
+    def suggest(self, field: str, prefix: str, limit: int = 5) -> List[Dict]:
+        if field not in self.indexes:
+            raise ValueError(f"No suggestions for field: {field}")
+        return self.indexes[field].suggest(prefix, limit)
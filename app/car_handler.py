@@ -1,18 +1,246 @@
 import os
 import json
 import csv
+import hashlib
 import pandas as pd
 import sys
-from .data import FileIO
+import uuid
+from itertools import islice
+from openpyxl import Workbook
+from .data import COMPRESSIONS, FileIO
 from .models import (
     ALLOWED_KEYS,
     Car,
+    _coerce_year,
+    normalize_car_record,
+    validate_car_record,
     to_car_list,
     to_dict_list,
 )
 
+# pyarrow, imported by _pyarrow() on first use: it is optional (only needed for
+# Parquet import/export) and its Parquet module costs memory most sessions never use
+pa = pc = pq = None
+
+IMPORT_EXTENSIONS = ('.json', '.csv', '.xlsx', '.parquet')
+EXPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.xlsx': 'xlsx', '.parquet': 'parquet'}
+# Parquet exports: rows per row group (also the number of records held in memory)
+PARQUET_ROW_GROUP = 65536
+# Columns with few distinct values, stored dictionary-encoded (pandas reads them as categoricals)
+PARQUET_DICTIONARY_COLUMNS = ('manufacturer', 'country_of_origin', 'category', 'replica_model')
+# Records per batch passed from a parsing worker to CarTracker.importMany
+IMPORT_BATCH = 5000
+# The characters str.strip() removes (every c with c.isspace()), so columnar
+# trimming matches normalize_car_record
+_WHITESPACE = ("\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+               "\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000")
+# Previous versions of the store kept as car.json.1 .. car.json.N
+BACKUP_GENERATIONS = 3
+# Layout of the per-source manifests written by importDataIncremental
+MANIFEST_FORMAT = 2
+
+
+def read_json_records(filename):
+    """Read raw records from a JSON file (a list or a single object)"""
+    with open(filename, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [data]
+    return data
+
+
+def read_csv_records(filename):
+    """Read raw records from a CSV file with a header row"""
+    with open(filename, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        return list(reader)
+
+
+def read_excel_records(filename):
+    """Read raw records from the first sheet of an Excel workbook"""
+    # As text, so a year column with gaps isn't read as floats ("1960.0")
+    df = pd.read_excel(filename, engine='openpyxl', dtype=str)
+    df.dropna(how='all', inplace=True)
+    # Empty cells as None rather than NaN, which would be imported as the text "nan"
+    df = df.astype(object).where(df.notna(), None)
+
+    df.columns = [col.lower().replace(' ', '_') for col in df.columns]
+    if df.columns[0].startswith("Unnamed"):
+        df.columns = [f"Column_{i}" for i in range(len(df.columns))]  # Generic column names
+
+    return df.to_dict(orient='records')
+
+
+def _pyarrow():
+    global pa, pc, pq
+    if pq is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise OSError("Parquet files need the pyarrow package (pip install pyarrow)") from None
+    return pa
+
+
+def parquet_schema():
+    """Arrow schema of exported cars: integer year, dictionary-encoded categorical columns"""
+    _pyarrow()
+    fields = []
+    for key in ALLOWED_KEYS:
+        if key == 'year':
+            fields.append(pa.field(key, pa.int16()))
+        elif key in PARQUET_DICTIONARY_COLUMNS:
+            fields.append(pa.field(key, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(key, pa.string()))
+    return pa.schema(fields)
+
+
+def read_parquet_records(filename):
+    """Read raw records from a Parquet file, one row group at a time"""
+    _pyarrow()
+    records = []
+    parquet = pq.ParquetFile(filename)
+    columns = [name for name in parquet.schema_arrow.names if name.lower().replace(' ', '_') in ALLOWED_KEYS]
+    for batch in parquet.iter_batches(columns=columns or None):
+        # Columns to Python values in bulk; normalization turns integer years back into text
+        records.extend(batch.to_pylist())
+    return records
+
+
+def _map_distinct(column, function):
+    """Apply a Python function once per distinct value of a column instead of once per row"""
+    distinct = pc.unique(column)
+    mapped = pa.array([function(value) for value in distinct.to_pylist()], pa.string())
+    return pc.take(mapped, pc.index_in(column, value_set=distinct))
+
+
+def normalize_parquet_batch(batch):
+    """Column-wise normalize_car_record and validate_car_record for a record batch.
+
+    Returns (records, invalid) like a parse_import_batches batch. Text columns are
+    trimmed by Arrow kernels, years and other non-text columns are coerced
+    once per distinct value, missing ids are generated and rows without a
+    model (the only check normalized rows can fail) are dropped.
+    """
+    names = {name.lower().replace(' ', '_'): name for name in batch.schema.names}
+    columns = []
+    for key in ALLOWED_KEYS:
+        if key not in names:
+            columns.append(pa.array([""] * batch.num_rows, pa.string()))
+            continue
+        column = batch.column(names[key])
+        if pa.types.is_dictionary(column.type):
+            column = column.dictionary_decode()
+        if key == 'year':
+            column = _map_distinct(column, _coerce_year)
+        elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            column = pc.utf8_trim(column.cast(pa.string()).fill_null(""), characters=_WHITESPACE)
+        else:
+            column = _map_distinct(column, lambda value: str(value).strip() if value is not None else "")
+        columns.append(column)
+
+    ids = columns[ALLOWED_KEYS.index('id')]
+    missing = pc.equal(ids, "")
+    generated = pc.sum(missing).as_py() or 0
+    if generated:
+        new_ids = pa.array([str(uuid.uuid4()) for _ in range(generated)], pa.string())
+        columns[ALLOWED_KEYS.index('id')] = pc.replace_with_mask(ids, missing, new_ids)
+    table = pa.Table.from_arrays(columns, names=ALLOWED_KEYS)
+    valid = table.filter(pc.not_equal(table.column('model'), ""))
+    return valid.to_pylist(), table.num_rows - valid.num_rows
+
+
+def read_import_records(filename):
+    """Dispatch to the reader matching the file extension"""
+    if filename.endswith('.json'):
+        return read_json_records(filename)
+    elif filename.endswith('.csv'):
+        return read_csv_records(filename)
+    elif filename.endswith('.xlsx'):
+        return read_excel_records(filename)
+    elif filename.endswith('.parquet'):
+        return read_parquet_records(filename)
+    raise ValueError(f"Unsupported file type: {filename}")
+
+
+def _raw_batches(filename, batch_size):
+    """Raw records of an import file in lists of at most batch_size; CSV is read as it goes"""
+    if filename.endswith('.csv'):
+        with open(filename, 'r', newline='') as f:
+            reader = csv.DictReader(f)
+            while True:
+                rows = list(islice(reader, batch_size))
+                if not rows:
+                    return
+                yield rows
+    records = read_import_records(filename)
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+
+def _normalize_batch(raw_records):
+    records, invalid = [], 0
+    for raw in raw_records:
+        try:
+            record = normalize_car_record(raw)
+        except Exception:
+            invalid += 1
+            continue
+        ok, _ = validate_car_record(record)
+        if ok:
+            records.append(record)
+        else:
+            invalid += 1
+    return records, invalid
+
+
+def parse_import_batches(filename, batch_size=None):
+    """Parse and normalize one import file, yielding results of at most batch_size (IMPORT_BATCH) records.
+
+    Runs in a worker process for CarTracker.importMany, so it only touches the
+    source file and yields plain data: {"file", "records", "invalid", "error"}
+    with the normalized records of a batch that passed validation and a count
+    of its rejected rows. An empty file yields one empty result and a file
+    that can't be read ends with an error result.
+    """
+    batch_size = batch_size or IMPORT_BATCH
+    empty = True
+    try:
+        if filename.endswith('.parquet'):
+            # Normalized column-wise, one Arrow batch at a time
+            _pyarrow()
+            batches = (normalize_parquet_batch(batch)
+                       for batch in pq.ParquetFile(filename).iter_batches(batch_size=batch_size))
+        else:
+            batches = (_normalize_batch(raw) for raw in _raw_batches(filename, batch_size))
+        for records, invalid in batches:
+            empty = False
+            yield {"file": filename, "records": records, "invalid": invalid, "error": None}
+    except Exception as e:
+        yield {"file": filename, "records": [], "invalid": 0, "error": str(e) or e.__class__.__name__}
+        return
+    if empty:
+        yield {"file": filename, "records": [], "invalid": 0, "error": None}
+
+
+def stream_import_file(filename, queue):
+    """Worker task for CarTracker.importMany: put each batch of a file on a queue, then None"""
+    for batch in parse_import_batches(filename):
+        queue.put(batch)
+    queue.put(None)
+
+
+def fingerprint_record(record):
+    """Hash the normalized content of a record, ignoring its id"""
+    content = {key: value for key, value in record.items() if key != "id"}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
 class CarFileHandler:
-    def __init__(self, target=None):
+    def __init__(self, target=None, backups=BACKUP_GENERATIONS):
         if target is None:
             # Mobile-friendly path resolution
             if getattr(sys, 'frozen', False):
@@ -27,34 +255,161 @@ class CarFileHandler:
             os.makedirs(data_dir, exist_ok=True)
             target = os.path.join(data_dir, 'car.json')
             
-        self.target = target
+        # car.json may be stored compressed as car.json.gz / car.json.zst
+        self.target = FileIO.find_store(target)
+        self.backups = backups
         # Initialize file if it doesn't exist
         self._ensure_file_exists()
 
     def _ensure_file_exists(self):
-        """Ensure the target file exists and is valid JSON"""
-        try:
-            if not os.path.exists(self.target):
-                os.makedirs(os.path.dirname(self.target), exist_ok=True)
-                with open(self.target, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-            else:
-                # Validate existing file
-                with open(self.target, 'r', encoding='utf-8') as f:
-                    json.load(f)
-        except (json.JSONDecodeError, IOError):
-            # Reset corrupted file
-            with open(self.target, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+        """Ensure the target file exists.
+
+        A damaged file is left alone here: reading it recovers what it can
+        (FileIO.recover_json) instead of resetting it to an empty list.
+        """
+        if os.path.exists(self.target):
+            return
+        if FileIO.backup_paths(self.target):
+            FileIO.recover_json(self.target)
+            return
+        os.makedirs(os.path.dirname(self.target), exist_ok=True)
+        with open(self.target, 'w', encoding='utf-8') as f:
+            json.dump([], f)
 
     def saveTarget(self, data):
         # Convert incoming records to Car objects (normalizes internally)
         cars = to_car_list(data or [])
-        return FileIO.write_json(self.target, to_dict_list(cars))
+        return self.saveCars(cars)
+
+    def saveCars(self, cars):
+        """Write Car objects, which are already normalized, as they are"""
+        return FileIO.write_json(self.target, to_dict_list(cars), backups=self.backups)
 
     def displayData(self):
         return FileIO.read_json(self.target)
 
+    def convertTarget(self, compression):
+        """Rewrite the store with another compression ("gzip", "zstd" or None) and switch to it.
+
+        The store is renamed to match (car.json <-> car.json.gz); the old file
+        and its backups are removed once the new one is written. Returns the
+        new path, or None on failure.
+        """
+        if compression is not None and compression not in COMPRESSIONS:
+            print(f"Unknown compression: {compression} (expected one of {', '.join(COMPRESSIONS)})")
+            return None
+        plain = self.target
+        current = FileIO.compression(plain)
+        if current:
+            plain = plain[:-len(COMPRESSIONS[current])]
+        new_target = plain + COMPRESSIONS[compression] if compression else plain
+        if new_target == self.target:
+            return self.target
+        if not FileIO.write_json(new_target, self.displayData()):
+            return None
+        for path in [self.target] + FileIO.backup_paths(self.target):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.target = new_target
+        return new_target
+
+    def signature(self):
+        return FileIO.signature(self.target)
+
+    def iterData(self):
+        """Stream stored records one at a time without loading the whole file"""
+        if not os.path.exists(self.target):
+            return iter(())
+        return FileIO.iter_json(self.target)
+
+    def _export_atomically(self, path, write_rows):
+        """Run a writer against a temp file and move it into place when done"""
+        temp_path = path + '.tmp'
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            count = write_rows(temp_path)
+            os.replace(temp_path, path)
+            return count
+        except (IOError, OSError, ValueError, TypeError) as e:
+            print(f"Error exporting data: {e}")
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except (IOError, OSError):
+                pass
+            return None
+
+    def exportDataCSV(self, path, records):
+        def write_rows(temp_path):
+            count = 0
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=ALLOWED_KEYS)
+                writer.writeheader()
+                for record in records:
+                    writer.writerow(record)
+                    count += 1
+            return count
+        return self._export_atomically(path, write_rows)
+
+    def exportDataJSONL(self, path, records):
+        def write_rows(temp_path):
+            count = 0
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    f.write('\n')
+                    count += 1
+            return count
+        return self._export_atomically(path, write_rows)
+
+    def exportDataExcel(self, path, records):
+        def write_rows(temp_path):
+            # Write-only mode streams rows to disk instead of keeping cells in memory
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Cars")
+            sheet.append(ALLOWED_KEYS)
+            count = 0
+            for record in records:
+                sheet.append([record.get(key, "") for key in ALLOWED_KEYS])
+                count += 1
+            workbook.save(temp_path)
+            return count
+        return self._export_atomically(path, write_rows)
+
+    def exportDataParquet(self, path, records):
+        """Write records as Parquet in row groups of PARQUET_ROW_GROUP, holding one group at a time.
+
+        year is stored as an integer (years that aren't numbers become null).
+        """
+        records = iter(records)
+
+        def write_rows(temp_path):
+            schema = parquet_schema()
+            count = 0
+            with pq.ParquetWriter(temp_path, schema) as writer:
+                while True:
+                    group = list(islice(records, PARQUET_ROW_GROUP))
+                    if not group:
+                        break
+                    columns = []
+                    for field in schema:
+                        values = [record.get(field.name, "") for record in group]
+                        if field.name == 'year':
+                            values = [int(year) if str(year).isdigit() else None for year in values]
+                            columns.append(pa.array(values, field.type))
+                        elif pa.types.is_dictionary(field.type):
+                            columns.append(pa.array(values, pa.string()).dictionary_encode())
+                        else:
+                            columns.append(pa.array(values, field.type))
+                    writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+                    count += len(group)
+            return count
+        return self._export_atomically(path, write_rows)
+
     def cleanup(self, data):
         cleaned_data = []
         for car in data:
@@ -65,15 +420,11 @@ class CarFileHandler:
         
     def importDataJSON(self, filename):
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
+            data = read_json_records(filename)
         except (FileNotFoundError, json.JSONDecodeError):
             print("Error: Invalid or missing JSON file.")
             return False
 
-        if isinstance(data, dict):
-            data = [data]
-
         current_data = self.displayData()
         current_data.extend(data)
         if self.saveTarget(current_data): 
@@ -83,9 +434,7 @@ class CarFileHandler:
 
     def importDataCSV(self, filename):
         try:
-            with open(filename, 'r') as f:
-                reader = csv.DictReader(f)
-                data = list(reader)
+            data = read_csv_records(filename)
         except FileNotFoundError:
             print("File not found.")
             return False
@@ -100,16 +449,146 @@ class CarFileHandler:
             return True
         return False
 
-    def importDataExcel(self, filename):
+    def _manifest_path(self, filename):
+        """Manifest file remembering the rows last imported from a source"""
+        source = os.path.abspath(filename)
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(os.path.dirname(self.target), 'manifests', f"{digest}.json")
+
+    @staticmethod
+    def _source_row_key(raw, record):
+        """Identity of a source row across imports: its id column if it has one, else its model"""
+        raw_id = next((value for key, value in (raw or {}).items()
+                       if str(key).lower().replace(" ", "_") == "id"), None)
+        raw_id = str(raw_id).strip() if raw_id is not None else ""
+        return f"id:{raw_id}" if raw_id else f"model:{record['model'].lower()}"
+
+    @staticmethod
+    def _read_manifest(manifest_path):
+        """Rows of a saved manifest as key -> {"fingerprint", "id", "created"}"""
+        data = FileIO.read_json_dict(manifest_path)
+        rows = data.get("rows", {})
+        if data.get("format") == MANIFEST_FORMAT:
+            return rows
+        # Older manifests: fingerprints keyed by model, without the cars they created
+        return {f"model:{key}": {"fingerprint": digest, "id": None, "created": False}
+                for key, digest in rows.items() if isinstance(digest, str)}
+
+    def importDataIncremental(self, filename):
+        """Re-import a source file, applying only the rows that changed.
+
+        Each source row is keyed by its id column (or by model name when it
+        has none), fingerprinted after normalization and compared with the
+        manifest saved by the previous import of the same file. New and
+        changed rows update the car with that id or model, or are inserted,
+        and unchanged rows are skipped. A row that disappeared from the source
+        only deletes the car it created. Rows repeating an earlier row's key
+        or model are skipped with a warning. The collection is only rewritten
+        when something actually changed.
+        """
         try:
-            df = pd.read_excel(filename, engine='openpyxl')  
-            df.dropna(how='all', inplace=True)
-            
-            df.columns = [col.lower().replace(' ', '_') for col in df.columns]
-            if df.columns[0].startswith("Unnamed"):
-                df.columns = [f"Column_{i}" for i in range(len(df.columns))]  # Generic column names
+            raw_records = read_import_records(filename)
+        except FileNotFoundError:
+            print("File not found.")
+            return False
+        except Exception as e:
+            print(f"Error reading import file: {e}")
+            return False
 
-            data = df.to_dict(orient='records')
+        rows = {}
+        models = set()
+        duplicates = 0
+        for raw in raw_records:
+            record = normalize_car_record(raw)
+            ok, _ = validate_car_record(record)
+            if not ok:
+                continue
+            key = self._source_row_key(raw, record)
+            model = record["model"].lower()
+            if key in rows or model in models:
+                duplicates += 1
+                continue
+            rows[key] = record
+            models.add(model)
+        if duplicates:
+            print(f"Warning: {duplicates} rows skipped, repeating the id or model of an earlier row.")
+
+        manifest_path = self._manifest_path(filename)
+        previous = self._read_manifest(manifest_path)
+        fingerprints = {key: fingerprint_record(record) for key, record in rows.items()}
+        # One pass over the rows; only the changed ones are looked at again below
+        changed, manifest_rows = [], {}
+        for key, digest in fingerprints.items():
+            if previous.get(key, {}).get("fingerprint") == digest:
+                manifest_rows[key] = previous[key]
+            else:
+                changed.append(key)
+        gone = [key for key in previous if key not in rows]
+        summary = {"inserted": 0, "updated": 0, "removed": 0, "unchanged": len(rows) - len(changed),
+                   "duplicates": duplicates}
+
+        if changed or gone:
+            current_data = self.displayData()
+            by_id, by_model = {}, {}
+            for i, car in enumerate(current_data):
+                by_id.setdefault(str(car.get("id", "")), i)
+                by_model.setdefault(str(car.get("model", "")).strip().lower(), i)
+
+            dirty = False
+            for key in changed:
+                record = rows[key]
+                entry = previous.get(key, {})
+                position = by_id.get(entry.get("id") or "") if entry else None
+                if position is None:
+                    position = by_id.get(key[3:]) if key.startswith("id:") else None
+                if position is None:
+                    position = by_model.get(record["model"].lower())
+                if position is None:
+                    by_model[record["model"].lower()] = by_id[record["id"]] = len(current_data)
+                    current_data.append(record)
+                    manifest_rows[key] = {"fingerprint": fingerprints[key], "id": record["id"], "created": True}
+                    summary["inserted"] += 1
+                    dirty = True
+                    continue
+                existing = current_data[position]
+                # Keep the existing id so references to the car stay valid
+                updated = dict(record, id=existing.get("id") or record["id"])
+                created = bool(entry.get("created")) and entry.get("id") == updated["id"]
+                manifest_rows[key] = {"fingerprint": fingerprints[key], "id": updated["id"], "created": created}
+                if updated == existing:
+                    summary["unchanged"] += 1
+                    continue
+                current_data[position] = updated
+                if updated["model"].lower() != str(existing.get("model", "")).strip().lower():
+                    by_model.pop(str(existing.get("model", "")).strip().lower(), None)
+                    by_model.setdefault(updated["model"].lower(), position)
+                summary["updated"] += 1
+                dirty = True
+
+            # Only cars this source inserted are deleted along with their rows
+            kept = {entry["id"] for entry in manifest_rows.values()}
+            doomed = {previous[key]["id"] for key in gone
+                      if previous[key].get("created") and previous[key].get("id") not in kept}
+            if doomed:
+                before = len(current_data)
+                current_data = [car for car in current_data if str(car.get("id", "")) not in doomed]
+                summary["removed"] = before - len(current_data)
+                dirty = dirty or summary["removed"] > 0
+
+            if dirty and not self.saveTarget(current_data):
+                return False
+
+        manifest = {"format": MANIFEST_FORMAT, "source": os.path.abspath(filename), "rows": manifest_rows}
+        if not FileIO.write_json(manifest_path, manifest):
+            print("Warning: import applied but the manifest could not be saved.")
+
+        print("Incremental import: {inserted} inserted, {updated} updated, "
+              "{removed} removed, {unchanged} unchanged".format(**summary))
+        return summary
+
+    def importDataExcel(self, filename):
+        try:
+            data = read_excel_records(filename)
         except FileNotFoundError:
             print("File not found.")
             return False
@@ -123,3 +602,20 @@ class CarFileHandler:
             print("Data imported successfully from Excel!")
             return True
         return False
+
+    def importDataParquet(self, filename):
+        try:
+            data = read_parquet_records(filename)
+        except FileNotFoundError:
+            print("File not found.")
+            return False
+        except Exception as e:
+            print(f"Error reading Parquet file: {e}")
+            return False
+
+        current_data = self.displayData()
+        current_data.extend(data)
+        if self.saveTarget(current_data):
+            print("Data imported successfully from Parquet!")
+            return True
+        return False
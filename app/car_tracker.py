@@ -1,16 +1,105 @@
+import os
+import glob
+import time
+import asyncio
+import atexit
+import heapq
+import threading
+import weakref
+from collections import Counter
+from itertools import islice
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import Manager
 from app import CarFileHandler
+from .car_handler import EXPORT_FORMATS, IMPORT_EXTENSIONS, parse_import_batches, stream_import_file
+from .query import FACET_FIELDS, compile_query, facet_predicate, normalize_facets, normalize_query
+from .fuzzy import FuzzyIndex
+from .autocomplete import FieldSuggester
+from .fulltext import FullTextIndex
+from .indexes import CarsById, SecondaryIndexes, StorePositions
+from .history import Journal, SnapshotStore, apply_changes
+from .dedup import DEFAULT_THRESHOLD, DuplicateFinder, merge_cluster
+from .attachments import AttachmentStore
+from .query_cache import QueryCache, freeze_rows
+from .records import CarDicts, CarRecords, budget_bytes
+from .reports import REPORTS, CollectionReports
+from .profiling import checkpoint
+from .links import (DEFAULT_CONNECTIONS, DEFAULT_PER_HOST, DEFAULT_RATE, DEFAULT_TIMEOUT, LinkChecker,
+                    LinkStore, is_fresh)
+from .data import FileIO, IndexStore
 from .models import (
+    ALLOWED_KEYS,
     normalize_car_record,
     validate_car_record,
     to_car_list,
-    to_dict_list,
     Car,
+    ChangeEvent,
 )
 
+STATS_FIELDS = ("category", "manufacturer", "country_of_origin")
+# Parsed batches each import worker may queue ahead of the merge (see importMany)
+IMPORT_QUEUE_BATCHES = 4
+
+# Indexes saved next to the store: name -> (sidecar name, class, rebuild in background)
+PERSISTED_INDEXES = {
+    "fulltext": ("fts", FullTextIndex, False),
+    "secondary": ("idx", SecondaryIndexes, True),
+}
+
+
+def diff_cars(before, after):
+    """(added, removed) cars turning before into after, matched by id; changed cars appear in both"""
+    old = {car.id: car for car in before}
+    added, removed = [], []
+    for car in after:
+        previous = old.pop(car.id, None)
+        if previous != car:
+            added.append(car)
+            if previous is not None:
+                removed.append(previous)
+    removed.extend(old.values())
+    return added, removed
+
+
+# Trackers whose changed indexes are written out at exit; weak so that
+# registering doesn't keep every tracker alive
+_open_trackers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_trackers():
+    for tracker in list(_open_trackers):
+        tracker.close()
+
+
 class CarTracker:
-    def __init__(self):
+    def __init__(self, target=None, memory_budget=None):
+        self._target = target
+        # Bytes of decoded cars to keep in memory, or None to keep them all
+        # (see app.records); memory_budget is in MiB and defaults to the
+        # CARDB_MEMORY_BUDGET setting
+        self.memory_budget_bytes = budget_bytes(memory_budget)
+        # Cars as last loaded/saved (a list, or CarRecords under a memory
+        # budget), the store signature they match and a version number
+        # bumped on every change, used to key derived indexes
+        self._cars = None
+        self._store_signature = None
+        self._version = 0
+        # Derived indexes by name, each stored as (version, index)
+        self._indexes = {}
+        self._sidecars = None
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._journal = None
+        self._snapshots = None
+        self._attachments = None
+        # Query and search results by (version, normalized query)
+        self._query_cache = QueryCache()
+        _open_trackers.add(self)
         try:
-            self.fileHandler = CarFileHandler()
+            self.fileHandler = CarFileHandler(target)
         except Exception as e:
             print(f"Error initializing CarTracker: {e}")
             # Try to reinitialize with a fallback path
@@ -20,18 +109,470 @@ class CarTracker:
         """Ensure file handler is available, reinitialize if needed"""
         if self.fileHandler is None:
             try:
-                self.fileHandler = CarFileHandler()
+                self.fileHandler = CarFileHandler(self._target)
             except Exception as e:
                 print(f"Failed to reinitialize file handler: {e}")
                 return False
         return True
 
+    @property
+    def version(self):
+        """Collection version; changes whenever the stored cars change"""
+        if self._ensure_handler():
+            self._current_cars()
+        return self._version
+
+    def _current_cars(self) -> list[Car]:
+        """Cached cars, reloaded only when the store changed on disk"""
+        if self._cars is not None and self.fileHandler.signature() == self._store_signature:
+            return self._cars
+        # Concurrent readers (e.g. the API server's threads) reload only once
+        with self._lock:
+            if self._cars is None or self.fileHandler.signature() != self._store_signature:
+                reloaded = self._store_signature is not None
+                self._reload()
+                if reloaded:
+                    self._notify([ChangeEvent("reloaded", None, self._version)])
+            return self._cars
+
+    def _reload(self):
+        cars = self._open_records()
+        if cars is None:
+            records = self.fileHandler.displayData()
+            cars = to_car_list(records)
+            if any(isinstance(r, dict) and not str(r.get("id", "")).strip() for r in records):
+                # Persist generated ids so they stay stable across loads
+                self.fileHandler.saveCars(cars)
+            # Now that ids are persisted (or a damaged store recovered) it can be read on demand
+            cars = self._open_records() or cars
+        self._cars = cars
+        self._store_signature = self.fileHandler.signature()
+        self._version += 1
+        checkpoint("after load")
+
+    def _open_records(self):
+        """CarRecords over the store under a memory budget, or None to load every car"""
+        if not self.memory_budget_bytes:
+            return None
+        return CarRecords.open(self.fileHandler.target, self.memory_budget_bytes)
+
     def _load_cars(self) -> list[Car]:
-        data = self.fileHandler.displayData()
-        return to_car_list(data)
+        # Copy so callers can modify the list before saving it
+        return self._current_cars().copy()
+
+    def _save_cars(self, cars: list[Car], added=None, removed=None, journal=True) -> bool:
+        """Persist cars and bump the version.
+
+        When the caller knows what changed (added/removed cars), indexes that
+        support add/remove are patched in place instead of being rebuilt, and
+        the change is journaled for undo unless journal is False.
+        """
+        previous_version = self._version
+        if self.memory_budget_bytes and FileIO.compression(self.fileHandler.target) is None:
+            saved = CarRecords.write(self.fileHandler.target, cars, self.memory_budget_bytes,
+                                     self.fileHandler.backups, previous=self._cars)
+            if saved is None:
+                return False
+            self._cars = saved
+        else:
+            if not self.fileHandler.saveCars(cars):
+                return False
+            self._cars = list(cars)
+        self._store_signature = self.fileHandler.signature()
+        self._version += 1
+        if added is None and removed is None:
+            self._notify([ChangeEvent("reloaded", None, self._version)])
+            return True
+        self._after_change(previous_version, added or [], removed or [], journal)
+        return True
+
+    def _after_change(self, previous_version, added, removed, journal=True):
+        self._patch_indexes(previous_version, added, removed)
+        if journal:
+            self._history_journal().record(added, removed)
+        self._notify(self._change_events(added, removed))
+
+    def _history_journal(self):
+        if self._journal is None or not self._journal.path.startswith(FileIO.store_base(self.fileHandler.target)):
+            self._journal = Journal(self.fileHandler.target)
+        return self._journal
+
+    def _snapshot_store(self):
+        if self._snapshots is None or not self._snapshots.dir.startswith(FileIO.store_base(self.fileHandler.target)):
+            self._snapshots = SnapshotStore(self.fileHandler.target)
+        return self._snapshots
+
+    def undo(self):
+        """Revert the most recent change; returns its history entry, or None if there is nothing to undo"""
+        return self._step("undo")
+
+    def redo(self):
+        """Re-apply the most recently undone change; returns its history entry or None"""
+        return self._step("redo")
+
+    def _step(self, op):
+        if not self._ensure_handler():
+            return None
+        try:
+            journal = self._history_journal()
+            stack = journal.undo_stack if op == "undo" else journal.redo_stack
+            if not stack:
+                return None
+            entry = stack[-1]
+            cars, added, removed = apply_changes(self._load_cars(), entry["changes"], reverse=op == "undo")
+            if not self._save_cars(cars, added=added, removed=removed, journal=False):
+                return None
+            journal.mark(op)
+            return {key: entry[key] for key in ("seq", "time", "label")}
+        except Exception as e:
+            print(f"Error during {op}: {e}")
+            return None
+
+    def history(self, limit=20):
+        """Undoable changes, newest first, as {"seq", "time", "label", "changes"} dicts"""
+        if not self._ensure_handler():
+            return []
+        return self._history_journal().entries(limit)
+
+    def snapshot(self, name=""):
+        """Save a point-in-time snapshot (stored as a delta from the previous one); returns its info dict"""
+        if not self._ensure_handler():
+            return None
+        try:
+            return self._snapshot_store().create(self._current_cars(), name)
+        except Exception as e:
+            print(f"Error creating snapshot: {e}")
+            return None
+
+    def snapshots(self):
+        """Saved snapshots, oldest first"""
+        if not self._ensure_handler():
+            return []
+        return self._snapshot_store().list()
+
+    def restoreSnapshot(self, snapshot_id):
+        """Bring the collection back to a snapshot; the restore itself can be undone"""
+        if not self._ensure_handler():
+            return False
+        try:
+            restored = self._snapshot_store().cars(snapshot_id)
+            if restored is None:
+                print(f"Snapshot '{snapshot_id}' not found")
+                return False
+            added, removed = diff_cars(self._current_cars(), restored)
+            if not added and not removed:
+                return True
+            return self._save_cars(restored, added=added, removed=removed)
+        except Exception as e:
+            print(f"Error restoring snapshot: {e}")
+            return False
+
+    def setCompression(self, compression):
+        """Keep the store compressed with "gzip" or "zstd", or as plain JSON (None); returns its new path"""
+        if not self._ensure_handler():
+            return None
+        with self._lock:
+            self._current_cars()
+            path = self.fileHandler.convertTarget(compression)
+            if path is not None:
+                # Same cars, so indexes stay valid; only the file changed
+                self._store_signature = self.fileHandler.signature()
+            return path
+
+    def _change_events(self, added, removed):
+        """Events for a delta; a car removed and added with the same id was updated"""
+        previous = {car.id: car for car in removed}
+        events = []
+        for car in added:
+            old = previous.pop(car.id, None)
+            if old is None:
+                events.append(ChangeEvent("added", car, self._version))
+            else:
+                events.append(ChangeEvent("updated", car, self._version, previous=old))
+        events.extend(ChangeEvent("deleted", car, self._version) for car in previous.values())
+        return events
+
+    def subscribe(self, callback):
+        """Call callback(event) with a ChangeEvent after every change; returns an unsubscribe function.
+
+        Callbacks run synchronously on the thread that made the change, after
+        it has been saved and the indexes patched.
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notify(self, events):
+        for callback in list(self._subscribers):
+            for event in events:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error in change subscriber: {e}")
+
+    def _patch_indexes(self, previous_version, added, removed):
+        for name, (version, index) in list(self._indexes.items()):
+            if version != previous_version or not hasattr(index, "add"):
+                # Rebuilt on next use; dropped now so it doesn't keep the old cars alive until then
+                del self._indexes[name]
+                continue
+            try:
+                for car in removed:
+                    index.remove(car)
+                for car in added:
+                    index.add(car)
+                self._indexes[name] = (self._version, index)
+            except Exception as e:
+                print(f"Rebuilding {name} index: {e}")
+                del self._indexes[name]
+
+    def _index(self, name, build):
+        """Derived index for the current collection version, built on demand"""
+        with self._lock:
+            cars = self._current_cars()
+            entry = self._indexes.get(name)
+            if entry is None or entry[0] != self._version:
+                entry = self._indexes[name] = (self._version, build(cars))
+            return entry[1]
+
+    def _sidecar_store(self):
+        if self._sidecars is None or self._sidecars.store_path != self.fileHandler.target:
+            self._sidecars = IndexStore(self.fileHandler.target)
+        return self._sidecars
+
+    def _persisted_index(self, name):
+        """Index loaded from its sidecar file, rebuilt when missing or stale.
+
+        Stale sidecars of indexes marked for background rebuild are rebuilt on
+        a worker thread; until it finishes this returns None and callers fall
+        back to scanning, so a cold start never waits on the rebuild.
+        """
+        sidecar, index_cls, background = PERSISTED_INDEXES[name]
+
+        def load(cars):
+            sidecars = self._sidecar_store()
+            index = index_cls.from_dict(sidecars.load(sidecar))
+            if index is not None:
+                return index
+            stamp = sidecars.stamp()
+            if not background:
+                return self._rebuild_index(name, cars, stamp)
+            threading.Thread(target=self._rebuild_in_background, args=(name, cars, stamp, self._version),
+                             daemon=True).start()
+            return None
+
+        return self._index(name, load)
+
+    def _rebuild_in_background(self, name, cars, stamp, version):
+        try:
+            self._rebuild_index(name, cars, stamp, version)
+        except Exception as e:
+            print(f"Error rebuilding {name} index: {e}")
+            with self._lock:
+                # Forget the pending (version, None) entry so the next access tries again
+                entry = self._indexes.get(name)
+                if entry is not None and entry[0] == version and entry[1] is None:
+                    del self._indexes[name]
+
+    def _rebuild_index(self, name, cars, stamp, version=None):
+        sidecar, index_cls, _ = PERSISTED_INDEXES[name]
+        index = index_cls.build(cars)
+        with self._lock:
+            if version is not None:
+                if version != self._version:
+                    return None  # collection changed meanwhile; next access starts over
+                self._indexes[name] = (version, index)
+            if stamp == self._sidecar_store().stamp() and self._sidecar_store().save(sidecar, index.to_dict()):
+                index.dirty = False
+        return index
+
+    def close(self):
+        """Write out persisted indexes that changed since they were last saved"""
+        if self.fileHandler is None:
+            return
+        with self._lock:
+            if self.fileHandler.signature() != self._store_signature:
+                # Another process changed the store: these indexes describe the old one
+                return
+            for name, (sidecar, _, _) in PERSISTED_INDEXES.items():
+                entry = self._indexes.get(name)
+                if entry and entry[0] == self._version and entry[1] is not None and entry[1].dirty:
+                    if self._sidecar_store().save(sidecar, entry[1].to_dict()):
+                        entry[1].dirty = False
+
+    def getCar(self, modelName):
+        """Public dict of the car with this model name (case-insensitive), or None"""
+        if not self._ensure_handler():
+            return None
+        try:
+            car = self._find_by_model(modelName)
+            if car is None:
+                return None
+            d = car.to_dict()
+            d.pop('id', None)
+            return d
+        except Exception as e:
+            print(f"Error looking up car: {e}")
+            return None
+
+    def getCarById(self, carId):
+        """Dict of the car with this id (including the id), or None"""
+        if not self._ensure_handler():
+            return None
+        try:
+            car = self._index("ids", CarsById.build).get(str(carId).strip())
+            return car.to_dict() if car is not None else None
+        except Exception as e:
+            print(f"Error looking up car: {e}")
+            return None
+
+    def _find_by_model(self, modelName):
+        key = str(modelName).strip().lower()
+        indexes = self._persisted_index("secondary")
+        if indexes is None:
+            return next((car for car in self._current_cars() if car.model.lower() == key), None)
+        return next(iter(self._select(indexes.ids_for_model(key))), None)
+
+    def _find_all_by_model(self, modelName):
+        key = str(modelName).strip().lower()
+        indexes = self._persisted_index("secondary")
+        if indexes is None:
+            return [car for car in self._current_cars() if car.model.lower() == key]
+        return list(self._select(indexes.ids_for_model(key)))
+
+    def _select(self, car_ids):
+        """Cars with ids found by an index, in store order.
 
-    def _save_cars(self, cars: list[Car]) -> bool:
-        return self.fileHandler.saveTarget(to_dict_list(cars))
+        Index slots follow the order cars were added or last updated in, so
+        they are sorted by store position; results then don't depend on
+        whether an index was used.
+        """
+        cars = self._current_cars()
+        if isinstance(cars, CarRecords):
+            return cars.select(car_ids)
+        car_ids = list(car_ids)
+        if len(car_ids) > 1:
+            positions = self._index("positions", StorePositions.build)
+            car_ids = sorted((car_id for car_id in set(car_ids) if car_id in positions), key=positions.get)
+        by_id = self._index("ids", CarsById.build)
+        return [by_id[car_id] for car_id in car_ids if car_id in by_id]
+
+    def _cached_results(self, key, compute):
+        """Results of compute(), reused for the same key until the collection changes.
+
+        Rows are read-only (FrozenRow) whether they were cached or not, so the
+        same rows can be handed to every caller.
+        """
+        version = self.version
+        results = self._query_cache.get(version, key)
+        if results is None:
+            results = freeze_rows(compute())
+            self._query_cache.put(version, key, results)
+        return results
+
+    def queryCacheStats(self):
+        """Entries, approximate bytes, hits, misses, evictions and hit rate of the query cache"""
+        return self._query_cache.stats()
+
+    def query(self, query=None, limit=None):
+        """Cars matching a query (see app.query) as public dicts, in store order.
+
+        Category, manufacturer and year-range conditions are answered from the
+        secondary indexes when they are loaded; the remaining conditions are
+        checked on the narrowed candidates only. Results are cached per
+        collection version unless the query is a callable.
+        """
+        if not self._ensure_handler():
+            return []
+        predicate = compile_query(query)
+        normalized = normalize_query(query)
+        try:
+            if callable(normalized):
+                return self._query(normalized, predicate, limit)
+            return self._cached_results(("query", normalized, limit),
+                                        lambda: self._query(normalized, predicate, limit))
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error querying cars: {e}")
+            return []
+
+    def _query(self, normalized, predicate, limit):
+        cars = self._current_cars()
+        indexes = self._persisted_index("secondary")
+        candidates = indexes.candidates(normalized) if indexes is not None else None
+        if candidates is not None:
+            cars = self._select(candidates)
+        results = []
+        for car in cars:
+            if predicate is None or predicate(car):
+                d = car.to_dict()
+                d.pop('id', None)
+                results.append(d)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def facetFilter(self, filters, limit=None):
+        """Cars matching exact facet filters (see app.query) as public dicts, in store order"""
+        if not self._ensure_handler():
+            return []
+        filters = normalize_facets(filters)
+        key = ("facets", tuple(sorted((field, tuple(sorted(values))) for field, values in filters.items())), limit)
+        try:
+            return self._cached_results(key, lambda: self._facet_filter(filters, limit))
+        except Exception as e:
+            print(f"Error filtering cars: {e}")
+            return []
+
+    def _facet_filter(self, filters, limit):
+        indexes = self._persisted_index("secondary")
+        if indexes is None:
+            predicate = facet_predicate(filters)
+            cars = (car for car in self._current_cars() if predicate is None or predicate(car))
+        else:
+            cars = self._select(indexes.ids(indexes.facet_bitmap(filters)))
+        results = []
+        for car in islice(cars, limit):
+            d = car.to_dict()
+            d.pop('id', None)
+            results.append(d)
+        return results
+
+    def facetCounts(self, filters=None, fields=None):
+        """Matching total and per-value counts of facet fields for a filter UI.
+
+        Returns {"total": n, field: {value: count}}; each field is counted
+        under the filters on the other fields (see SecondaryIndexes.facet_counts).
+        """
+        filters = normalize_facets(filters)
+        fields = tuple(fields or FACET_FIELDS)
+        unknown = [field for field in fields if field not in FACET_FIELDS]
+        if unknown:
+            raise ValueError(f"Not a facet field: {unknown[0]}")
+        if not self._ensure_handler():
+            return {"total": 0}
+        try:
+            indexes = self._persisted_index("secondary")
+            if indexes is not None:
+                counts = {"total": indexes.facet_bitmap(filters).bit_count()}
+                counts.update(indexes.facet_counts(filters, fields))
+                return counts
+            cars = self._current_cars()
+            predicate = facet_predicate(filters)
+            counts = {"total": sum(1 for car in cars if predicate is None or predicate(car))}
+            for field in fields:
+                others = facet_predicate({f: v for f, v in filters.items() if f != field})
+                counter = Counter(getattr(car, field) for car in cars if others is None or others(car))
+                counts[field] = dict(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+            return counts
+        except Exception as e:
+            print(f"Error counting facets: {e}")
+            return {"total": 0}
 
     def addData(self, modelName, manufacturer, year, originCountry, category, modelManufact, more):
         if not self._ensure_handler():
@@ -52,85 +593,724 @@ class CarTracker:
             if not ok:
                 return False
 
-            cars = self._load_cars()
-            
             # Check for duplicate model names (case-insensitive)
-            for existing_car in cars:
-                if existing_car.model.lower() == carDetails["model"].lower():
-                    print(f"Car with model '{carDetails['model']}' already exists")
-                    return False
+            if self._find_by_model(carDetails["model"]) is not None:
+                print(f"Car with model '{carDetails['model']}' already exists")
+                return False
+
+            cars = self._load_cars()
             
             # Append as object to keep internal consistency
-            cars.append(Car.from_dict(carDetails))
-            return self._save_cars(cars)
+            car = Car.from_dict(carDetails)
+            cars.append(car)
+            return self._save_cars(cars, added=[car])
         except Exception as e:
             print(f"Error adding car data: {e}")
             return False
     
-    def search(self, modelName):
+    def updateData(self, modelName, manufacturer, year, originCountry, category, modelManufact, more):
+        """Replace the details of an existing car in a single save, keeping its id and model name"""
+        if not self._ensure_handler():
+            return False
+
+        try:
+            old = self._find_by_model(modelName)
+            if old is None:
+                print(f"Car with model '{modelName}' not found")
+                return False
+
+            raw = {
+                "id": old.id,
+                "model": old.model,
+                "manufacturer": manufacturer,
+                "year": year,
+                "country_of_origin": originCountry,
+                "category": category,
+                "replica_model": modelManufact,
+                "info": more,
+            }
+            carDetails = normalize_car_record(raw)
+            ok, _ = validate_car_record(carDetails)
+            if not ok:
+                return False
+
+            car = Car.from_dict(carDetails)
+            cars = self._load_cars()
+            cars[cars.index(old)] = car
+            return self._save_cars(cars, added=[car], removed=[old])
+        except Exception as e:
+            print(f"Error updating car data: {e}")
+            return False
+
+    def applyBatch(self, operations):
+        """Apply a sequence of add/delete operations with a single load and save.
+
+        Each operation is a dict with an "op" key ("add" or "delete", default
+        "add") plus car fields; deletes match on model name. Returns one result
+        dict per operation with a status of ok, duplicate, invalid, not_found
+        or error.
+        """
         if not self._ensure_handler():
             return []
-            
+
         try:
-            results = []
             cars = self._load_cars()
-            search_term = str(modelName).lower().strip()
+            by_model = {}
             for car in cars:
-                if search_term in car.model.lower():
-                    d = car.to_dict()
-                    if 'id' in d:
-                        d.pop('id')
-                    results.append(d)
+                by_model.setdefault(car.model.lower(), []).append(car)
+            removed_ids = set()
+            added = []
+            results = []
+            changed = False
+
+            for line, operation in enumerate(operations, start=1):
+                kind = str(operation.get("op", "add")).strip().lower()
+                fields = {key: value for key, value in operation.items() if key != "op"}
+                model = str(fields.get("model", "")).strip()
+                result = {"line": line, "op": kind, "model": model, "status": "ok"}
+
+                if kind == "add":
+                    record = normalize_car_record(fields)
+                    ok, errors = validate_car_record(record)
+                    if not ok:
+                        result.update(status="invalid", error="; ".join(errors))
+                    elif by_model.get(record["model"].lower()):
+                        result["status"] = "duplicate"
+                    else:
+                        car = Car(**record)
+                        cars.append(car)
+                        added.append(car)
+                        by_model[car.model.lower()] = [car]
+                        changed = True
+                elif kind == "delete":
+                    matches = by_model.pop(model.lower(), [])
+                    if matches:
+                        removed_ids.update(car.id for car in matches)
+                        changed = True
+                    else:
+                        result["status"] = "not_found"
+                else:
+                    result.update(status="error", error=f"Unknown operation: {kind}")
+                results.append(result)
+
+            if changed:
+                added_ids = {car.id for car in added}
+                removed = [car for car in cars if car.id in removed_ids and car.id not in added_ids]
+                added = [car for car in added if car.id not in removed_ids]
+                cars = [car for car in cars if car.id not in removed_ids]
+                if not self._save_cars(cars, added=added, removed=removed):
+                    for result in results:
+                        if result["status"] == "ok":
+                            result.update(status="error", error="Failed to save changes")
             return results
+        except Exception as e:
+            print(f"Error applying batch: {e}")
+            return []
+
+    def findDuplicates(self, threshold=DEFAULT_THRESHOLD, policy="most_complete"):
+        """Clusters of likely duplicate cars, largest first (see app.dedup).
+
+        Each cluster is {"size", "similarity", "keep", "cars"}: similarity is
+        the weakest link in the cluster, cars are public dicts in store order
+        and keep is the index of the car mergeDuplicates would keep.
+        """
+        if not self._ensure_handler():
+            return []
+        try:
+            cars = self._current_cars()
+            report = []
+            for members, similarity in DuplicateFinder(cars, threshold).clusters():
+                cluster = [cars[i] for i in members]
+                _, keep = merge_cluster(cluster, policy)
+                public = []
+                for car in cluster:
+                    d = car.to_dict()
+                    d.pop('id', None)
+                    public.append(d)
+                report.append({"size": len(cluster), "similarity": similarity, "keep": keep, "cars": public})
+            report.sort(key=lambda c: (-c["size"], c["similarity"]))
+            return report
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error finding duplicates: {e}")
+            return []
+
+    def mergeDuplicates(self, threshold=DEFAULT_THRESHOLD, policy="most_complete"):
+        """Merge every duplicate cluster into one car with a single save (undoable).
+
+        The kept car is chosen by policy (most_complete, first or last) and
+        its empty fields are filled from the other cars in the cluster.
+        Returns {"clusters": n, "removed": m}, or None if saving failed.
+        """
+        if not self._ensure_handler():
+            return None
+        try:
+            cars = self._load_cars()
+            clusters = DuplicateFinder(cars, threshold).clusters()
+            if not clusters:
+                return {"clusters": 0, "removed": 0}
+            replaced = {}
+            dropped = set()
+            added, removed = [], []
+            for members, _ in clusters:
+                cluster = [cars[i] for i in members]
+                merged, keep = merge_cluster(cluster, policy)
+                replaced[members[keep]] = merged
+                dropped.update(i for i in members if i != members[keep])
+                removed.extend(cluster)
+                added.append(merged)
+            merged_cars = [replaced.get(i, car) for i, car in enumerate(cars) if i not in dropped]
+            if not self._save_cars(merged_cars, added=added, removed=removed):
+                return None
+            return {"clusters": len(clusters), "removed": len(dropped)}
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error merging duplicates: {e}")
+            return None
+
+    def _attachment_store(self):
+        if self._attachments is None or self._attachments.store_path != self.fileHandler.target:
+            self._attachments = AttachmentStore(self.fileHandler.target)
+        return self._attachments
+
+    def addPhoto(self, modelName, path):
+        """Attach an image file to a car (see app.attachments); returns the photo's hash or None"""
+        if not self._ensure_handler():
+            return None
+        try:
+            car = self._find_by_model(modelName)
+            if car is None:
+                print(f"Car '{modelName}' not found")
+                return None
+            return self._attachment_store().add(car.id, path)
+        except Exception as e:
+            print(f"Error adding photo: {e}")
+            return None
+
+    def removePhoto(self, modelName, photo=None):
+        """Detach one photo (by hash) or all photos from a car; returns how many were detached"""
+        if not self._ensure_handler():
+            return 0
+        try:
+            car = self._find_by_model(modelName)
+            return self._attachment_store().remove(car.id, photo) if car is not None else 0
+        except Exception as e:
+            print(f"Error removing photo: {e}")
+            return 0
+
+    def photos(self, modelName):
+        """Hashes of a car's photos, in the order they were attached"""
+        if not self._ensure_handler():
+            return []
+        car = self._find_by_model(modelName)
+        return self._attachment_store().photos(car.id) if car is not None else []
+
+    def thumbnail(self, car_id):
+        """Card-sized JPEG bytes of the car's first photo, or None"""
+        if not self._ensure_handler():
+            return None
+        store = self._attachment_store()
+        photos = store.photos(car_id)
+        return store.thumbnail(photos[0]) if photos else None
+
+    def photoThumbnail(self, photo):
+        """Card-sized JPEG bytes of one photo (by hash), or None"""
+        if not self._ensure_handler():
+            return None
+        return self._attachment_store().thumbnail(photo)
+
+    def prunePhotos(self):
+        """Drop the photos of deleted cars (kept until now so deletes can be undone); returns cars pruned"""
+        if not self._ensure_handler():
+            return 0
+        return self._attachment_store().prune(car.id for car in self._current_cars())
+
+    def checkLinks(self, refresh=False, connections=DEFAULT_CONNECTIONS, per_host=DEFAULT_PER_HOST,
+                   rate=DEFAULT_RATE, timeout=DEFAULT_TIMEOUT, progress=None):
+        """Check every car's info URL concurrently (see app.links).
+
+        Results are kept per car id in car.links.json and reused until their
+        TTL runs out or the URL changes; refresh checks everything again.
+        Returns one row per car with a URL: model, url, state, status,
+        final_url, error, checked (epoch seconds) and cached.
+        """
+        if not self._ensure_handler():
+            return []
+        try:
+            cars = [car for car in self._current_cars() if car.info]
+            links = LinkStore(self.fileHandler.target)
+            saved = links.load()
+            now = time.time()
+            reused = {car.id for car in cars if not refresh and is_fresh(saved.get(car.id), car.info, now)}
+            stale = [car.info for car in cars if car.id not in reused]
+            checked = {}
+            if stale:
+                checker = LinkChecker(connections, per_host, rate, timeout)
+                checked = asyncio.run(checker.check_all(stale, progress))
+            results = {car.id: saved[car.id] if car.id in reused else checked[car.info] for car in cars}
+            if checked:
+                links.save(results)
+            rows = []
+            for car in cars:
+                result = results[car.id]
+                rows.append({"model": car.model, "url": car.info, "state": result["state"],
+                             "status": result["status"], "final_url": result["final_url"],
+                             "error": result["error"], "checked": result["checked"], "cached": car.id in reused})
+            return rows
+        except Exception as e:
+            print(f"Error checking links: {e}")
+            return []
+
+    def stats(self, query=None):
+        """Count cars overall and per category, manufacturer and country"""
+        if query is None:
+            # Whole collection: popcounts over the facet bitmaps
+            counts = self.facetCounts(fields=STATS_FIELDS)
+            stats = {"total": counts["total"]}
+            for field in STATS_FIELDS:
+                counter = Counter()
+                for value, count in counts.get(field, {}).items():
+                    counter[value or "Unknown"] += count
+                stats[field] = dict(counter.most_common())
+            return stats
+        counters = {field: Counter() for field in STATS_FIELDS}
+        total = 0
+        for car in self.iterCars(query):
+            total += 1
+            for field, counter in counters.items():
+                counter[getattr(car, field) or "Unknown"] += 1
+        stats = {"total": total}
+        stats.update({field: dict(counter.most_common()) for field, counter in counters.items()})
+        return stats
+
+    def report(self, name):
+        """Rows of a pivot report (see app.reports.REPORTS), cached until the collection changes"""
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report: {name} (choose from {', '.join(REPORTS)})")
+        if not self._ensure_handler():
+            return []
+        try:
+            return self._index("reports", CollectionReports).report(name)
+        except Exception as e:
+            print(f"Error building report: {e}")
+            return []
+
+    def search(self, modelName, with_ids=False):
+        """Cars whose model name contains modelName (case-insensitive), cached per collection version"""
+        if not self._ensure_handler():
+            return []
+
+        try:
+            search_term = str(modelName).lower().strip()
+            return self._cached_results(("search", search_term, with_ids),
+                                        lambda: self._search(search_term, with_ids))
         except Exception as e:
             print(f"Error searching cars: {e}")
             return []
 
+    def _search(self, search_term, with_ids):
+        cars = self._current_cars()
+        indexes = self._persisted_index("secondary") if isinstance(cars, CarRecords) else None
+        if indexes is not None:
+            # Match the index's model names instead of decoding every car
+            cars = cars.select(car_id for model, ids in indexes.by_model.items() if search_term in model
+                               for car_id in ids)
+        results = []
+        for car in cars:
+            if search_term in car.model.lower():
+                d = car.to_dict()
+                if not with_ids:
+                    d.pop('id', None)
+                results.append(d)
+        return results
+
+    def fuzzySearch(self, query, limit=10):
+        """Ranked, typo-tolerant search over model, manufacturer and replica names.
+
+        Returns up to limit public car dicts, best first, each with a "score"
+        between 0 and 1.
+        """
+        if not self._ensure_handler():
+            return []
+
+        try:
+            return self._cached_results(("fuzzy", " ".join(str(query).lower().split()), limit),
+                                        lambda: self._fuzzy_search(query, limit))
+        except Exception as e:
+            print(f"Error searching cars: {e}")
+            return []
+
+    def _fuzzy_search(self, query, limit):
+        results = []
+        for score, car in self._index("fuzzy", FuzzyIndex).search(query, limit):
+            d = car.to_dict()
+            d.pop('id', None)
+            d['score'] = score
+            results.append(d)
+        return results
+
+    def fullTextSearch(self, query, limit=20):
+        """BM25-ranked search across every field, including the info URL.
+
+        Supports implicit AND, "quoted phrases", OR and -term / NOT term.
+        Returns up to limit public car dicts, best first, each with a "score".
+        """
+        if not self._ensure_handler():
+            return []
+        try:
+            # Operators (OR, NOT) are case-sensitive, so only whitespace is normalized
+            return self._cached_results(("fulltext", " ".join(str(query).split()), limit),
+                                        lambda: self._full_text_search(query, limit))
+        except Exception as e:
+            print(f"Error searching cars: {e}")
+            return []
+
+    def _full_text_search(self, query, limit):
+        index = self._persisted_index("fulltext")
+        by_id = self._index("ids", CarsById.build)
+        results = []
+        for score, car_id in index.search(query, limit):
+            car = by_id.get(car_id)
+            if car is None:
+                continue
+            d = car.to_dict()
+            d.pop('id', None)
+            d['score'] = score
+            results.append(d)
+        return results
+
+    def suggest(self, field, prefix, limit=5):
+        """Autocomplete values for a field, most used first.
+
+        Returns up to limit {"value", "count"} dicts whose value starts with
+        prefix, ignoring case and extra whitespace.
+        """
+        if not self._ensure_handler():
+            return []
+        try:
+            return self._index("suggest", FieldSuggester).suggest(field, prefix, limit)
+        except Exception as e:
+            print(f"Error getting suggestions: {e}")
+            return []
+
     def deleteData(self, modelName):
         if not self._ensure_handler():
             return False
             
         try:
-            cars = self._load_cars()
-            model_to_delete = str(modelName).lower().strip()
-            filtered_cars = [car for car in cars if car.model.lower() != model_to_delete]
-
-            if len(filtered_cars) == len(cars):
+            removed = self._find_all_by_model(modelName)
+            if not removed:
                 return False  # No car found to delete
 
-            return self._save_cars(filtered_cars)
+            cars = self._load_cars()
+            for car in removed:
+                cars.remove(car)
+            return self._save_cars(cars, removed=removed)
         except Exception as e:
             print(f"Error deleting car data: {e}")
             return False
 
-    def importData(self, filename):
+    def importData(self, filename, incremental=False):
         if not self._ensure_handler():
             return False
             
         try:
-            if filename.endswith('.json'):
-                return self.fileHandler.importDataJSON(filename)
+            before = self._current_cars()
+            previous_version = self._version
+            if incremental:
+                if not filename.endswith(IMPORT_EXTENSIONS):
+                    print("Unsupported file type.")
+                    return False
+                result = self.fileHandler.importDataIncremental(filename)
+            elif filename.endswith('.json'):
+                result = self.fileHandler.importDataJSON(filename)
             elif filename.endswith('.csv'):
-                return self.fileHandler.importDataCSV(filename)
+                result = self.fileHandler.importDataCSV(filename)
             elif filename.endswith('.xlsx'):
-                return self.fileHandler.importDataExcel(filename)
+                result = self.fileHandler.importDataExcel(filename)
+            elif filename.endswith('.parquet'):
+                result = self.fileHandler.importDataParquet(filename)
             else:
                 print("Unsupported file type.")
                 return False
+            if self.fileHandler.signature() != self._store_signature:
+                # The handler wrote the store directly: reload, then patch, journal and notify as usual
+                self._reload()
+                self._after_change(previous_version, *diff_cars(before, self._cars))
+            checkpoint("after import")
+            return result
         except Exception as e:
             print(f"Error importing data: {e}")
             return False
     
-    def displayData(self):
+    @staticmethod
+    def _expand_import_paths(paths_or_glob):
+        """Resolve a glob, directory, file name or list of those to import files"""
+        if isinstance(paths_or_glob, str):
+            paths_or_glob = [paths_or_glob]
+
+        files = []
+        for entry in paths_or_glob:
+            if os.path.isdir(entry):
+                candidates = sorted(os.path.join(entry, name) for name in os.listdir(entry))
+            elif glob.has_magic(entry):
+                candidates = sorted(glob.glob(entry))
+            else:
+                candidates = [entry]
+            for path in candidates:
+                if path.lower().endswith(IMPORT_EXTENSIONS) and path not in files:
+                    files.append(path)
+        return files
+
+    def _parse_files(self, files, workers):
+        """Yield parse result batches (see parse_import_batches) in file order.
+
+        Files are parsed in a process pool when it pays off. If the pool can't
+        be started or breaks, whatever wasn't yielded yet is parsed here,
+        skipping the batches of the current file that were.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(files)))
+        current, yielded = 0, 0  # file being yielded and its batches yielded so far
+
+        if workers > 1:
+            pooled = self._pooled_batches(files, workers)
+            try:
+                while True:
+                    try:
+                        index, batch = next(pooled)
+                    except StopIteration:
+                        return
+                    except (OSError, EOFError, NotImplementedError, ImportError, BrokenProcessPool) as e:
+                        # Some mobile/frozen runtimes cannot spawn processes
+                        print(f"Process pool unavailable, importing sequentially: {e}")
+                        break
+                    if index != current:
+                        current, yielded = index, 0
+                    yielded += 1
+                    yield batch
+            finally:
+                pooled.close()
+
+        for index in range(current, len(files)):
+            batches = parse_import_batches(files[index])
+            if index == current:
+                batches = islice(batches, yielded, None)
+            yield from batches
+
+    @staticmethod
+    def _pooled_batches(files, workers):
+        """(file index, batch) from worker processes, in file order.
+
+        Each worker streams its file's batches through its own bounded queue,
+        so only a few batches per worker wait to be merged.
+        """
+        with ProcessPoolExecutor(max_workers=workers) as executor, Manager() as manager:
+            queues = [manager.Queue(IMPORT_QUEUE_BATCHES) for _ in files]
+            futures = [executor.submit(stream_import_file, path, q) for path, q in zip(files, queues)]
+            try:
+                for index, (future, batches) in enumerate(zip(futures, queues)):
+                    while True:
+                        try:
+                            batch = batches.get(timeout=0.1)
+                        except queue.Empty:
+                            if not future.done():
+                                continue
+                            future.result()  # raises if the worker died
+                            batch = batches.get_nowait() if not batches.empty() else None
+                        if batch is None:
+                            break
+                        yield index, batch
+            finally:
+                # Workers still blocked on a full queue fail once the manager stops
+                for future in futures:
+                    future.cancel()
+
+    def importMany(self, paths_or_glob, workers=None):
+        """Import several files at once, parsing them in parallel.
+
+        Files are parsed and normalized in worker processes, which stream
+        batches of records to a single writer here; it skips models already
+        present in the collection (or earlier in the batch) and saves once at
+        the end. A file that fails partway imports nothing. Returns one result
+        dict per file.
+        """
+        if not self._ensure_handler():
+            return []
+
+        files = self._expand_import_paths(paths_or_glob)
+        if not files:
+            print("No importable files found.")
+            return []
+
+        try:
+            cars = self._load_cars()
+            seen_models = {car.model.lower() for car in cars}
+            added = []
+            results = []
+
+            for parsed in self._parse_files(files, workers):
+                if not results or results[-1]["file"] != parsed["file"]:
+                    results.append({"file": parsed["file"], "imported": 0, "duplicates": 0, "invalid": 0,
+                                    "error": None})
+                    # Where this file's cars start, to take them back if it fails later on
+                    start = len(added)
+                result = results[-1]
+                if parsed["error"]:
+                    for car in added[start:]:
+                        seen_models.discard(car.model.lower())
+                    del cars[len(cars) - (len(added) - start):]
+                    del added[start:]
+                    result.update(imported=0, duplicates=0, invalid=0, error=parsed["error"])
+                    continue
+                result["invalid"] += parsed["invalid"]
+                for record in parsed["records"]:
+                    key = record["model"].lower()
+                    if key in seen_models:
+                        result["duplicates"] += 1
+                        continue
+                    seen_models.add(key)
+                    car = Car(**record)
+                    cars.append(car)
+                    added.append(car)
+                    result["imported"] += 1
+
+            if added and not self._save_cars(cars, added=added):
+                for result in results:
+                    result["imported"] = 0
+                    result["error"] = result["error"] or "Failed to save imported data"
+            checkpoint("after import")
+            return results
+        except Exception as e:
+            print(f"Error importing files: {e}")
+            return []
+
+    def iterCars(self, query=None):
+        """Stream Car objects from the store, optionally filtered by a query"""
+        if not self._ensure_handler():
+            return
+        predicate = compile_query(query)
+        for record in self.fileHandler.iterData():
+            try:
+                car = Car.from_dict(record)
+            except Exception:
+                continue
+            if predicate is None or predicate(car):
+                yield car
+
+    def export(self, path, format=None, query=None):
+        """Stream the collection (or the cars matching query) to a file.
+
+        format is 'csv', 'jsonl', 'xlsx' or 'parquet' (needs pyarrow); when
+        omitted it is inferred from the file extension. Records are read,
+        filtered and written one at a time (Parquet buffers one row group).
+        Returns the number of cars written, or None on failure.
+        """
+        if not self._ensure_handler():
+            return None
+
+        if format is None:
+            format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+        writers = {
+            'csv': self.fileHandler.exportDataCSV,
+            'jsonl': self.fileHandler.exportDataJSONL,
+            'xlsx': self.fileHandler.exportDataExcel,
+            'parquet': self.fileHandler.exportDataParquet,
+        }
+        writer = writers.get(str(format).lower())
+        if writer is None:
+            print("Unsupported export format.")
+            return None
+
+        try:
+            records = (car.to_dict() for car in self.iterCars(query))
+            return writer(path, records)
+        except Exception as e:
+            print(f"Error exporting data: {e}")
+            return None
+
+    @staticmethod
+    def _sort_key(field):
+        """Sort key for a Car field; years sort numerically, text case-insensitively"""
+        if field == "year":
+            return lambda car: (0, int(car.year), "") if car.year.isdigit() else (1, 0, car.year.lower())
+        return lambda car: str(getattr(car, field)).lower()
+
+    def displayPage(self, offset=0, limit=50, sort_by=None, descending=False, query=None, cached=False):
+        """Return one page of public car dicts plus the total number of matches.
+
+        Without sorting the page is cut from the record stream as it is read;
+        with sorting only offset + limit cars are kept in a bounded heap, so
+        memory depends on the page position rather than the collection size.
+        With cached=True the page comes from the in-memory collection instead
+        of the store file, for callers that serve many pages (the API server
+        and the interactive CLI).
+        """
+        offset, limit = max(0, int(offset)), max(0, int(limit))
+        total = 0
+
+        def counted(cars):
+            nonlocal total
+            for car in cars:
+                total += 1
+                yield car
+
+        try:
+            if cached and self._ensure_handler():
+                predicate = compile_query(query)
+                if predicate is None and not sort_by:
+                    # Nothing to filter or sort: slice the page, without visiting every car to count them
+                    cars = self._current_cars()
+                    return self._public_rows(cars[offset:offset + limit]), len(cars)
+                cars = counted(car for car in self._current_cars() if predicate is None or predicate(car))
+            else:
+                cars = counted(self.iterCars(query))
+            if sort_by:
+                if sort_by not in ALLOWED_KEYS:
+                    raise ValueError(f"Cannot sort by unknown field: {sort_by}")
+                select = heapq.nlargest if descending else heapq.nsmallest
+                page = select(offset + limit, cars, key=self._sort_key(sort_by))[offset:]
+            else:
+                page = list(islice(cars, offset, offset + limit))
+                for _ in cars:
+                    pass  # finish counting
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error displaying data: {e}")
+            return [], 0
+
+        return self._public_rows(page), total
+
+    @staticmethod
+    def _public_rows(cars):
+        rows = []
+        for car in cars:
+            d = car.to_dict()
+            d.pop('id', None)
+            rows.append(d)
+        return rows
+
+    def displayView(self, with_ids=False):
+        """The dicts displayData returns, as a read-only sequence that makes each one when it is accessed"""
+        if not self._ensure_handler():
+            return []
+        return CarDicts(self._current_cars(), with_ids)
+
+    def displayData(self, with_ids=False):
         if not self._ensure_handler():
             return []
             
         try:
-            # Return dicts for UI compatibility but hide internal id
+            # Return dicts for UI compatibility but hide internal id, unless the
+            # caller needs it to match change events (model names may repeat)
             public = []
             for c in self._load_cars():
                 d = c.to_dict()
-                if 'id' in d:
+                if 'id' in d and not with_ids:
                     d.pop('id')
                 public.append(d)
             return public
@@ -1 +1,2 @@
-from .file_io import FileIO
\ No newline at end of file
+from .file_io import COMPRESSIONS, FSYNC_POLICIES, FileIO
+from .index_store import IndexStore
\ No newline at end of file
@@ -1,53 +1,571 @@
+import atexit
+import glob
+import gzip
+import io
 import json
 import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from json.encoder import encode_basestring as encode_string
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst stores
+    zstandard = None
+
+# How writes reach the disk:
+# - always: fsync every file before it replaces the old one, and its directory after
+# - batched: no fsync per write; files written in the last FSYNC_INTERVAL seconds
+#   are fsynced together on the next write after that, on FileIO.sync() and at exit
+# - never: leave it to the operating system
+FSYNC_POLICIES = ("always", "batched", "never")
+DEFAULT_FSYNC_POLICY = "batched"
+FSYNC_INTERVAL = 1.0
+
+# Stores named car.json.gz / car.json.zst are compressed transparently
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+# Suffixes of temp, backup and quarantined copies, which share their store's compression
+_COPY_SUFFIX_RE = re.compile(r"(\.tmp|\.\d+|\.corrupt-[\d-]+)$")
+# Errors meaning the file's contents are damaged (as opposed to unreadable)
+_DAMAGED_ERRORS = (json.JSONDecodeError, UnicodeDecodeError, EOFError, zlib.error, gzip.BadGzipFile)
+if zstandard is not None:
+    _DAMAGED_ERRORS += (zstandard.ZstdError,)
+
+
+def _fsync_directory(directory):
+    """Persist a rename or file creation (not possible on Windows, where it isn't needed)"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def json_record_encoder(indent):
+    """Function encoding a flat dict of strings the way json.dumps(records, indent=indent) lays it out in a list.
+
+    json.dumps only uses its C encoder without indent, so an indented store
+    (car.json) would otherwise go through the pure-Python encoder. Here the
+    strings are encoded in C and dropped into one layout template per set
+    of keys, which gives byte-identical output about three times faster.
+    Raises TypeError for values that aren't strings.
+    """
+    outer = " " * indent
+    inner = "\n" + outer * 2
+    templates = {}
+
+    def encode(record):
+        keys = tuple(record)
+        template = templates.get(keys)
+        if template is None:
+            fields = (encode_string(key).replace("%", "%%") + ": %s" for key in keys)
+            template = "{" + inner + ("," + inner).join(fields) + "\n" + outer + "}" if keys else "{}"
+            templates[keys] = template
+        # encode_string raises TypeError for anything but a string
+        return template % tuple(map(encode_string, record.values()))
+
+    return encode
+
+
+def _dumps_records(data, indent):
+    """json.dumps(data, indent=indent, ensure_ascii=False) for a list of flat dicts of strings, or None"""
+    if not indent or not isinstance(data, list):
+        return None
+    if not data:
+        return "[]"
+    encode = json_record_encoder(indent)
+    records = []
+    try:
+        for record in data:
+            if type(record) is not dict:
+                return None
+            records.append(encode(record))
+    except TypeError:
+        return None
+    outer = " " * indent
+    return "[\n" + outer + (",\n" + outer).join(records) + "\n]"
+
+
+def _zstandard():
+    if zstandard is None:
+        raise OSError("zstd-compressed stores need the zstandard package (pip install zstandard)")
+    return zstandard
+
 
 class FileIO:
+    fsync_policy = os.environ.get("CARDB_FSYNC", DEFAULT_FSYNC_POLICY)
+    if fsync_policy not in FSYNC_POLICIES:
+        fsync_policy = DEFAULT_FSYNC_POLICY
+    fsync_interval = FSYNC_INTERVAL
+    # Files written under the batched policy and not fsynced yet
+    _unsynced = set()
+    _unsynced_since = None
+    _sync_lock = threading.Lock()
+
+    @classmethod
+    def set_fsync_policy(cls, policy, interval=None):
+        """Switch the fsync policy (always, batched or never) for every file written from now on"""
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {policy} (expected one of {', '.join(FSYNC_POLICIES)})")
+        cls.sync()
+        cls.fsync_policy = policy
+        if interval is not None:
+            cls.fsync_interval = interval
+
+    @classmethod
+    def sync(cls):
+        """fsync the files (and their directories) written since the last batched sync"""
+        with cls._sync_lock:
+            paths, cls._unsynced = cls._unsynced, set()
+            cls._unsynced_since = None
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        for directory in {os.path.dirname(path) for path in paths}:
+            _fsync_directory(directory)
+
+    @classmethod
+    def _written(cls, f, file_path):
+        """Called with a file still open after its data was written to it"""
+        if cls.fsync_policy == "always":
+            f.flush()
+            os.fsync(f.fileno())
+        elif cls.fsync_policy == "batched":
+            with cls._sync_lock:
+                cls._unsynced.add(file_path)
+
+    @classmethod
+    def _committed(cls, file_path, created=True):
+        """Called once a write is visible under its final name"""
+        if cls.fsync_policy == "always":
+            if created:
+                _fsync_directory(os.path.dirname(file_path))
+        elif cls.fsync_policy == "batched":
+            now = time.monotonic()
+            with cls._sync_lock:
+                if cls._unsynced_since is None:
+                    cls._unsynced_since = now
+                due = now - cls._unsynced_since >= cls.fsync_interval
+            if due:
+                cls.sync()
+
+    @staticmethod
+    def compression(file_path):
+        """Compression of a file from its name: "gzip", "zstd" or None"""
+        name = file_path
+        while _COPY_SUFFIX_RE.search(name):
+            name = _COPY_SUFFIX_RE.sub("", name)
+        for compression, suffix in COMPRESSIONS.items():
+            if name.endswith(suffix):
+                return compression
+        return None
+
+    @staticmethod
+    def store_base(file_path):
+        """Path without its compression and JSON extensions (car.json.gz -> car), for naming sidecar files"""
+        for suffix in COMPRESSIONS.values():
+            if file_path.endswith(suffix):
+                file_path = file_path[:-len(suffix)]
+                break
+        return os.path.splitext(file_path)[0]
+
+    @staticmethod
+    def find_store(file_path):
+        """file_path, or a compressed variant of it (car.json.gz, car.json.zst) if only that exists"""
+        if os.path.exists(file_path):
+            return file_path
+        for suffix in COMPRESSIONS.values():
+            if os.path.exists(file_path + suffix):
+                return file_path + suffix
+        return file_path
+
+    @classmethod
+    def open_binary(cls, file_path):
+        """Open a file for reading, decompressing on the fly according to its name"""
+        compression = cls.compression(file_path)
+        if compression == "gzip":
+            return gzip.open(file_path, 'rb')
+        if compression == "zstd":
+            return _zstandard().ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+        return open(file_path, 'rb')
+
+    @classmethod
+    def open_text(cls, file_path):
+        """Open a (possibly compressed) file for reading as UTF-8 text, decoded as it is read"""
+        if cls.compression(file_path) is None:
+            return open(file_path, 'r', encoding='utf-8')
+        return io.TextIOWrapper(cls.open_binary(file_path), encoding='utf-8')
+
+    @classmethod
+    def _encode(cls, file_path, text):
+        data = text.encode('utf-8')
+        compression = cls.compression(file_path)
+        if compression == "gzip":
+            # mtime=0 keeps identical contents byte-identical
+            return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+        if compression == "zstd":
+            return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        return data
+
+    @classmethod
+    def _replace_atomically(cls, file_path, text, backups=0):
+        """Write text (or raw bytes) to a temp file and rename it over file_path, keeping backup generations.
+
+        text may also be an iterable of byte chunks, written as they are
+        produced (and not compressed).
+        """
+        temp_path = file_path + '.tmp'
+        try:
+            data = cls._encode(file_path, text) if isinstance(text, str) else text
+            with open(temp_path, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    f.writelines(data)
+                cls._written(f, file_path)
+            if backups:
+                cls.rotate_backups(file_path, backups)
+            os.replace(temp_path, file_path)
+            cls._committed(file_path)
+        except BaseException:
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except (IOError, OSError):
+                pass
+            raise
+
     @staticmethod
-    def read_json(file_path):
-        """Read JSON data with proper error handling"""
+    def backup_path(file_path, generation):
+        return f"{file_path}.{generation}"
+
+    @staticmethod
+    def backup_paths(file_path):
+        """Existing backup generations of a file, newest first"""
+        found = []
+        for path in glob.glob(glob.escape(file_path) + '.[0-9]*'):
+            suffix = path[len(file_path) + 1:]
+            if suffix.isdigit():
+                found.append((int(suffix), path))
+        return [path for _, path in sorted(found)]
+
+    @classmethod
+    def rotate_backups(cls, file_path, generations):
+        """Shift file.1 .. file.N-1 up one generation and keep the current file as file.1.
+
+        file.1 is a hard link to the current file, so the file is not copied
+        and the link keeps the old contents once the file is replaced.
+        """
+        if not os.path.exists(file_path):
+            return
+        for generation in range(generations, 0, -1):
+            older = cls.backup_path(file_path, generation)
+            if os.path.exists(older):
+                if generation == generations:
+                    os.remove(older)
+                else:
+                    os.replace(older, cls.backup_path(file_path, generation + 1))
+        newest = cls.backup_path(file_path, 1)
+        try:
+            os.link(file_path, newest)
+        except OSError:
+            # Filesystems without hard links (e.g. FAT on some phones)
+            shutil.copy2(file_path, newest)
+
+    @staticmethod
+    def signature(file_path):
+        """Cheap change marker for a file: (mtime in ns, size), or None if missing"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def read_json(cls, file_path):
+        """Read JSON data with proper error handling.
+
+        A damaged file is recovered (see recover_json) rather than reset, and
+        a missing one is restored from its newest backup if there is one.
+        """
         try:
             if not os.path.exists(file_path):
+                if cls.backup_paths(file_path):
+                    return cls.recover_json(file_path)
                 # Create directory if it doesn't exist
                 os.makedirs(os.path.dirname(file_path), exist_ok=True)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     json.dump([], f)
                 return []
             
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with cls.open_text(file_path) as f:
                 data = json.load(f)
                 return data if isinstance(data, list) else []
-        except (json.JSONDecodeError, IOError, OSError) as e:
+        except _DAMAGED_ERRORS as e:
+            print(f"Error reading JSON file: {e}")
+            return cls.recover_json(file_path)
+        except (IOError, OSError) as e:
+            # Not a damaged file, so nothing is rewritten
             print(f"Error reading JSON file: {e}")
-            # Try to recover by creating a new file
-            try:
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-            except (IOError, OSError):
-                pass
             return []
 
+    @classmethod
+    def salvage_json(cls, file_path):
+        """Records that can still be parsed from a damaged JSON array file.
+
+        The file is decoded one record at a time; where a record is cut off or
+        garbled, decoding resumes at the next '{', so a torn write or a bad
+        block only costs the records it touches. A compressed file is
+        decompressed up to the point where it breaks off.
+        """
+        chunks = []
+        try:
+            with cls.open_binary(file_path) as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    chunks.append(chunk)
+        except _DAMAGED_ERRORS + (OSError,):
+            pass
+        text = b''.join(chunks).decode('utf-8', errors='replace')
+        decoder = json.JSONDecoder()
+        records = []
+        pos = text.find('[') + 1
+        while True:
+            pos = text.find('{', pos)
+            if pos < 0:
+                return records
+            try:
+                item, end = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                pos += 1
+                continue
+            if isinstance(item, dict):
+                records.append(item)
+            pos = end
+
+    @classmethod
+    def recover_json(cls, file_path):
+        """Rebuild a damaged or missing JSON array file instead of discarding it.
+
+        Records salvaged from the file are completed with the records of the
+        newest readable backup generation that were not salvaged (matched by
+        id). The damaged file is kept as <file>.corrupt-<timestamp> next to
+        the rebuilt one.
+        """
+        salvaged = cls.salvage_json(file_path) if os.path.exists(file_path) else []
+        backup, backup_name = [], None
+        for path in cls.backup_paths(file_path):
+            try:
+                with cls.open_text(path) as f:
+                    data = json.load(f)
+            except _DAMAGED_ERRORS + (ValueError, OSError):
+                continue
+            if isinstance(data, list):
+                backup, backup_name = data, os.path.basename(path)
+                break
+
+        def key(record):
+            return str(record.get("id") or json.dumps(record, sort_keys=True))
+
+        seen = {key(record) for record in salvaged}
+        restored = [record for record in backup if isinstance(record, dict) and key(record) not in seen]
+        records = salvaged + restored
+        try:
+            if os.path.exists(file_path):
+                os.replace(file_path, f"{file_path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}")
+            cls._replace_atomically(file_path, json.dumps(records, indent=2, ensure_ascii=False))
+        except (IOError, OSError) as e:
+            print(f"Error rewriting recovered JSON file: {e}")
+        source = f" and {len(restored)} from backup {backup_name}" if backup_name else ""
+        print(f"Recovered {len(salvaged)} records from {os.path.basename(file_path)}{source}")
+        return records
+
     @staticmethod
-    def write_json(file_path, data):
-        """Write JSON data with proper error handling"""
+    def checksum(file_path, chunk_size=1 << 20):
+        """CRC32 of a file's contents as hex, or None if it cannot be read"""
+        crc = 0
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    crc = zlib.crc32(chunk, crc)
+        except OSError:
+            return None
+        return format(crc, '08x')
+
+    @classmethod
+    def iter_json(cls, file_path, chunk_size=65536):
+        """Yield the items of a JSON array file one at a time.
+
+        The file is decoded (and decompressed) incrementally in chunks, so
+        memory stays proportional to a single record rather than the whole
+        collection.
+        """
+        decoder = json.JSONDecoder()
+        whitespace = ' \t\r\n,'
+        with cls.open_text(file_path) as f:
+            buf = f.read(chunk_size)
+            eof = not buf
+            pos = len(buf) - len(buf.lstrip())
+            if eof or buf[pos] != '[':
+                return
+            pos += 1
+
+            while True:
+                while pos < len(buf) and buf[pos] in whitespace:
+                    pos += 1
+                if pos >= len(buf):
+                    if eof:
+                        return
+                    buf, pos = buf[pos:] + f.read(chunk_size), 0
+                    eof = pos >= len(buf)
+                    continue
+                if buf[pos] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buf, pos = buf[pos:] + chunk, 0
+                    continue
+                if end == len(buf) and not eof:
+                    # A scalar may continue in the next chunk; re-read it whole
+                    chunk = f.read(chunk_size)
+                    if chunk:
+                        buf, pos = buf[pos:] + chunk, 0
+                        continue
+                    eof = True
+                yield item
+                pos = end
+                if pos > chunk_size:
+                    buf, pos = buf[pos:], 0
+
+    @staticmethod
+    def read_json_dict(file_path):
+        """Read a JSON object from an auxiliary file, returning {} if missing or invalid"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError, OSError) as e:
+            print(f"Error reading JSON file: {e}")
+            return {}
+
+    @staticmethod
+    def read_json_lines(file_path):
+        """Records of a JSON-lines file; a torn last line (from a crash mid-append) is skipped"""
+        records = []
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        print(f"Skipping unreadable line in {file_path}")
+        except FileNotFoundError:
+            pass
+        except (IOError, OSError) as e:
+            print(f"Error reading JSON lines file: {e}")
+        return records
+
+    @classmethod
+    def append_json_lines(cls, file_path, records):
+        """Append records as compact JSON lines in a single write"""
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            text = "".join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + "\n" for r in records)
+            created = not os.path.exists(file_path)
+            with open(file_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+                cls._written(f, file_path)
+            cls._committed(file_path, created)
+            return True
+        except (IOError, OSError, TypeError, ValueError) as e:
+            print(f"Error appending to JSON lines file: {e}")
+            return False
+
+    @classmethod
+    def write_json_lines(cls, file_path, records):
+        """Replace a JSON-lines file atomically (temp file + rename)"""
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            text = "".join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + "\n" for r in records)
+            cls._replace_atomically(file_path, text)
+            return True
+        except (IOError, OSError, TypeError, ValueError) as e:
+            print(f"Error writing JSON lines file: {e}")
+            return False
+
+    @classmethod
+    def write_bytes(cls, file_path, data):
+        """Replace a binary file atomically (temp file + rename)"""
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            cls._replace_atomically(file_path, bytes(data))
+            return True
+        except (IOError, OSError) as e:
+            print(f"Error writing file: {e}")
+            return False
+
+    @classmethod
+    def write_chunks(cls, file_path, chunks, backups=0):
+        """Replace a plain (uncompressed) file atomically with byte chunks, written as they are produced"""
+        try:
+            if cls.compression(file_path) is not None:
+                raise ValueError(f"{os.path.basename(file_path)} is compressed; chunks are written as they are")
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            cls._replace_atomically(file_path, chunks, backups)
+            return True
+        except (IOError, OSError, TypeError, ValueError) as e:
+            print(f"Error writing file: {e}")
+            return False
+
+    @classmethod
+    def write_json(cls, file_path, data, indent=2, backups=0):
+        """Write JSON data with proper error handling (indent=None writes compact JSON).
+
+        The file is replaced atomically; with backups=N the replaced contents
+        are kept as file.1 .. file.N (newest first).
+        """
         try:
             # Ensure directory exists
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            # Write to temporary file first for safety
-            temp_path = file_path + '.tmp'
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            # Atomically replace the original file
-            os.replace(temp_path, file_path)
+            text = _dumps_records(data, indent)
+            if text is None:
+                separators = None if indent is not None else (',', ':')
+                # dumps + one write is much faster than json.dump's chunked writes
+                text = json.dumps(data, indent=indent, ensure_ascii=False, separators=separators)
+            cls._replace_atomically(file_path, text, backups)
             return True
         except (IOError, OSError, TypeError, ValueError) as e:
             print(f"Error writing JSON file: {e}")
-            # Clean up temp file if it exists
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except (IOError, OSError):
-                pass
-            return False
\ No newline at end of file
+            return False
+
+
+atexit.register(FileIO.sync)
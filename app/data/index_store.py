@@ -0,0 +1,38 @@
+from .file_io import FileIO
+
+
+class IndexStore:
+    """Sidecar files holding persisted indexes for a JSON store.
+
+    Each index is written next to the store (car.json -> car.<name>.json)
+    through FileIO.write_json, so a crash mid-write leaves the previous file
+    intact. Files are stamped with the store's signature and checksum and are
+    only accepted while both still match.
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self._stamp_cache = None
+
+    def path(self, name):
+        return f"{FileIO.store_base(self.store_path)}.{name}.json"
+
+    def stamp(self):
+        """Signature and checksum of the store, recomputed only when it changes"""
+        signature = FileIO.signature(self.store_path)
+        if self._stamp_cache is None or self._stamp_cache["signature"] != list(signature or []):
+            self._stamp_cache = {
+                "signature": list(signature or []),
+                "checksum": FileIO.checksum(self.store_path),
+            }
+        return self._stamp_cache
+
+    def load(self, name):
+        """Saved payload of an index, or None if missing, corrupt or stale"""
+        data = FileIO.read_json_dict(self.path(name))
+        if not data or data.get("store") != self.stamp():
+            return None
+        return data.get("index")
+
+    def save(self, name, payload):
+        return FileIO.write_json(self.path(name), {"store": self.stamp(), "index": payload}, indent=None)
@@ -0,0 +1,218 @@
+"""Near-duplicate detection for merged feeds ("Ford Mustang GT 1967" vs "Mustang GT '67").
+
+Each car is reduced to a blocking key and a set of shingles:
+
+- blocking key: normalized manufacturer and year. Either one is taken from
+  the model name when the field is empty ("Ford Mustang" -> Ford, "'67" ->
+  1967); a car whose manufacturer is still unknown can match any
+  manufacturer of the same year.
+- shingles: character 3-grams of the model tokens, minus the words that
+  repeat the manufacturer or year, so word order doesn't matter and small
+  spelling differences only cost a few shingles.
+
+Candidates come from MinHash/LSH: a 64-value signature per car is cut into
+16 bands of 4, and cars of the same year that share a band and whose
+manufacturers don't conflict are candidates. Each distinct shingle is hashed
+once, and signatures are computed with numpy (pandas' own dependency) a
+batch of cars at a time, so the whole pass stays close to linear.
+Candidates are verified with the exact Jaccard similarity and grouped into
+clusters with union-find.
+"""
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .models import ALLOWED_KEYS, Car
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+DEFAULT_THRESHOLD = 0.6
+# Buckets bigger than this are linked to their first member only instead of pairwise
+MAX_PAIRWISE_BUCKET = 20
+MERGE_POLICIES = ("most_complete", "first", "last")
+# Cars per numpy batch when computing signatures (bounds the temporary arrays)
+SIGNATURE_BATCH = 5000
+
+# Multiply-shift hash family: h(x) = ((a * x + b) mod 2**64) >> 32 with odd a
+_rng = np.random.default_rng(1967)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_HASHES, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, NUM_HASHES, dtype=np.uint64)
+_MERGE_FIELDS = [key for key in ALLOWED_KEYS if key not in ("id", "model")]
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(str(text).casefold())
+
+
+def _year_of(token: str) -> Optional[int]:
+    if len(token) == 4 and token.isdigit() and 1885 <= int(token) <= 2100:
+        return int(token)
+    return None
+
+
+class _Profile:
+    __slots__ = ("block", "shingles", "numbers")
+
+    def __init__(self, block, shingles, numbers):
+        self.block = block
+        self.shingles = shingles
+        self.numbers = numbers
+
+
+class DuplicateFinder:
+    def __init__(self, cars: List[Car], threshold: float = DEFAULT_THRESHOLD):
+        self.cars = cars
+        self.threshold = threshold
+        # Known manufacturers, to recognise one at the start of a model name
+        self._manufacturers = {tuple(_tokens(car.manufacturer)) for car in cars if _tokens(car.manufacturer)}
+        self._longest_manufacturer = max((len(m) for m in self._manufacturers), default=0)
+
+    def _profile(self, car: Car) -> _Profile:
+        tokens = _tokens(car.model)
+        manufacturer = tuple(_tokens(car.manufacturer))
+        if not manufacturer:
+            for length in range(min(self._longest_manufacturer, len(tokens)), 0, -1):
+                if tuple(tokens[:length]) in self._manufacturers:
+                    manufacturer = tuple(tokens[:length])
+                    break
+        year = _year_of(str(car.year).strip())
+        if year is None:
+            year = next((_year_of(t) for t in tokens if _year_of(t)), None)
+        if year is None:
+            # A lone two-digit token such as '67
+            short = [t for t in tokens if len(t) == 2 and t.isdigit()]
+            if len(short) == 1:
+                year = (1900 if int(short[0]) > 30 else 2000) + int(short[0])
+
+        skip = set(manufacturer)
+        if year is not None:
+            skip.update((str(year), str(year)[2:]))
+        words = [t for t in tokens if t not in skip] or tokens
+        shingles = set()
+        for word in words:
+            padded = f" {word} "
+            shingles.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        numbers = frozenset(t for t in words if t.isdigit())
+        return _Profile((" ".join(manufacturer), year), shingles, numbers)
+
+    @staticmethod
+    def _signatures(profiles: List[_Profile], positions: List[int]) -> np.ndarray:
+        """MinHash signatures (one row of NUM_HASHES per position) of non-empty shingle sets"""
+        shingle_ids: Dict[str, int] = {}
+        per_car = [[shingle_ids.setdefault(shingle, len(shingle_ids)) for shingle in profiles[p].shingles]
+                   for p in positions]
+        keys = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_ids),
+                           dtype=np.uint64, count=len(shingle_ids))
+        # Every distinct shingle hashed once; uint64 arithmetic wraps mod 2**64
+        hashes = ((keys[:, None] * _MULTIPLIERS[None, :] + _OFFSETS[None, :]) >> np.uint64(32)).astype(np.uint32)
+        signatures = np.empty((len(positions), NUM_HASHES), dtype=np.uint32)
+        for start in range(0, len(positions), SIGNATURE_BATCH):
+            batch = per_car[start:start + SIGNATURE_BATCH]
+            lengths = np.fromiter((len(ids) for ids in batch), dtype=np.int64, count=len(batch))
+            flat = np.fromiter((i for ids in batch for i in ids), dtype=np.int64, count=int(lengths.sum()))
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            signatures[start:start + len(batch)] = np.minimum.reduceat(hashes[flat], offsets, axis=0)
+        return signatures
+
+    @staticmethod
+    def _similarity(a: _Profile, b: _Profile) -> float:
+        manufacturer_a, manufacturer_b = a.block[0], b.block[0]
+        if manufacturer_a and manufacturer_b and manufacturer_a != manufacturer_b:
+            return 0.0
+        if a.numbers and b.numbers and a.numbers != b.numbers:
+            return 0.0  # "911" and "912" are different cars however similar the rest is
+        union = len(a.shingles | b.shingles)
+        return len(a.shingles & b.shingles) / union if union else 0.0
+
+    def clusters(self) -> List[Tuple[List[int], float]]:
+        """Groups of positions in cars that look like the same car, with their weakest link's similarity"""
+        profiles = [self._profile(car) for car in self.cars]
+        positions = [position for position, profile in enumerate(profiles) if profile.shingles]
+        buckets = defaultdict(list)
+        if positions:
+            rows = self._signatures(profiles, positions).tobytes()
+            width = NUM_HASHES * 4
+            band_width = ROWS * 4
+            for row, position in enumerate(positions):
+                signature = rows[row * width:(row + 1) * width]
+                year = profiles[position].block[1]
+                for band in range(BANDS):
+                    # Bucketed by year only; _similarity rejects conflicting manufacturers
+                    key = (year, band, signature[band * band_width:(band + 1) * band_width])
+                    buckets[key].append(position)
+
+        parent = list(range(len(self.cars)))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        checked: Set[Tuple[int, int]] = set()
+        links = []
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) <= MAX_PAIRWISE_BUCKET:
+                pairs = ((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+            else:
+                pairs = ((members[0], b) for b in members[1:])
+            for a, b in pairs:
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                similarity = self._similarity(profiles[a], profiles[b])
+                if similarity >= self.threshold:
+                    links.append((-similarity, a, b))
+
+        # Strongest links first, and a cluster never mixes two known
+        # manufacturers, so a car with none joins its closest match
+        weakest: Dict[int, float] = {}
+        makers = {position: profile.block[0] for position, profile in enumerate(profiles)}
+        for negative, a, b in sorted(links):
+            root_a, root_b = find(a), find(b)
+            if root_a == root_b or (makers[root_a] and makers[root_b] and makers[root_a] != makers[root_b]):
+                continue
+            parent[root_b] = root_a
+            makers[root_a] = makers[root_a] or makers[root_b]
+            weakest[root_a] = min(-negative, weakest.pop(root_a, 1.0), weakest.pop(root_b, 1.0))
+
+        groups = defaultdict(list)
+        for position in range(len(self.cars)):
+            root = find(position)
+            if root in weakest:
+                groups[root].append(position)
+        return [(members, round(weakest[root], 3)) for root, members in groups.items() if len(members) > 1]
+
+
+def _filled(car: Car) -> int:
+    return sum(1 for field in _MERGE_FIELDS if str(getattr(car, field)).strip())
+
+
+def choose_survivor(cars: List[Car], policy: str = "most_complete") -> int:
+    """Index of the car a cluster is merged into"""
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy: {policy} (expected one of {', '.join(MERGE_POLICIES)})")
+    if policy == "first":
+        return 0
+    if policy == "last":
+        return len(cars) - 1
+    # Most filled-in fields; the earliest such car wins ties
+    return max(range(len(cars)), key=lambda i: (_filled(cars[i]), -i))
+
+
+def merge_cluster(cars: List[Car], policy: str = "most_complete") -> Tuple[Car, int]:
+    """The survivor with its blank fields filled from the other cars, and its index"""
+    survivor = choose_survivor(cars, policy)
+    merged = cars[survivor].to_dict()
+    for field in _MERGE_FIELDS:
+        if not str(merged[field]).strip():
+            merged[field] = next((getattr(car, field) for car in cars if str(getattr(car, field)).strip()), "")
+    return Car.from_dict(merged), survivor
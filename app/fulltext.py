@@ -0,0 +1,229 @@
+"""Full-text search over every Car field with BM25 ranking.
+
+The inverted index maps each term to the cars containing it and the term's
+positions within the car's text, which allows phrase queries. Fields are
+indexed one after another with a gap in positions, so a phrase never spans
+two fields. Cars are numbered internally; removing a car leaves a hole that
+is skipped, so add/remove are proportional to the size of one car.
+
+When saved, each term's postings are packed into one string
+("car:pos,pos;car:pos") and only unpacked the first time a query touches the
+term, so loading a saved index is mostly reading the vocabulary.
+
+Query syntax:
+
+- ``ford mustang``: both terms must appear (AND is implicit)
+- ``"model t"``: phrase, terms adjacent and in order
+- ``ford OR chevrolet``: either side may match
+- ``-racing`` or ``NOT racing``: exclude cars containing the term
+"""
+import math
+import re
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from .models import ALLOWED_KEYS, Car
+
+# Letters and digits only, so URLs like .../wiki/Aston_Martin_DBR1 split into words
+_TERM_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_QUERY_RE = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+TEXT_FIELDS = [key for key in ALLOWED_KEYS if key != "id"]
+FIELD_GAP = 100
+FORMAT_VERSION = 2
+K1 = 1.2
+B = 0.75
+
+
+def terms(text: str) -> List[str]:
+    return _TERM_RE.findall(str(text).lower())
+
+
+def car_terms(car: Car) -> List[Tuple[str, int]]:
+    """(term, position) pairs for a car, fields separated by FIELD_GAP"""
+    result = []
+    offset = 0
+    for field in TEXT_FIELDS:
+        field_terms = terms(getattr(car, field))
+        result.extend((term, offset + i) for i, term in enumerate(field_terms))
+        offset += len(field_terms) + FIELD_GAP
+    return result
+
+
+def _pack(docs: Dict[int, List[int]]) -> str:
+    return ";".join(f"{number}:{','.join(map(str, positions))}" for number, positions in docs.items())
+
+
+def _unpack(packed: str) -> Dict[int, List[int]]:
+    docs = {}
+    for entry in packed.split(";"):
+        number, _, positions = entry.partition(":")
+        docs[int(number)] = [int(p) for p in positions.split(",")]
+    return docs
+
+
+def parse_query(query: str) -> List[List[Tuple[bool, List[str]]]]:
+    """Parse into OR-groups of (negated, terms) clauses; several terms mean a phrase"""
+    groups: List[List[Tuple[bool, List[str]]]] = [[]]
+    negate_next = False
+    for match in _QUERY_RE.finditer(query):
+        negated_phrase, phrase, word = match.groups()
+        if word == "OR":
+            if groups[-1]:
+                groups.append([])
+            continue
+        if word in ("AND", "NOT"):
+            negate_next = negate_next or word == "NOT"
+            continue
+        if phrase is not None:
+            negated, clause_terms = bool(negated_phrase), terms(phrase)
+        else:
+            negated = word.startswith("-") and len(word) > 1
+            clause_terms = terms(word[1:] if negated else word)
+        if clause_terms:
+            groups[-1].append((negated or negate_next, clause_terms))
+        negate_next = False
+    return [group for group in groups if any(not negated for negated, _ in group)]
+
+
+class FullTextIndex:
+    def __init__(self):
+        # term -> {car number: positions}, or the packed string until first use
+        self.postings: Dict[str, Union[str, Dict[int, List[int]]]] = {}
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_lengths: List[int] = []
+        self.numbers: Dict[str, int] = {}
+        self.total_length = 0
+        self.doc_count = 0
+        self.dirty = False
+
+    @classmethod
+    def build(cls, cars: List[Car]) -> "FullTextIndex":
+        index = cls()
+        for car in cars:
+            index.add(car)
+        index.dirty = True
+        return index
+
+    def _docs(self, term: str) -> Dict[int, List[int]]:
+        docs = self.postings.get(term)
+        if docs is None:
+            return {}
+        if isinstance(docs, str):
+            docs = self.postings[term] = _unpack(docs)
+        return docs
+
+    def add(self, car: Car) -> None:
+        if car.id in self.numbers:
+            self.remove(car)
+        number = len(self.doc_ids)
+        self.doc_ids.append(car.id)
+        self.numbers[car.id] = number
+        pairs = car_terms(car)
+        for term, position in pairs:
+            if term in self.postings:
+                self._docs(term).setdefault(number, []).append(position)
+            else:
+                self.postings[term] = {number: [position]}
+        self.doc_lengths.append(len(pairs))
+        self.total_length += len(pairs)
+        self.doc_count += 1
+        self.dirty = True
+
+    def remove(self, car: Car) -> None:
+        number = self.numbers.pop(car.id, None)
+        if number is None:
+            return
+        for term in {term for term, _ in car_terms(car)}:
+            docs = self._docs(term)
+            if docs:
+                docs.pop(number, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths[number]
+        self.doc_lengths[number] = 0
+        self.doc_ids[number] = None
+        self.doc_count -= 1
+        self.dirty = True
+
+    def _docs_with(self, clause_terms: List[str]) -> Set[int]:
+        """Cars containing the term, or the phrase when there are several terms"""
+        postings = [self._docs(term) for term in clause_terms]
+        if not all(postings):
+            return set()
+        candidates = set(min(postings, key=len))
+        for docs in postings:
+            candidates.intersection_update(docs)
+        if len(clause_terms) == 1:
+            return candidates
+
+        matches = set()
+        for number in candidates:
+            starts = set(postings[0][number])
+            for offset, docs in enumerate(postings[1:], start=1):
+                starts &= {position - offset for position in docs[number]}
+                if not starts:
+                    break
+            if starts:
+                matches.add(number)
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[float, str]]:
+        """Best matching car ids as (BM25 score, id), best first"""
+        groups = parse_query(query)
+        if not groups or not self.doc_count:
+            return []
+
+        matched: Set[int] = set()
+        scored_terms: Set[str] = set()
+        for group in groups:
+            positive = [clause for negated, clause in group if not negated]
+            docs = self._docs_with(positive[0])
+            for clause in positive[1:]:
+                if not docs:
+                    break
+                docs &= self._docs_with(clause)
+            for negated, clause in group:
+                if negated and docs:
+                    docs -= self._docs_with(clause)
+            matched |= docs
+            for clause in positive:
+                scored_terms.update(clause)
+
+        average_length = self.total_length / self.doc_count if self.doc_count else 1.0
+        scores = dict.fromkeys(matched, 0.0)
+        for term in scored_terms:
+            docs = self._docs(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for number in matched.intersection(docs):
+                frequency = len(docs[number])
+                norm = K1 * (1 - B + B * self.doc_lengths[number] / average_length)
+                scores[number] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(round(score, 4), self.doc_ids[number]) for number, score in ranked]
+
+    def to_dict(self) -> dict:
+        return {
+            "format": FORMAT_VERSION,
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": {
+                term: docs if isinstance(docs, str) else _pack(docs)
+                for term, docs in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional["FullTextIndex"]:
+        if not data or data.get("format") != FORMAT_VERSION:
+            return None
+        index = cls()
+        index.doc_ids = data["doc_ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.numbers = {doc_id: n for n, doc_id in enumerate(index.doc_ids) if doc_id is not None}
+        index.doc_count = len(index.numbers)
+        index.total_length = sum(index.doc_lengths)
+        index.postings = data["postings"]
+        return index
@@ -0,0 +1,190 @@
+"""Typo-tolerant ranked search over model, manufacturer and replica names.
+
+The index keeps two structures, built once and then patched as cars are
+added and removed:
+
+- a posting index: token -> {field weight: car slots}
+- a symmetric-deletion index: every token with up to N characters removed ->
+  the tokens it came from. A query token is expanded the same way, so two
+  tokens within edit distance N always share at least one deletion variant
+  and candidates are found with dictionary lookups instead of a scan.
+
+As in the secondary indexes, every car gets a slot when it is added and
+removing it clears the slot, so the other slots stay valid.
+
+Candidates are then verified with an optimal-string-alignment distance, so
+transpositions ("Mustnag") count as a single edit.
+"""
+import heapq
+import math
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from .models import Car
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Field weights: a hit on the model name matters most
+FUZZY_FIELDS = {"model": 1.0, "manufacturer": 0.7, "replica_model": 0.4}
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def max_edits(token: str) -> int:
+    """Allowed edit distance for a token; short tokens must match closely"""
+    if len(token) <= 2:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return 2
+
+
+def car_tokens(car: Car) -> Dict[str, float]:
+    """Tokens of a car's searchable fields with the weight of the heaviest field each is in"""
+    tokens: Dict[str, float] = {}
+    for field, weight in FUZZY_FIELDS.items():
+        for token in tokenize(getattr(car, field)):
+            if tokens.get(token, 0.0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+def _deletes(token: str, distance: int) -> Set[str]:
+    variants = {token}
+    frontier = {token}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up early once above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    def __init__(self, cars: List[Car]):
+        self.cars: List[Optional[Car]] = []
+        self.slot_of: Dict[str, int] = {}
+        self.count = 0
+        # Slots are dict keys rather than list items so removing one is O(1)
+        self.postings: Dict[str, Dict[float, Dict[int, None]]] = {}
+        self.doc_counts: Dict[str, int] = {}
+        self.deletes: Dict[str, Set[str]] = {}
+        for car in cars:
+            self.add(car)
+
+    def add(self, car: Car) -> None:
+        if car.id in self.slot_of:
+            self.remove(self.cars[self.slot_of[car.id]])
+        slot = len(self.cars)
+        self.cars.append(car)
+        self.slot_of[car.id] = slot
+        self.count += 1
+        for token, weight in car_tokens(car).items():
+            groups = self.postings.get(token)
+            if groups is None:
+                groups = self.postings[token] = {}
+                self.doc_counts[token] = 0
+                for variant in _deletes(token, max_edits(token)):
+                    self.deletes.setdefault(variant, set()).add(token)
+            groups.setdefault(weight, {})[slot] = None
+            self.doc_counts[token] += 1
+
+    def remove(self, car: Car) -> None:
+        slot = self.slot_of.pop(car.id, None)
+        if slot is None:
+            return
+        # The indexed version of the car, in case the one passed in differs
+        car, self.cars[slot] = self.cars[slot], None
+        self.count -= 1
+        for token, weight in car_tokens(car).items():
+            groups = self.postings[token]
+            del groups[weight][slot]
+            if not groups[weight]:
+                del groups[weight]
+            self.doc_counts[token] -= 1
+            if self.doc_counts[token]:
+                continue
+            del self.postings[token], self.doc_counts[token]
+            for variant in _deletes(token, max_edits(token)):
+                tokens = self.deletes[variant]
+                tokens.discard(token)
+                if not tokens:
+                    del self.deletes[variant]
+
+    def _candidates(self, term: str) -> List[Tuple[str, int]]:
+        """Index tokens within the allowed edit distance of term"""
+        limit = max_edits(term)
+        tokens: Set[str] = set()
+        for variant in _deletes(term, limit):
+            tokens |= self.deletes.get(variant, set())
+
+        matches = []
+        for token in tokens:
+            allowed = min(limit, max_edits(token)) if token != term else 0
+            distance = edit_distance(term, token, allowed)
+            if distance <= allowed:
+                matches.append((token, distance))
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, Car]]:
+        """Top cars for the query as (score, car), best first.
+
+        Each query token contributes its best matching index token per car,
+        weighted by field, rarity (idf) and closeness of the match. Scores are
+        normalized to 0..1 against a perfect model-name match on every token.
+        """
+        terms = tokenize(query)
+        if not terms or not self.count:
+            return []
+
+        total = self.count
+        scores: Dict[int, float] = {}
+        best_possible = 0.0
+        for term in terms:
+            groups = []
+            for token, distance in self._candidates(term):
+                if distance and token.startswith(term):
+                    distance = 0.5  # completing a prefix beats an arbitrary edit
+                idf = math.log(1 + total / self.doc_counts[token])
+                closeness = 1.0 - distance / (len(term) + 1)
+                groups.extend((weight * idf * closeness, slots) for weight, slots in self.postings[token].items())
+
+            # Merge best value per car, highest groups first: dict.fromkeys and
+            # update run in C, and values already present are never lower
+            best_for_doc: Dict[int, float] = {}
+            for value, slots in sorted(groups, key=lambda group: group[0], reverse=True):
+                merged = dict.fromkeys(slots, value)
+                merged.update(best_for_doc)
+                best_for_doc = merged
+
+            if scores:
+                for slot, value in best_for_doc.items():
+                    scores[slot] = scores.get(slot, 0.0) + value
+            else:
+                scores = best_for_doc
+            best_possible += math.log(1 + total)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(round(score / best_possible, 4), self.cars[slot]) for slot, score in top]
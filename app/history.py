@@ -0,0 +1,215 @@
+"""Undo/redo journal and point-in-time snapshots of the car collection.
+
+The journal is an append-only JSON-lines file next to the store
+(car.journal.jsonl). Every change appends one "do" line holding each affected
+car before and after the change, which is all that is needed to invert it;
+undo and redo append a one-word marker, so all three cost O(size of the
+change) regardless of the collection size. Replaying the lines on startup
+rebuilds both stacks. Only the last ``max_entries`` changes are kept: the
+file is rewritten without older entries once it grows well past that.
+
+Snapshots live in a directory next to the store (car.snapshots/): one full
+copy of the collection as of the oldest snapshot, plus one file per snapshot
+holding only the cars that differ from the previous one. Restoring replays
+the deltas onto the base; dropping the oldest snapshot folds its delta into
+the base.
+"""
+import os
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from .data import FileIO
+from .models import Car
+
+MAX_JOURNAL_ENTRIES = 100
+MAX_SNAPSHOTS = 100
+# Changes touching more cars than this (e.g. huge imports) are not journaled
+MAX_ENTRY_CHANGES = 50000
+
+
+def _store_base(store_path: str) -> str:
+    return FileIO.store_base(store_path)
+
+
+def _label(changes: List[Tuple[Optional[dict], Optional[dict]]]) -> str:
+    if len(changes) == 1:
+        before, after = changes[0]
+        kind = "add" if before is None else "delete" if after is None else "update"
+        return f"{kind} {(after or before)['model']}"
+    return f"{len(changes)} changes"
+
+
+class Journal:
+    def __init__(self, store_path: str, max_entries: int = MAX_JOURNAL_ENTRIES):
+        self.path = _store_base(store_path) + ".journal.jsonl"
+        self.max_entries = max_entries
+        self.undo_stack: deque = deque(maxlen=max_entries)
+        self.redo_stack: List[dict] = []
+        self._lines = 0
+        self._seq = 0
+        for line in FileIO.read_json_lines(self.path):
+            self._replay(line)
+            self._lines += 1
+
+    def _replay(self, line: dict) -> None:
+        op = line.get("op")
+        if op == "do":
+            self.undo_stack.append(line["entry"])
+            self.redo_stack.clear()
+            self._seq = max(self._seq, line["entry"].get("seq", 0))
+        elif op == "undo" and self.undo_stack:
+            self.redo_stack.append(self.undo_stack.pop())
+        elif op == "redo" and self.redo_stack:
+            self.undo_stack.append(self.redo_stack.pop())
+
+    def _append(self, line: dict) -> None:
+        FileIO.append_json_lines(self.path, [line])
+        self._lines += 1
+        if self._lines > 4 * self.max_entries:
+            self.compact()
+
+    def compact(self) -> bool:
+        """Rewrite the file with just the retained entries"""
+        lines = [{"op": "do", "entry": entry} for entry in self.undo_stack]
+        lines.extend({"op": "do", "entry": entry} for entry in reversed(self.redo_stack))
+        lines.extend({"op": "undo"} for _ in self.redo_stack)
+        if not FileIO.write_json_lines(self.path, lines):
+            return False
+        self._lines = len(lines)
+        return True
+
+    def record(self, added: List[Car], removed: List[Car]) -> Optional[dict]:
+        """Journal a change given the cars it added and removed (same id = update)"""
+        before = {car.id: car.to_dict() for car in removed}
+        changes = []
+        for car in added:
+            changes.append((before.pop(car.id, None), car.to_dict()))
+        changes.extend((old, None) for old in before.values())
+        if not changes or len(changes) > MAX_ENTRY_CHANGES:
+            return None
+        self._seq += 1
+        entry = {"seq": self._seq, "time": time.time(), "label": _label(changes), "changes": changes}
+        self.undo_stack.append(entry)
+        self.redo_stack.clear()
+        self._append({"op": "do", "entry": entry})
+        return entry
+
+    def mark(self, op: str) -> None:
+        """Move the top entry between stacks after it was undone or redone"""
+        self._replay({"op": op})
+        self._append({"op": op})
+
+    def entries(self, limit: int = 20) -> List[dict]:
+        """Most recent undoable changes first, without their car payloads"""
+        recent = list(self.undo_stack)[-limit:][::-1] if limit else []
+        return [{"seq": e["seq"], "time": e["time"], "label": e["label"], "changes": len(e["changes"])}
+                for e in recent]
+
+
+def apply_changes(cars: List[Car], changes, reverse: bool = False):
+    """Apply journaled (before, after) pairs, or undo them with reverse=True.
+
+    Cars are matched by id, so this also works after unrelated changes.
+    Returns (cars, added, removed). Updated cars keep their position; cars
+    brought back by an undo are appended at the end.
+    """
+    by_id = {car.id: car for car in cars}
+    added, removed = [], []
+    steps = reversed(changes) if reverse else changes
+    for before, after in steps:
+        target = before if reverse else after
+        car_id = (before or after)["id"]
+        current = by_id.pop(car_id, None) if target is None else by_id.get(car_id)
+        if current is not None:
+            removed.append(current)
+        if target is not None:
+            car = Car.from_dict(target)
+            by_id[car_id] = car
+            added.append(car)
+    return list(by_id.values()), added, removed
+
+
+class SnapshotStore:
+    def __init__(self, store_path: str, max_snapshots: int = MAX_SNAPSHOTS):
+        self.dir = _store_base(store_path) + ".snapshots"
+        self.max_snapshots = max_snapshots
+        self._manifest_path = os.path.join(self.dir, "manifest.json")
+        self._base_path = os.path.join(self.dir, "base.json")
+        # State as of the newest snapshot, so creating the next one is a single diff
+        self._latest: Optional[Dict[str, dict]] = None
+
+    def _delta_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.dir, f"{snapshot_id}.json")
+
+    def list(self) -> List[dict]:
+        return FileIO.read_json_dict(self._manifest_path).get("snapshots", [])
+
+    def _state(self, upto: Optional[str] = None) -> Optional[Dict[str, dict]]:
+        """id -> car dict as of snapshot upto (default: newest), replaying deltas onto the base"""
+        state = {car["id"]: car for car in FileIO.read_json_dict(self._base_path).get("cars", [])}
+        for snapshot in self.list():
+            delta = FileIO.read_json_dict(self._delta_path(snapshot["id"]))
+            for car_id in delta.get("delete", []):
+                state.pop(car_id, None)
+            for car in delta.get("upsert", []):
+                state[car["id"]] = car
+            if snapshot["id"] == upto:
+                return state
+        return state if upto is None else None
+
+    def create(self, cars: List[Car], name: str = "") -> Optional[dict]:
+        snapshots = self.list()
+        current = {car.id: car.to_dict() for car in cars}
+        if not snapshots:
+            if not FileIO.write_json(self._base_path, {"cars": list(current.values())}, indent=None):
+                return None
+            delta = {"upsert": [], "delete": []}
+        else:
+            previous = self._latest if self._latest is not None else self._state()
+            delta = {
+                "upsert": [car for car_id, car in current.items() if previous.get(car_id) != car],
+                "delete": [car_id for car_id in previous if car_id not in current],
+            }
+        snapshot = {
+            "id": uuid.uuid4().hex[:12],
+            "name": name or time.strftime("%Y-%m-%d %H:%M:%S"),
+            "time": time.time(),
+            "cars": len(current),
+            "changes": len(delta["upsert"]) + len(delta["delete"]),
+        }
+        if not FileIO.write_json(self._delta_path(snapshot["id"]), delta, indent=None):
+            return None
+        snapshots.append(snapshot)
+        if not FileIO.write_json(self._manifest_path, {"snapshots": snapshots}):
+            return None
+        self._latest = current
+        while len(snapshots) > self.max_snapshots:
+            snapshots = self._drop_oldest(snapshots)
+        return snapshot
+
+    def _drop_oldest(self, snapshots: List[dict]) -> List[dict]:
+        """Forget the oldest snapshot and fold the next one's delta into the base.
+
+        The manifest is written first: replaying a delta onto a base that
+        already contains it changes nothing, so a crash between the two
+        writes leaves every remaining snapshot restorable.
+        """
+        base = self._state(upto=snapshots[1]["id"]) or {}
+        remaining = snapshots[1:]
+        if not FileIO.write_json(self._manifest_path, {"snapshots": remaining}):
+            return snapshots
+        FileIO.write_json(self._base_path, {"cars": list(base.values())}, indent=None)
+        try:
+            os.remove(self._delta_path(snapshots[0]["id"]))
+        except OSError:
+            pass
+        return remaining
+
+    def cars(self, snapshot_id: str) -> Optional[List[Car]]:
+        """Collection as it was when the snapshot was taken, or None if unknown"""
+        state = self._state(upto=snapshot_id)
+        if state is None:
+            return None
+        return [Car.from_dict(car) for car in state.values()]
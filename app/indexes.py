@@ -0,0 +1,254 @@
+"""Secondary indexes over the car collection.
+
+- model hash: lower-cased model name -> car ids
+- year index: (year, slot) pairs kept sorted, for range lookups with bisect
+- bitmaps: for each value of the facet fields (category, manufacturer,
+  country, replica brand), a Python int whose bit n is set when the car in
+  slot n has that value. Facet filters are ANDs/ORs of these ints and facet
+  counts are popcounts, so neither touches the cars themselves.
+
+Every car gets a slot number when it is added; removing a car clears its
+slot instead of renumbering the others, so bitmaps stay valid under
+incremental updates.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from .models import Car
+from .query import FACET_FIELDS
+
+BITMAP_FIELDS = FACET_FIELDS
+FORMAT_VERSION = 3
+
+
+def bitmap_from_slots(slots: List[int], size: int) -> int:
+    """Build a bitmap in one pass instead of OR-ing bits into a growing int"""
+    buffer = bytearray((size + 7) // 8)
+    for slot in slots:
+        buffer[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """Slots set in a bitmap, in ascending order"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (byte_index << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+class CarsById(dict):
+    """id -> Car map that can be patched like the other indexes"""
+
+    @classmethod
+    def build(cls, cars: List[Car]) -> "CarsById":
+        if hasattr(cars, "by_id"):
+            # CarRecords (memory-budgeted mode) look cars up without decoding them all
+            return cars.by_id()
+        return cls((car.id, car) for car in cars)
+
+    def add(self, car: Car) -> None:
+        self[car.id] = car
+
+    def remove(self, car: Car) -> None:
+        self.pop(car.id, None)
+
+
+class StorePositions(dict):
+    """id -> position in the store, to put index results in store order.
+
+    Not patched: removing a car shifts the cars after it, so it is rebuilt
+    on the next use after a change.
+    """
+
+    @classmethod
+    def build(cls, cars: List[Car]) -> "StorePositions":
+        return cls((car.id, position) for position, car in enumerate(cars))
+
+
+def _year(car: Car) -> Optional[int]:
+    return int(car.year) if car.year.isdigit() else None
+
+
+class SecondaryIndexes:
+    def __init__(self):
+        self.slots: List[Optional[str]] = []
+        self.slot_of: Dict[str, int] = {}
+        self.by_model: Dict[str, List[str]] = {}
+        self.years: List[Tuple[int, int]] = []
+        self.bitmaps: Dict[str, Dict[str, int]] = {field: {} for field in BITMAP_FIELDS}
+        self.dirty = False
+
+    @classmethod
+    def build(cls, cars: List[Car]) -> "SecondaryIndexes":
+        index = cls()
+        members: Dict[str, Dict[str, List[int]]] = {field: {} for field in BITMAP_FIELDS}
+        for slot, car in enumerate(cars):
+            index.slots.append(car.id)
+            index.slot_of[car.id] = slot
+            index.by_model.setdefault(car.model.lower(), []).append(car.id)
+            year = _year(car)
+            if year is not None:
+                index.years.append((year, slot))
+            for field in BITMAP_FIELDS:
+                members[field].setdefault(getattr(car, field), []).append(slot)
+        index.years.sort()
+        for field, values in members.items():
+            index.bitmaps[field] = {
+                value: bitmap_from_slots(slots, len(cars)) for value, slots in values.items()
+            }
+        index.dirty = True
+        return index
+
+    def add(self, car: Car) -> None:
+        if car.id in self.slot_of:
+            self.remove(car)
+        slot = len(self.slots)
+        self.slots.append(car.id)
+        self.slot_of[car.id] = slot
+        self.by_model.setdefault(car.model.lower(), []).append(car.id)
+        year = _year(car)
+        if year is not None:
+            insort(self.years, (year, slot))
+        for field in BITMAP_FIELDS:
+            values = self.bitmaps[field]
+            value = getattr(car, field)
+            values[value] = values.get(value, 0) | (1 << slot)
+        self.dirty = True
+
+    def remove(self, car: Car) -> None:
+        slot = self.slot_of.pop(car.id, None)
+        if slot is None:
+            return
+        self.slots[slot] = None
+        ids = self.by_model.get(car.model.lower(), [])
+        if car.id in ids:
+            ids.remove(car.id)
+            if not ids:
+                del self.by_model[car.model.lower()]
+        year = _year(car)
+        if year is not None:
+            position = bisect_left(self.years, (year, slot))
+            if position < len(self.years) and self.years[position] == (year, slot):
+                del self.years[position]
+        for field in BITMAP_FIELDS:
+            values = self.bitmaps[field]
+            value = getattr(car, field)
+            if value in values:
+                values[value] &= ~(1 << slot)
+                if not values[value]:
+                    del values[value]
+        self.dirty = True
+
+    def ids_for_model(self, model: str) -> List[str]:
+        return list(self.by_model.get(str(model).strip().lower(), []))
+
+    def year_bitmap(self, low: int, high: int) -> int:
+        start = bisect_left(self.years, (low, -1))
+        end = bisect_right(self.years, (high, len(self.slots)))
+        return bitmap_from_slots([slot for _, slot in self.years[start:end]], len(self.slots))
+
+    def field_bitmap(self, field: str, text: str) -> int:
+        """Cars whose field value contains text (case-insensitive)"""
+        bitmap = 0
+        for value, bits in self.bitmaps[field].items():
+            if text in value.lower():
+                bitmap |= bits
+        return bitmap
+
+    def live_bitmap(self) -> int:
+        """All cars currently in the index (every car has exactly one category)"""
+        bitmap = 0
+        for bits in self.bitmaps[BITMAP_FIELDS[0]].values():
+            bitmap |= bits
+        return bitmap
+
+    def facet_bitmap(self, filters: Dict[str, FrozenSet[str]]) -> int:
+        """Cars matching normalized facet filters: OR within a field, AND across fields"""
+        bitmap = self.live_bitmap()
+        for field, wanted in filters.items():
+            bits = 0
+            for value, value_bits in self.bitmaps[field].items():
+                if value.strip().casefold() in wanted:
+                    bits |= value_bits
+            bitmap &= bits
+            if not bitmap:
+                break
+        return bitmap
+
+    def facet_counts(self, filters: Dict[str, FrozenSet[str]], fields=BITMAP_FIELDS) -> Dict[str, Dict[str, int]]:
+        """Per-value counts for each field, most common first.
+
+        Each field is counted under the filters on the other fields only, so
+        a filter UI can show how many cars picking another value would give.
+        """
+        counts = {}
+        for field in fields:
+            others = {other: wanted for other, wanted in filters.items() if other != field}
+            base = self.facet_bitmap(others)
+            values = ((value, (bits & base).bit_count()) for value, bits in self.bitmaps[field].items())
+            counts[field] = dict(sorted(((v, n) for v, n in values if n), key=lambda item: (-item[1], item[0])))
+        return counts
+
+    def ids(self, bitmap: int) -> List[str]:
+        """Car ids for the slots set in a bitmap, in slot order"""
+        slots = self.slots
+        return [slots[slot] for slot in iter_bits(bitmap) if slots[slot] is not None]
+
+    def candidates(self, query) -> Optional[List[str]]:
+        """Ids that may match a normalized dict query in slot order, or None if no index applies.
+
+        Only narrows the search: callers still check the full query on each
+        candidate, so unindexed fields (model substrings, info...) stay exact.
+        """
+        if not isinstance(query, tuple):
+            return None
+        bitmap = None
+        for field, text in query:
+            if field in self.bitmaps:
+                bits = self.field_bitmap(field, text)
+            elif field == "year":
+                low, sep, high = text.partition("-")
+                if not (sep and low.strip().isdigit() and high.strip().isdigit()):
+                    continue
+                bits = self.year_bitmap(int(low), int(high))
+            else:
+                continue
+            bitmap = bits if bitmap is None else bitmap & bits
+        if bitmap is None:
+            return None
+        return self.ids(bitmap)
+
+    def to_dict(self) -> dict:
+        # Models map to slot numbers and years are flattened to keep the file small
+        return {
+            "format": FORMAT_VERSION,
+            "slots": self.slots,
+            "by_model": {
+                model: [self.slot_of[car_id] for car_id in ids]
+                for model, ids in self.by_model.items()
+            },
+            "years": [value for pair in self.years for value in pair],
+            "bitmaps": {
+                field: {value: format(bits, "x") for value, bits in values.items()}
+                for field, values in self.bitmaps.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional["SecondaryIndexes"]:
+        if not data or data.get("format") != FORMAT_VERSION:
+            return None
+        index = cls()
+        index.slots = data["slots"]
+        index.slot_of = {car_id: slot for slot, car_id in enumerate(index.slots) if car_id is not None}
+        slots = index.slots
+        index.by_model = {model: [slots[slot] for slot in numbers] for model, numbers in data["by_model"].items()}
+        flat = data["years"]
+        index.years = list(zip(flat[0::2], flat[1::2]))
+        for field in BITMAP_FIELDS:
+            values = data["bitmaps"].get(field, {})
+            index.bitmaps[field] = {value: int(bits, 16) for value, bits in values.items()}
+        return index
@@ -0,0 +1,189 @@
+"""Health checks for the cars' info URLs.
+
+All URLs are checked concurrently on one asyncio loop with plain
+asyncio streams:
+
+- at most ``connections`` requests are open at once, and at most
+  ``per_host`` to any one host, started no faster than ``rate`` per second
+  per host, so a collection that is mostly Wikipedia links doesn't hammer
+  Wikipedia
+- each URL gets a HEAD request; servers that reject HEAD (405, 501 and
+  other errors) are asked again with a GET, of which only the status line
+  and headers are read
+- redirects are followed up to MAX_REDIRECTS hops
+
+Results are stored per car id in a sidecar next to the store
+(car.links.json) and reused until they are older than the TTL (shorter
+for failures, which are often temporary) or the car's URL changes.
+"""
+import asyncio
+import ssl
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote, urljoin, urlsplit
+
+from .data import FileIO
+from .utils import validate_url
+
+DEFAULT_CONNECTIONS = 20
+DEFAULT_PER_HOST = 2
+DEFAULT_RATE = 5.0
+DEFAULT_TIMEOUT = 10.0
+# Seconds a result is trusted: working links for a week, failures for a day
+OK_TTL = 7 * 24 * 3600
+FAILED_TTL = 24 * 3600
+MAX_REDIRECTS = 5
+USER_AGENT = "CarDb-LinkChecker/1.0"
+
+# ok: 2xx after redirects; broken: 4xx (the page is gone);
+# error: 5xx, timeouts and network failures; invalid: not an http(s) URL
+LINK_STATES = ("ok", "broken", "error", "invalid")
+
+
+def _state(status: Optional[int]) -> str:
+    if status is None or status >= 500:
+        return "error"
+    if status >= 400:
+        return "broken"
+    return "ok"
+
+
+class _HostLimiter:
+    """Concurrency and start-rate limit for one host"""
+
+    def __init__(self, per_host: int, rate: float):
+        self._slots = asyncio.Semaphore(per_host)
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self._slots.acquire()
+        if self._interval:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                wait = self._next_start - loop.time()
+                self._next_start = max(loop.time(), self._next_start) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+
+class LinkChecker:
+    def __init__(self, connections: int = DEFAULT_CONNECTIONS, per_host: int = DEFAULT_PER_HOST,
+                 rate: float = DEFAULT_RATE, timeout: float = DEFAULT_TIMEOUT):
+        self.connections = connections
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.requests = 0
+        self._ssl = None
+
+    async def check_all(self, urls: List[str], progress=None) -> Dict[str, dict]:
+        """Check each distinct URL once; returns url -> result"""
+        self._pool = asyncio.Semaphore(self.connections)
+        self._hosts: Dict[str, _HostLimiter] = {}
+        distinct = list(dict.fromkeys(urls))
+        results = {}
+
+        async def one(url):
+            results[url] = await self.check(url)
+            if progress is not None:
+                progress(len(results), len(distinct))
+
+        await asyncio.gather(*(one(url) for url in distinct))
+        return results
+
+    async def check(self, url: str) -> dict:
+        """Result dict for one URL: url, state, status, final_url, error, checked, elapsed_ms"""
+        started = time.monotonic()
+        result = {"url": url, "state": "invalid", "status": None, "final_url": None, "error": None}
+        if validate_url(url):
+            current = url.strip()
+            try:
+                for _ in range(MAX_REDIRECTS + 1):
+                    status, location = await self._status(current, "HEAD")
+                    if status >= 400:
+                        # Plenty of servers answer HEAD wrongly; GET is authoritative
+                        status, location = await self._status(current, "GET")
+                    if status in (301, 302, 303, 307, 308) and location:
+                        current = urljoin(current, location)
+                        continue
+                    break
+                else:
+                    status, result["error"] = None, "Too many redirects"
+                result.update(state=_state(status), status=status, final_url=current)
+            except asyncio.TimeoutError:
+                result.update(state="error", error="Timed out")
+            except (OSError, ssl.SSLError, ValueError, asyncio.IncompleteReadError) as e:
+                result.update(state="error", error=str(e) or e.__class__.__name__)
+        result["checked"] = time.time()
+        result["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+        return result
+
+    def _limiter(self, netloc: str) -> _HostLimiter:
+        limiter = self._hosts.get(netloc)
+        if limiter is None:
+            limiter = self._hosts[netloc] = _HostLimiter(self.per_host, self.rate)
+        return limiter
+
+    async def _status(self, url: str, method: str):
+        """(status, Location header) of one request, reading nothing past the headers"""
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        if secure and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        path = quote(parts.path or "/", safe="/%:@!$&'()*+,;=-._~")
+        if parts.query:
+            path += "?" + parts.query
+        async with self._pool, self._limiter(parts.netloc):
+            self.requests += 1
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(parts.hostname, parts.port or (443 if secure else 80),
+                                        ssl=self._ssl if secure else None),
+                self.timeout)
+            try:
+                request = (f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: {USER_AGENT}\r\n"
+                           "Accept: */*\r\nConnection: close\r\n\r\n")
+                writer.write(request.encode("latin-1", "replace"))
+                await asyncio.wait_for(writer.drain(), self.timeout)
+                status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+                fields = status_line.split()
+                if len(fields) < 2 or not fields[1].isdigit():
+                    raise ValueError("Not an HTTP response")
+                location = None
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), self.timeout)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "location":
+                        location = value.strip()
+                return int(fields[1]), location
+            finally:
+                writer.close()
+
+
+class LinkStore:
+    """Last check result per car id, in a sidecar next to the store (car.links.json)"""
+
+    def __init__(self, store_path: str):
+        self.path = FileIO.store_base(store_path) + ".links.json"
+
+    def load(self) -> Dict[str, dict]:
+        return FileIO.read_json_dict(self.path).get("cars", {})
+
+    def save(self, results: Dict[str, dict]) -> bool:
+        return FileIO.write_json(self.path, {"cars": results}, indent=None)
+
+
+def is_fresh(result: Optional[dict], url: str, now: float, ok_ttl: float = OK_TTL,
+             failed_ttl: float = FAILED_TTL) -> bool:
+    """Whether a stored result still answers for url"""
+    if not result or result.get("url") != url:
+        return False
+    ttl = ok_ttl if result.get("state") in ("ok", "invalid") else failed_ttl
+    return now - result.get("checked", 0) < ttl
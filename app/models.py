@@ -1,5 +1,5 @@
-from dataclasses import dataclass, asdict
-from typing import Dict, Any, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
 import uuid
 
 
@@ -27,7 +27,8 @@ class Car:
     info: str = ""
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        # Every field is a plain string, so asdict()'s recursive deep copy isn't needed
+        return {key: getattr(self, key) for key in ALLOWED_KEYS}
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> "Car":
@@ -35,6 +36,21 @@ class Car:
         return Car(**normalized)
 
 
+@dataclass(frozen=True)
+class ChangeEvent:
+    """A change to the collection, delivered to CarTracker subscribers.
+
+    kind is "added", "updated" or "deleted" with the affected car (and the
+    car as it was before for updates), or "reloaded" with no car when the
+    store changed in a way that can't be described car by car (e.g. edited
+    outside the app); subscribers should then reload everything.
+    """
+    kind: str
+    car: Optional[Car]
+    version: int
+    previous: Optional[Car] = None
+
+
 def _coerce_year(value: Any) -> str:
     if value is None:
         return ""
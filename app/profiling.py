@@ -0,0 +1,351 @@
+"""Profiling mode for the entry points (main.py --profile, mobile_app.py --profile).
+
+Runs the selected interface under one of two profilers:
+
+- cprofile (default): deterministic cProfile, one profiler per thread (Flet
+  runs event handlers on worker threads) merged into one report
+- sample: a wall-clock sampler that records every thread's stack every few
+  milliseconds; it adds far less overhead than cProfile's per-call hooks
+
+tracemalloc runs alongside (and is the largest overhead of either mode); checkpoint() calls at key points (after a load,
+after an import, after the main view is built) record how much memory is
+held and which lines allocated it since the previous checkpoint.
+Allocations are attributed to the innermost frame inside this repository,
+so memory used by json while loading the store is charged to the FileIO
+line that called it.
+
+On exit a text report is written (cardb-profile-<time>.txt unless
+--profile-out is given) that sums time and memory per component:
+CarTracker, FileIO, FletApp and the rest. With cProfile, the raw stats are
+also saved next to it (.pstats) for tools like snakeviz.
+"""
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_MODES = ("cprofile", "sample")
+SAMPLE_INTERVAL = 0.005
+# Frames kept per allocation: enough to reach the repository code behind library calls
+# (FileIO.read_json -> json.load -> ...), while each extra frame slows down every allocation
+TRACE_FRAMES = 8
+TOP_ENTRIES = 15
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPONENTS = (
+    ("CarTracker", os.path.join("app", "car_tracker.py")),
+    ("FileIO", os.path.join("app", "data", "file_io.py")),
+    ("FletApp", os.path.join("interfaces", "flet_app.py")),
+)
+
+_active = None
+_components: Dict[str, Optional[str]] = {}
+
+
+def component(filename: str) -> Optional[str]:
+    """Component a source file belongs to, or None outside this repository"""
+    try:
+        return _components[filename]
+    except KeyError:
+        pass
+    name = None
+    if filename.startswith(ROOT) and filename != os.path.abspath(__file__):
+        relative = os.path.relpath(filename, ROOT)
+        package, _, rest = relative.partition(os.sep)
+        name = next((name for name, path in COMPONENTS if relative == path),
+                    package + " (other)" if rest else package)
+    _components[filename] = name
+    return name
+
+
+def trace_memory() -> None:
+    """Start tracemalloc for the active profiler.
+
+    Entry points call this once their imports are done: traced, importing
+    flet (with its huge icon enums) takes about 15 times longer.
+    """
+    if _active is not None:
+        _active.trace_memory()
+
+
+def checkpoint(label: str) -> None:
+    """Record a memory checkpoint; does nothing unless profiling"""
+    if _active is not None:
+        _active.checkpoint(label)
+
+
+class _Sampler(threading.Thread):
+    """Counts, every interval, the functions on each thread's stack (self and inclusive)"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self.component_self: Counter = Counter()
+        self.component_total: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        # Keyed by code object and component name so that sampling allocates as little as
+        # possible: tracemalloc would trace (and slow down) the sampler's own allocations
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                self.samples += 1
+                seen, components = set(), set()
+                code = frame.f_code
+                self.self_counts[code] += 1
+                self.component_self[component(code.co_filename) or "other"] += 1
+                while frame is not None:
+                    code = frame.f_code
+                    if code not in seen:
+                        seen.add(code)
+                        self.total_counts[code] += 1
+                        components.add(component(code.co_filename) or "other")
+                    frame = frame.f_back
+                self.component_total.update(components)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    def __init__(self, mode: str = "cprofile", out: Optional[str] = None, argv: Optional[List[str]] = None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}': use one of {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.out = out or f"cardb-profile-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        self.argv = list(argv or sys.argv)
+        self.checkpoints: List[dict] = []
+        self._profiles: List[cProfile.Profile] = []
+        # Profiler of each thread, paused while that thread records a checkpoint
+        self._thread_profiles: Dict[int, cProfile.Profile] = {}
+        self._sampler: Optional[_Sampler] = None
+        self._previous: Counter = Counter()
+        self._lock = threading.Lock()
+        self._started = None
+        self._stopped = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        if self.mode == "sample":
+            self._sampler = _Sampler()
+            self._sampler.start()
+            return
+        # Threads started from now on get their own profiler
+        threading.setprofile(self._profile_thread)
+        self._profile_thread()
+
+    def _profile_thread(self, *args):
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+            self._thread_profiles[threading.get_ident()] = profile
+        profile.enable()
+
+    def trace_memory(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self.checkpoint("start")
+
+    def stop(self) -> None:
+        if self._stopped is not None:
+            return
+        self._stopped = time.perf_counter()
+        if self._sampler is not None:
+            self._sampler.stop()
+        else:
+            threading.setprofile(None)
+            for profile in self._profiles:
+                # Profilers of other threads stop collecting once disabled from here
+                profile.disable()
+        self.checkpoint("exit")
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def checkpoint(self, label: str) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        # Analysing the snapshot is slow; keep it out of the time profile
+        profile = self._thread_profiles.get(threading.get_ident()) if self._stopped is None else None
+        if profile is not None:
+            profile.disable()
+        try:
+            self._checkpoint(label)
+        finally:
+            if profile is not None:
+                profile.enable()
+
+    def _checkpoint(self, label: str) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            held = self._attribute(tracemalloc.take_snapshot())
+            growth = held.copy()
+            growth.subtract(self._previous)
+            self._previous = held
+            per_component = Counter()
+            for (name, _), size in held.items():
+                per_component[name] += size
+            self.checkpoints.append({
+                "label": label,
+                "elapsed": started - self._started,
+                "cost": time.perf_counter() - started,
+                "current": current,
+                "peak": peak,
+                "components": per_component,
+                "growth": [(where, size) for where, size in growth.most_common(TOP_ENTRIES) if size > 0],
+            })
+
+    @staticmethod
+    def _attribute(snapshot) -> Counter:
+        """Bytes held per (component, file:line) of the innermost repository frame of each allocation"""
+        # Snapshot.statistics() is far too slow for a large heap while tracemalloc keeps tracing.
+        # The raw traces are (domain, size, frames, total) with frames from the most recent call,
+        # and identical tracebacks share one frames tuple, so they are summed by identity first
+        sizes: Dict[int, int] = {}
+        tracebacks: Dict[int, tuple] = {}
+        for _, size, frames, _ in snapshot.traces._traces:
+            key = id(frames)
+            if key in sizes:
+                sizes[key] += size
+            else:
+                sizes[key] = size
+                tracebacks[key] = frames
+        held: Counter = Counter()
+        for key, size in sizes.items():
+            where = ("other", "outside the repository")
+            for filename, lineno in tracebacks[key]:
+                name = component(filename)
+                if name is not None:
+                    where = (name, f"{os.path.relpath(filename, ROOT)}:{lineno}")
+                    break
+            held[where] += size
+        return held
+
+    def report(self) -> str:
+        out = io.StringIO()
+        elapsed = (self._stopped or time.perf_counter()) - self._started
+        out.write(f"CarDb profile: {' '.join(self.argv)}\n")
+        out.write(f"mode {self.mode}, ran {elapsed:.2f} s (tracemalloc on after startup imports, "
+                  "so everything runs slower than usual)\n\n")
+
+        out.write("== Memory checkpoints (tracemalloc) ==\n")
+        for point in self.checkpoints:
+            out.write(f"\n{point['label']} at {point['elapsed']:.2f} s: {point['current'] / 2**20:.1f} MiB held, "
+                      f"peak {point['peak'] / 2**20:.1f} MiB (checkpoint took {point['cost']:.2f} s)\n")
+            held = (f"{name} {size / 2**20:.1f} MiB" for name, size in point["components"].most_common())
+            out.write("  held by: " + ", ".join(held) + "\n")
+            for (name, where), size in point["growth"]:
+                out.write(f"  +{size / 1024:10.0f} KiB  {name:<12} {where}\n")
+
+        out.write("\n== Time by component ==\n")
+        if self._sampler is not None:
+            self._sampler_report(out)
+        else:
+            self._cprofile_report(out)
+        return out.getvalue()
+
+    def _sampler_report(self, out) -> None:
+        sampler = self._sampler
+        total = max(sampler.samples, 1)
+        out.write(f"{sampler.samples} samples every {sampler.interval * 1000:.0f} ms across all threads "
+                  "(idle threads waiting on I/O or locks count too)\n")
+        out.write(f"{'component':<20} {'self':>8} {'inclusive':>10}\n")
+        for name, count in sampler.component_total.most_common():
+            out.write(f"{name:<20} {sampler.component_self[name] / total:8.1%} {count / total:10.1%}\n")
+        for title, counts in (("inclusive", sampler.total_counts), ("self", sampler.self_counts)):
+            out.write(f"\n== Top functions by {title} samples ==\n")
+            for code, count in counts.most_common(TOP_ENTRIES * 2):
+                where = self._where(code.co_filename, code.co_firstlineno)
+                out.write(f"{count / total:7.1%}  {code.co_name} ({where})\n")
+
+    def _cprofile_report(self, out) -> None:
+        stats = pstats.Stats(*self._profiles, stream=out)
+        per_component: Dict[str, float] = Counter()
+        by_component: Dict[str, List[Tuple[float, str]]] = {}
+        for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+            owner = component(filename)
+            per_component[owner or "other"] += own
+            if owner is not None:
+                by_component.setdefault(owner, []).append(
+                    (cumulative, f"{cumulative:9.3f} s cum {own:9.3f} s own {calls:>9} calls  "
+                                 f"{name} ({self._where(filename, line)})"))
+        out.write(f"{len(self._profiles)} threads profiled; own time (excluding callees) per component:\n")
+        for name, seconds in per_component.most_common():
+            out.write(f"{name:<20} {seconds:9.3f} s\n")
+        for name, _ in COMPONENTS:
+            if name in by_component:
+                out.write(f"\n== {name}: top functions by cumulative time ==\n")
+                for _, text in sorted(by_component[name], reverse=True)[:TOP_ENTRIES]:
+                    out.write(text + "\n")
+        out.write("\n== All functions by cumulative time ==\n")
+        stats.sort_stats("cumulative").print_stats(TOP_ENTRIES * 2)
+
+    @staticmethod
+    def _where(filename: str, line: int) -> str:
+        if filename.startswith(ROOT):
+            filename = os.path.relpath(filename, ROOT)
+        return f"{filename}:{line}"
+
+    def write_report(self) -> Optional[str]:
+        """Stop profiling and write the report; returns its path"""
+        self.stop()
+        try:
+            with open(self.out, "w", encoding="utf-8") as f:
+                f.write(self.report())
+            if self._profiles:
+                pstats.Stats(*self._profiles).dump_stats(os.path.splitext(self.out)[0] + ".pstats")
+        except (IOError, OSError) as e:
+            print(f"Error writing profile report: {e}", file=sys.stderr)
+            return None
+        print(f"Profile report written to {self.out}", file=sys.stderr)
+        return self.out
+
+
+def start_profiling(mode: str = "cprofile", out: Optional[str] = None) -> Profiler:
+    """Profile the rest of the process and write the report at exit"""
+    global _active
+    profiler = Profiler(mode, out)
+    _active = profiler
+    atexit.register(profiler.write_report)
+    # Termination by signal (e.g. stopping a server) should still write the report
+    if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    profiler.start()
+    return profiler
+
+
+def profile_from_argv(argv: List[str]) -> List[str]:
+    """Start profiling if argv has --profile[=mode] [--profile-out PATH]; returns argv without them"""
+    rest, mode, out = [], None, None
+    args = iter(argv)
+    for arg in args:
+        if arg == "--profile" or arg.startswith("--profile="):
+            mode = arg.partition("=")[2] or "cprofile"
+        elif arg == "--profile-out":
+            out = next(args, None)
+        elif arg.startswith("--profile-out="):
+            out = arg.partition("=")[2]
+        else:
+            rest.append(arg)
+    if mode is not None:
+        if mode not in PROFILE_MODES:
+            print(f"Unknown profile mode '{mode}': use one of {', '.join(PROFILE_MODES)}", file=sys.stderr)
+            sys.exit(2)
+        start_profiling(mode, out)
+    return rest
@@ -0,0 +1,90 @@
+"""Record filtering shared by export, the CLI and the other query paths.
+
+A query is one of:
+
+- ``None``: match every car
+- a string: case-insensitive substring of the model name (same as ``search``)
+- a dict of ``{field: value}``: every field must contain its value,
+  case-insensitively. ``year`` also accepts a ``"1950-1970"`` range.
+- a callable taking a ``Car`` and returning a bool
+
+Facet filters are a separate, exact-match form for the low-cardinality
+fields: ``{"category": "Racing", "country_of_origin": ["UK", "Italy"]}``
+keeps cars whose category is Racing and whose country is UK or Italy.
+"""
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from .models import ALLOWED_KEYS, Car
+
+FACET_FIELDS = ("category", "manufacturer", "country_of_origin", "replica_model")
+
+
+def _year_matcher(value: str) -> Callable[[str], bool]:
+    low, sep, high = value.partition("-")
+    if sep and low.strip().isdigit() and high.strip().isdigit():
+        lo, hi = int(low), int(high)
+        return lambda year: year.isdigit() and lo <= int(year) <= hi
+    return lambda year: value in year.lower()
+
+
+def normalize_query(query: Any) -> Any:
+    """Canonical, hashable form of a query (None, str or sorted tuple of pairs)"""
+    if query is None or callable(query):
+        return query
+    if isinstance(query, dict):
+        pairs = []
+        for field, value in query.items():
+            field = str(field).lower().replace(" ", "_")
+            if field not in ALLOWED_KEYS:
+                raise ValueError(f"Unknown field in query: {field}")
+            text = str(value).strip().lower()
+            if text:
+                pairs.append((field, text))
+        return tuple(sorted(pairs)) or None
+    return str(query).strip().lower() or None
+
+
+def compile_query(query: Any) -> Optional[Callable[[Car], bool]]:
+    """Turn a query into a predicate over Car objects, or None to match all"""
+    query = normalize_query(query)
+    if query is None:
+        return None
+    if callable(query):
+        return query
+    if isinstance(query, str):
+        return lambda car: query in car.model.lower()
+
+    matchers: Dict[str, Callable[[str], bool]] = {}
+    for field, text in query:
+        if field == "year":
+            matchers[field] = _year_matcher(text)
+        else:
+            matchers[field] = lambda value, text=text: text in value.lower()
+
+    def predicate(car: Car) -> bool:
+        return all(match(str(getattr(car, field))) for field, match in matchers.items())
+
+    return predicate
+
+
+def normalize_facets(filters: Any) -> Dict[str, FrozenSet[str]]:
+    """Facet filters as {field: casefolded values}, dropping empty selections"""
+    normalized = {}
+    for field, values in (filters or {}).items():
+        field = str(field).lower().replace(" ", "_")
+        if field not in FACET_FIELDS:
+            raise ValueError(f"Not a facet field: {field}")
+        if isinstance(values, str):
+            values = [values]
+        wanted = frozenset(str(value).strip().casefold() for value in values)
+        if wanted:
+            normalized[field] = wanted
+    return normalized
+
+
+def facet_predicate(filters: Any) -> Optional[Callable[[Car], bool]]:
+    """Predicate equivalent to the bitmap facet lookup, for scans"""
+    filters = normalize_facets(filters)
+    if not filters:
+        return None
+    return lambda car: all(getattr(car, field).strip().casefold() in wanted for field, wanted in filters.items())
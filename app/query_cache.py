@@ -0,0 +1,116 @@
+"""Results of queries and searches, reused until the collection changes.
+
+Entries are keyed by the collection version and a normalized form of the
+query, so a change to the collection makes every older entry unreachable;
+those are dropped as soon as a newer version is seen. The cache is bounded
+by entry count and by the approximate memory of the cached results, evicting
+the least recently used entries first.
+
+Cached rows are FrozenRow dicts, so a hit hands out the cached rows
+themselves instead of copies; only the list holding them is new.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Sequence
+
+QUERY_CACHE_ENTRIES = 256
+QUERY_CACHE_BYTES = 16 << 20
+
+
+class FrozenRow(dict):
+    """A result row that can't be changed; copy it with dict(row) to get one that can"""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("cached result rows are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenRow, (dict(self),)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+
+def freeze_rows(results: Iterable[dict]) -> List[FrozenRow]:
+    """results as a new list of FrozenRows (rows that already are one are not copied)"""
+    return [row if isinstance(row, FrozenRow) else FrozenRow(row) for row in results]
+
+
+def estimate_size(results: Sequence[dict]) -> int:
+    """Approximate bytes held by a list of result dicts (keys are shared, values are not)"""
+    size = sys.getsizeof(results)
+    for row in results:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return size
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_ENTRIES, max_bytes: int = QUERY_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._version = None
+        # key -> (tuple of FrozenRows, size)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _see_version(self, version) -> bool:
+        """Drop entries of older versions; False if version is itself older than the cache"""
+        if self._version is None or version > self._version:
+            self._entries.clear()
+            self.size = 0
+            self._version = version
+        return version == self._version
+
+    def get(self, version, key: Hashable) -> Optional[List[FrozenRow]]:
+        """The cached results for key at this version in a new list, or None"""
+        with self._lock:
+            entry = self._entries.get(key) if self._see_version(version) else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return list(entry[0])
+
+    def put(self, version, key: Hashable, results: Iterable[dict]) -> None:
+        """Cache results for key; rows that aren't FrozenRows yet are copied into one"""
+        results = tuple(freeze_rows(results))
+        size = estimate_size(results)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if not self._see_version(version):
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (results, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
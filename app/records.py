@@ -0,0 +1,431 @@
+"""Cars read from the store on demand, for memory-budgeted mode.
+
+CarTracker normally keeps every car of the collection decoded as a Car.
+With a memory budget (CarTracker(memory_budget=MiB) or the
+CARDB_MEMORY_BUDGET environment variable, in MiB) it keeps a CarRecords
+instead: the store file stays open and only the byte offset, length and id
+of each record are resident. A car is decoded from the file when it is
+accessed, and decoded cars are kept in an LRU cache bounded by the budget.
+Iterating reads the file in blocks and decodes each car in turn without
+filling the cache.
+
+Saving streams the records to the store one at a time, noting their new
+offsets as it goes, so neither the full JSON text nor a second copy of the
+collection is built. The open file keeps a replaced store readable until
+nothing refers to its records any more (POSIX semantics, as on Android and
+iOS). Windows can't replace a file that is open, so the budget is ignored
+there and every car is loaded.
+
+Only plain JSON stores can be read at an offset; compressed ones
+(.gz/.zst) are loaded in full as usual.
+"""
+import json
+import os
+import sys
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .data import FileIO
+from .data.file_io import json_record_encoder
+from .models import Car
+
+MEMORY_BUDGET_ENV = "CARDB_MEMORY_BUDGET"
+# Bytes read at a time when scanning the store and when iterating over it
+SCAN_CHUNK = 1 << 20
+READ_BLOCK = 1 << 16
+STORE_INDENT = 2
+# Saving replaces the store while its old file is still open for reading
+REPLACES_OPEN_FILES = os.name != "nt"
+
+
+def budget_bytes(mib=None) -> Optional[int]:
+    """Bytes of a budget in MiB (CARDB_MEMORY_BUDGET when None); None when unset, zero, invalid or unsupported"""
+    if mib is None:
+        mib = os.environ.get(MEMORY_BUDGET_ENV)
+    try:
+        mib = float(mib)
+    except (TypeError, ValueError):
+        return None
+    if mib <= 0:
+        return None
+    if not REPLACES_OPEN_FILES:
+        print("Memory budget ignored: this system can't replace the store while it is open")
+        return None
+    return int(mib * 2**20)
+
+
+def car_size(car: Car) -> int:
+    """Approximate bytes held by a decoded car"""
+    fields = vars(car)
+    return sys.getsizeof(car) + sys.getsizeof(fields) + sum(sys.getsizeof(value) for value in fields.values())
+
+
+def _decode(data: bytes) -> Car:
+    return Car.from_dict(json.loads(data))
+
+
+class StoreFile:
+    """An open store file: where each record is, and an LRU cache of decoded cars"""
+
+    def __init__(self, path: str, file, offsets: array, lengths: array, ids: List[str], budget: int,
+                 canonical: bool = False):
+        self.path = path
+        self.offsets = offsets
+        self.lengths = lengths
+        self.ids = ids
+        # id -> position; with repeated ids the last one wins, as in CarsById
+        self.positions = {car_id: position for position, car_id in enumerate(ids)}
+        self.budget = budget
+        # True when every record is laid out as CarRecords.write lays it out
+        # (as opposed to a store written by hand or another tool), so saving
+        # can copy unchanged records without decoding them
+        self.canonical = canonical
+        self.size = 0
+        # position -> (car, approximate bytes), least recently used first
+        self.cache: OrderedDict = OrderedDict()
+        self._file = file
+        self._lock = threading.Lock()
+        weakref.finalize(self, file.close)
+
+    @classmethod
+    def scan(cls, path: str, budget: int) -> Optional["StoreFile"]:
+        """Open a plain JSON store and find its records, or None if it must be loaded the regular way.
+
+        That is the case for compressed stores (which can't be read at an
+        offset), damaged ones and ones with records lacking an id: the
+        regular load recovers the first and gives the others ids.
+        """
+        if FileIO.compression(path) is not None:
+            return None
+        try:
+            f = open(path, 'rb', buffering=0)
+        except OSError:
+            return None
+        try:
+            spans = cls._scan_records(f)
+        except (OSError, ValueError):
+            spans = None
+        if spans is None:
+            f.close()
+            return None
+        return cls(path, f, *spans, budget)
+
+    @staticmethod
+    def _scan_records(f):
+        """(offsets, lengths, ids) of the records of a JSON array file, or None.
+
+        The file is decoded as latin-1, which maps every byte to one
+        character, so positions in the text are byte offsets in the file.
+        JSON syntax is ASCII, so records are delimited exactly; only an id
+        that isn't ASCII is decoded again from its record's UTF-8 bytes.
+        """
+        decoder = json.JSONDecoder()
+        whitespace = ' \t\r\n,'
+        offsets, lengths, ids = array('q'), array('q'), []
+        # buf holds the file's bytes from offset base on
+        buf, base, pos = "", 0, 0
+        started = eof = False
+        while True:
+            while pos < len(buf) and buf[pos] in whitespace:
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    return None  # the array is cut off
+                chunk = f.read(SCAN_CHUNK)
+                eof = not chunk
+                buf, base, pos = buf[pos:] + chunk.decode('latin-1'), base + pos, 0
+                continue
+            if not started:
+                if buf[pos] != '[':
+                    return None
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return offsets, lengths, ids
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    return None
+                chunk = f.read(SCAN_CHUNK)
+                eof = not chunk
+                buf, base, pos = buf[pos:] + chunk.decode('latin-1'), base + pos, 0
+                continue
+            if end == len(buf) and not eof:
+                # A scalar may continue in the next chunk; re-read it whole
+                chunk = f.read(SCAN_CHUNK)
+                if chunk:
+                    buf, base, pos = buf[pos:] + chunk.decode('latin-1'), base + pos, 0
+                    continue
+                eof = True
+            if isinstance(item, dict):
+                car_id = str(item.get("id", "")).strip()
+                if not car_id:
+                    return None
+                if not car_id.isascii():
+                    car_id = _decode(buf[pos:end].encode('latin-1')).id
+                offsets.append(base + pos)
+                lengths.append(end - pos)
+                ids.append(car_id)
+            pos = end
+            if pos > SCAN_CHUNK:
+                buf, base, pos = buf[pos:], base + pos, 0
+
+    def read(self, offset: int, length: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self._file.fileno(), length, offset)
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def cached(self, position: int, touch: bool = True) -> Optional[Car]:
+        with self._lock:
+            entry = self.cache.get(position)
+            if entry is None:
+                return None
+            if touch:
+                self.cache.move_to_end(position)
+            return entry[0]
+
+    def remember(self, position: int, car: Car) -> None:
+        size = car_size(car)
+        with self._lock:
+            old = self.cache.pop(position, None)
+            if old is not None:
+                self.size -= old[1]
+            self.cache[position] = (car, size)
+            self.size += size
+            while self.size > self.budget:
+                _, (_, evicted) = self.cache.popitem(last=False)
+                self.size -= evicted
+
+    def car(self, position: int) -> Car:
+        """The car at a position, from the cache or decoded from the file (and then cached)"""
+        car = self.cached(position)
+        if car is None:
+            car = _decode(self.read(self.offsets[position], self.lengths[position]))
+            self.remember(position, car)
+        return car
+
+    def iter_raw(self, positions: Iterable[int]) -> Iterator[Tuple[int, bytes]]:
+        """(position, record bytes) for positions, read in blocks"""
+        block, block_start = b"", 0
+        for position in positions:
+            offset, length = self.offsets[position], self.lengths[position]
+            start = offset - block_start
+            if start < 0 or start + length > len(block):
+                block, block_start, start = self.read(offset, max(length, READ_BLOCK)), offset, 0
+            yield position, block[start:start + length]
+
+    def iter_cars(self, positions: Iterable[int]) -> Iterator[Car]:
+        """Cars at positions; cached cars are used but nothing new is cached"""
+        for position, data in self.iter_raw(positions):
+            car = self.cached(position)
+            yield car if car is not None else _decode(data)
+
+
+class CarRecords(Sequence):
+    """The cars of a store file as a sequence, decoded when accessed.
+
+    A copy (see CarTracker._load_cars) can be changed like a list with
+    append, remove, del and item assignment; the changes stay in memory
+    until the copy is written with CarRecords.write.
+    """
+
+    def __init__(self, store: StoreFile, entries: Optional[array] = None, placed: Optional[List[Car]] = None):
+        self._store = store
+        # Store positions in order; an entry -1 - n stands for placed[n], a car put there by a change
+        self._entries = entries if entries is not None else array('q', range(len(store.ids)))
+        self._placed = placed if placed is not None else []
+
+    @classmethod
+    def open(cls, path: str, budget: int) -> Optional["CarRecords"]:
+        """Records of a plain JSON store, or None if it must be loaded in full (see StoreFile.scan)"""
+        store = StoreFile.scan(path, budget)
+        return cls(store) if store is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _car(self, entry: int) -> Car:
+        return self._store.car(entry) if entry >= 0 else self._placed[-1 - entry]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._car(entry) for entry in self._entries[index]]
+        return self._car(self._entries[index])
+
+    def __iter__(self) -> Iterator[Car]:
+        stored = self._store.iter_cars(entry for entry in self._entries if entry >= 0)
+        for entry in self._entries:
+            yield next(stored) if entry >= 0 else self._placed[-1 - entry]
+
+    def _place(self, car: Car) -> int:
+        self._placed.append(car)
+        return -len(self._placed)
+
+    def __setitem__(self, index: int, car: Car) -> None:
+        self._entries[index] = self._place(car)
+
+    def __delitem__(self, index) -> None:
+        del self._entries[index]
+
+    def append(self, car: Car) -> None:
+        self._entries.append(self._place(car))
+
+    def index(self, car: Car, start: int = 0, stop: Optional[int] = None) -> int:
+        """Position of car; a stored car is found by its id without decoding the others"""
+        stop = len(self) if stop is None else stop
+        position = self._store.positions.get(car.id)
+        if position is not None:
+            try:
+                index = self._entries.index(position, start, stop)
+            except ValueError:
+                pass
+            else:
+                if self._car(position) == car:
+                    return index
+        for index, entry in enumerate(self._entries[start:stop], start):
+            if entry < 0 and self._placed[-1 - entry] == car:
+                return index
+        return super().index(car, start, stop)
+
+    def remove(self, car: Car) -> None:
+        del self[self.index(car)]
+
+    def _records(self) -> Iterator[Tuple[str, Optional[bytes], Optional[Car]]]:
+        """(id, JSON bytes, car) per entry, for writing.
+
+        Records of a canonical store are passed on as bytes, with their car
+        only if it is cached; other cars come without bytes, to be encoded.
+        """
+        store = self._store
+        if not store.canonical:
+            for car in self:
+                yield car.id, None, car
+            return
+        stored = store.iter_raw(entry for entry in self._entries if entry >= 0)
+        for entry in self._entries:
+            if entry >= 0:
+                _, data = next(stored)
+                yield store.ids[entry], data, store.cached(entry, touch=False)
+            else:
+                car = self._placed[-1 - entry]
+                yield car.id, None, car
+
+    def copy(self) -> "CarRecords":
+        return CarRecords(self._store, array('q', self._entries), list(self._placed))
+
+    def _unchanged(self) -> bool:
+        return not self._placed and len(self._entries) == len(self._store.ids)
+
+    def by_id(self) -> Mapping:
+        """id -> Car lookup that decodes a car only when it is looked up"""
+        if self._unchanged():
+            return RecordsById(self._store)
+        return {car.id: car for car in self}
+
+    def select(self, car_ids: Iterable[str]) -> Iterator[Car]:
+        """The cars with these ids, in store order, decoded as they are iterated"""
+        if not self._unchanged():
+            wanted = set(car_ids)
+            return (car for car in self if car.id in wanted)
+        positions = self._store.positions
+        return self._store.iter_cars(sorted({positions[car_id] for car_id in car_ids if car_id in positions}))
+
+    @classmethod
+    def write(cls, path: str, cars: Iterable[Car], budget: int, backups: int = 0,
+              previous: Optional["CarRecords"] = None) -> Optional["CarRecords"]:
+        """Write cars to a plain JSON store and return the records of the new file, or None on failure.
+
+        Records are encoded and written one at a time, laid out exactly as
+        FileIO.write_json lays them out, and their spans are noted on the
+        way; unchanged records of a store written this way are copied as
+        they are. Cars that were cached in previous stay cached.
+        """
+        encode = json_record_encoder(STORE_INDENT)
+        separator = (",\n" + " " * STORE_INDENT).encode()
+        offsets, lengths, ids, cached = array('q'), array('q'), [], []
+        hot = set()
+        if isinstance(previous, CarRecords):
+            with previous._store._lock:
+                hot = {id(car) for car, _ in previous._store.cache.values()}
+
+        records = cars._records() if isinstance(cars, CarRecords) else ((car.id, None, car) for car in cars)
+
+        def chunks():
+            offset = 0
+            for car_id, data, car in records:
+                if data is None:
+                    data = encode(car.to_dict()).encode('utf-8')
+                prefix = separator if ids else b"[" + separator[1:]
+                offset += len(prefix)
+                offsets.append(offset)
+                lengths.append(len(data))
+                if car is not None and id(car) in hot:
+                    cached.append((len(ids), car))
+                ids.append(car_id)
+                offset += len(data)
+                yield prefix + data
+            yield b"\n]" if ids else b"[]"
+
+        if not FileIO.write_chunks(path, chunks(), backups):
+            return None
+        try:
+            f = open(path, 'rb', buffering=0)
+        except OSError as e:
+            print(f"Error reopening store: {e}")
+            return None
+        store = StoreFile(path, f, offsets, lengths, ids, budget, canonical=True)
+        for position, car in cached:
+            store.remember(position, car)
+        return cls(store)
+
+
+class RecordsById(Mapping):
+    """id -> Car over a store file, decoding each car as it is looked up"""
+
+    def __init__(self, store: StoreFile):
+        self._store = store
+
+    def __getitem__(self, car_id: str) -> Car:
+        return self._store.car(self._store.positions[car_id])
+
+    def __contains__(self, car_id) -> bool:
+        return car_id in self._store.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.positions)
+
+    def __len__(self) -> int:
+        return len(self._store.positions)
+
+
+class CarDicts(Sequence):
+    """Read-only sequence of car dicts over a list of cars or CarRecords, made as they are accessed"""
+
+    def __init__(self, cars, with_ids: bool = False):
+        self._cars = cars
+        self._with_ids = with_ids
+
+    def _dict(self, car: Car) -> dict:
+        d = car.to_dict()
+        if not self._with_ids:
+            d.pop('id', None)
+        return d
+
+    def __len__(self) -> int:
+        return len(self._cars)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._dict(car) for car in self._cars[index]]
+        return self._dict(self._cars[index])
+
+    def __iter__(self) -> Iterator[dict]:
+        return map(self._dict, self._cars)
@@ -0,0 +1,114 @@
+"""Photo attachments: dedup, thumbnail latency per cache tier and disk-cache bounds.
+
+Usage: python benchmarks/bench_attachments.py [--photos 200] [--duplicates 0.25] [--disk-kib 256]
+
+Needs Pillow to draw the synthetic photos (and to make real thumbnails).
+Attaches --photos camera-sized JPEGs to as many cars, a share of them
+re-attached to a second car, then fetches each car's thumbnail the way the
+app's cards do: first from a fresh store (read from disk), again (memory
+LRU), and after deleting the thumbnails (regenerated from the originals).
+A last pass with a --disk-kib disk limit checks the thumbs directory stays
+under it.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import synthetic  # noqa: F401  (puts the repository root on sys.path)
+from synthetic import percentile
+from app.attachments import AttachmentStore
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+
+def make_photo(path, rng, size=(1600, 1200)):
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.ellipse((x, y, x + rng.randrange(50, 400), y + rng.randrange(50, 400)),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    image.save(path, "JPEG", quality=90)
+
+
+def timed_thumbnails(store, car_ids):
+    timings = []
+    for car_id in car_ids:
+        start = time.perf_counter()
+        photos = store.photos(car_id)
+        if photos:
+            store.thumbnail(photos[0])
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--duplicates", type=float, default=0.25, help="share of photos attached to a second car")
+    parser.add_argument("--disk-kib", type=int, default=256, help="thumbnail disk limit for the eviction pass")
+    args = parser.parse_args()
+    if Image is None:
+        raise SystemExit("This benchmark needs Pillow (pip install pillow)")
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "car.json")
+        sources = []
+        for i in range(args.photos):
+            sources.append(os.path.join(tmp, f"photo{i}.jpg"))
+            make_photo(sources[-1], rng)
+        source_bytes = sum(os.path.getsize(path) for path in sources)
+
+        store = AttachmentStore(store_path)
+        car_ids = [f"car-{i}" for i in range(args.photos)]
+        start = time.perf_counter()
+        for car_id, path in zip(car_ids, sources):
+            store.add(car_id, path)
+        duplicates = int(args.photos * args.duplicates)
+        for i in range(duplicates):
+            car_ids.append(f"copy-{i}")
+            store.add(car_ids[-1], sources[i])
+        add_elapsed = time.perf_counter() - start
+        objects = directory_size(os.path.join(store.dir, "objects"))
+        thumbs = directory_size(os.path.join(store.dir, "thumbs"))
+
+        cold = timed_thumbnails(AttachmentStore(store_path), car_ids)
+        warm_store = AttachmentStore(store_path)
+        timed_thumbnails(warm_store, car_ids)
+        warm = timed_thumbnails(warm_store, car_ids)
+        for root, _, names in os.walk(os.path.join(store.dir, "thumbs")):
+            for name in names:
+                os.remove(os.path.join(root, name))
+        regenerated = timed_thumbnails(AttachmentStore(store_path), car_ids)
+
+        bounded = AttachmentStore(store_path, disk_bytes=args.disk_kib * 1024)
+        for root, _, names in os.walk(os.path.join(store.dir, "thumbs")):
+            for name in names:
+                os.remove(os.path.join(root, name))
+        timed_thumbnails(bounded, car_ids)
+        bounded_size = directory_size(os.path.join(store.dir, "thumbs"))
+
+    print(f"attached:        {len(car_ids)} photos ({duplicates} duplicates) in {add_elapsed:.1f} s, "
+          f"thumbnails included")
+    print(f"stored:          {objects / 2**20:.1f} MiB of originals for {len(car_ids)} attachments of "
+          f"{source_bytes / 2**20:.1f} MiB distinct photos, {thumbs / 1024:.0f} KiB of thumbnails "
+          f"({thumbs / args.photos / 1024:.1f} KiB each)")
+    for label, values in (("disk hit:", cold), ("memory hit:", warm), ("regenerated:", regenerated)):
+        print(f"{label:<16} p50 {percentile(values, 0.5):.3f} ms  p95 {percentile(values, 0.95):.3f} ms")
+    print(f"disk limit:      {bounded_size / 1024:.0f} KiB used of {args.disk_kib} KiB")
+    print(f"10 visible cards: {10 * thumbs / args.photos / 1024:.0f} KiB of thumbnails "
+          f"instead of {10 * source_bytes / args.photos / 2**20:.1f} MiB of originals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compressed store benchmark: file size against save and load time.
+
+Usage: python benchmarks/bench_compression.py [--cars 100000]
+
+Writes the same synthetic collection as plain JSON, gzip and (when the
+zstandard package is installed) zstd, then times a save, a full load and a
+streaming pass over the records (the path export and large scans use).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic import make_cars
+
+from app.data import COMPRESSIONS, FileIO
+from app.data.file_io import zstandard
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=100_000)
+    args = parser.parse_args()
+
+    cars = make_cars(args.cars)
+    variants = [("plain", "")] + [(name, suffix) for name, suffix in COMPRESSIONS.items()
+                                  if name != "zstd" or zstandard is not None]
+    print(f"cars:            {args.cars}")
+    print(f"{'store':<10} {'size':>10} {'ratio':>7} {'save':>8} {'load':>8} {'stream':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_size = None
+        for name, suffix in variants:
+            path = os.path.join(tmp, "car.json" + suffix)
+            save, _ = timed(lambda: FileIO.write_json(path, cars))
+            size = os.path.getsize(path)
+            plain_size = plain_size or size
+            load, loaded = timed(lambda: FileIO.read_json(path))
+            stream, count = timed(lambda: sum(1 for _ in FileIO.iter_json(path)))
+            assert len(loaded) == count == args.cars
+            print(f"{name:<10} {size / 1e6:>8.1f}MB {plain_size / size:>6.1f}x "
+                  f"{save:>7.2f}s {load:>7.2f}s {stream:>7.2f}s")
+    if zstandard is None:
+        print("zstd skipped (pip install zstandard)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Near-duplicate detection benchmark: pass time, recall and precision.
+
+Usage: python benchmarks/bench_dedup.py [--cars 100000] [--duplicates 2000]
+
+Adds rewritten copies of random cars to a synthetic collection, the way a
+second dealer feed would list them: manufacturer moved into or out of the
+model name, the year written as '67 in the model, words reordered or
+dropped. Recall is the share of copies found in the same cluster as their
+original; precision is the share of reported clusters that are exactly one
+original and its copy.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from synthetic import make_cars
+
+from app import CarTracker
+
+
+def rewrite(car, rng):
+    """A near-duplicate of car as another feed might list it"""
+    words = car["model"].split()
+    manufacturer = car["manufacturer"]
+    if words[:len(manufacturer.split())] == manufacturer.split():
+        words = words[len(manufacturer.split()):]
+    copy = dict(car, id="")
+    edit = rng.choice(("short_year", "no_maker", "reorder", "drop_word"))
+    if edit == "short_year":
+        words.append(f"'{car['year'][2:]}")
+        copy["year"] = ""
+    elif edit == "no_maker":
+        copy["manufacturer"] = ""
+        words.insert(0, manufacturer)
+    elif edit == "reorder":
+        rng.shuffle(words)
+    elif len(words) > 3:
+        del words[rng.randrange(len(words) - 1)]
+    copy["model"] = " ".join(words)
+    copy["info"] = ""
+    return copy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=100_000)
+    parser.add_argument("--duplicates", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    cars = make_cars(args.cars)
+    originals = rng.sample(range(len(cars)), args.duplicates)
+    copies = [rewrite(cars[i], rng) for i in originals]
+    expected = {cars[i]["model"]: copy["model"] for i, copy in zip(originals, copies)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "car.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cars + copies, f)
+        tracker = CarTracker(path)
+        tracker.displayData()
+
+        start = time.perf_counter()
+        clusters = tracker.findDuplicates()
+        elapsed = time.perf_counter() - start
+
+    found = 0
+    exact = 0
+    for cluster in clusters:
+        models = {car["model"] for car in cluster["cars"]}
+        hits = sum(1 for original, copy in expected.items() if original in models and copy in models)
+        found += hits
+        exact += hits == 1 and len(cluster["cars"]) == 2
+
+    print(f"cars:            {args.cars + args.duplicates} ({args.duplicates} rewritten copies)")
+    print(f"dedup pass:      {elapsed:.2f} s")
+    print(f"clusters:        {len(clusters)}")
+    print(f"recall:          {found / args.duplicates:.1%}")
+    print(f"precision:       {exact / len(clusters):.1%}" if clusters else "precision:       n/a")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Durability benchmark: cost of each fsync policy and recovery of a damaged store.
+
+Usage: python benchmarks/bench_durability.py [--cars 2000] [--changes 100]
+
+Each policy writes what a single-car change writes (the store with its
+backup rotation, plus one journal line) the given number of times and
+reports the time per change; the batched policy includes its final sync.
+Serializing the cars is left out, so the numbers are the I/O cost alone.
+The recovery run cuts off the end of the store, garbles a block in the
+middle and times reading it back.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic import make_cars, percentile, write_store
+
+from app import CarTracker
+from app.car_handler import BACKUP_GENERATIONS
+from app.data import FSYNC_POLICIES, FileIO
+
+
+def run_policy(policy, tmp, records, changes):
+    FileIO.set_fsync_policy(policy)
+    store = os.path.join(tmp, policy, "car.json")
+    journal = os.path.join(tmp, policy, "car.journal.jsonl")
+    timings = []
+    start = time.perf_counter()
+    for i in range(changes):
+        began = time.perf_counter()
+        FileIO.write_json(store, records, backups=BACKUP_GENERATIONS)
+        FileIO.append_json_lines(journal, [{"op": "do", "entry": {"seq": i, "changes": [[None, records[i % len(records)]]]}}])
+        timings.append((time.perf_counter() - began) * 1000)
+    FileIO.sync()
+    total = time.perf_counter() - start
+    return total, timings
+
+
+def run_recovery(tmp, cars):
+    path = write_store(os.path.join(tmp, "recovery", "car.json"), cars)
+    tracker = CarTracker(path)
+    tracker.displayData()
+    tracker.addData("Durability Test", "Ford", "1967", "USA", "Coupe", "Matchbox", "")
+    with open(path, "rb") as f:
+        data = f.read()
+    middle = len(data) // 2
+    data = data[:middle] + b'\x00{"model": ' + data[middle + 500:]
+    with open(path, "wb") as f:
+        f.write(data[:int(len(data) * 0.9)])
+
+    start = time.perf_counter()
+    recovered = CarTracker(path).displayData()
+    return time.perf_counter() - start, len(recovered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--changes", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"cars:            {args.cars}")
+        records = make_cars(args.cars)
+        for policy in FSYNC_POLICIES:
+            total, timings = run_policy(policy, tmp, records, args.changes)
+            print(f"{policy + ':':<16} {total / args.changes * 1000:.2f} ms/change "
+                  f"(p95 {percentile(timings, 0.95):.2f} ms)")
+        elapsed, recovered = run_recovery(tmp, args.cars)
+        print(f"recovery:        {recovered} of {args.cars + 1} cars in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
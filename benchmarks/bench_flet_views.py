@@ -0,0 +1,92 @@
+"""Headless Flet view benchmark: build time, control count and memory per card.
+
+Usage: python benchmarks/bench_flet_views.py [--sizes 100 1000 10000 50000] [--rounds 5]
+
+Runs FletApp against a stub page (no Flet client or window needed) on
+synthetic collections of each size and reports, as medians over --rounds:
+
+- start:    FletApp.main up to the first main view (includes loading the store)
+- main:     create_main_view with a forced refresh
+- cards:    _create_car_cards_optimized for the first page (10 cards) and for 100
+- tabs:     one round of navigation-bar switches / -> /search -> /add_car -> /
+- edit:     route_change to /edit_car/<id>, as a card's Edit button does
+- controls: controls in the main view and per car card
+- KiB/card: memory held per card (tracemalloc)
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import make_cars, percentile, write_store
+
+from app import CarTracker
+from interfaces.flet_app import FletApp
+from tests.stubs import StubPage
+
+
+def count_controls(control):
+    return 1 + sum(count_controls(child) for child in control._get_children())
+
+
+def timed(action, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return percentile(timings, 0.5)
+
+
+def measure(size, rounds, tmp):
+    store = write_store(os.path.join(tmp, f"car-{size}.json"), size)
+    app = FletApp(CarTracker(store))
+    page = StubPage()
+    start = time.perf_counter()
+    app.main(page)
+    first = (time.perf_counter() - start) * 1000
+    main_controls = count_controls(page.views[-1])
+
+    cars = app._live_current_cars()
+    main = timed(lambda: app.create_main_view(force_refresh=True), rounds)
+    cards_10 = timed(lambda: app._create_car_cards_optimized(cars), rounds)
+    app._max_cards_initial = 100
+    cards_100 = timed(lambda: app._create_car_cards_optimized(cars), rounds)
+    app._max_cards_initial = 10
+    per_card = count_controls(app._create_car_card(cars[0]))
+
+    def tabs():
+        for route in ("/search", "/add_car", "/"):
+            page.go(route)
+
+    tab_switch = timed(tabs, rounds)
+    edit = timed(lambda: page.go(f"/edit_car/{cars[len(cars) // 2]['id']}"), rounds)
+
+    sample = make_cars(200, seed=size)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = [app._create_car_card(car) for car in sample]
+    card_bytes = (tracemalloc.get_traced_memory()[0] - before) / len(built)
+    tracemalloc.stop()
+    return [size, first, main, cards_10, cards_100, tab_switch, edit, main_controls, per_card, card_bytes / 1024]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10_000, 50_000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    header = ("cars", "start", "main", "10 cards", "100 cards", "tabs", "edit", "controls", "/card", "KiB/card")
+    print(f"{header[0]:>8} " + " ".join(f"{h:>10}" for h in header[1:]))
+    print(f"{'':>8} " + " ".join(f"{'ms':>10}" for _ in header[1:7]))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            row = measure(size, args.rounds, tmp)
+            print(f"{row[0]:>8} " + " ".join(f"{v:>10.1f}" for v in row[1:7])
+                  + f" {row[7]:>10} {row[8]:>10} {row[9]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
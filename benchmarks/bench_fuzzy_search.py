@@ -0,0 +1,70 @@
+"""Fuzzy search benchmark: index build time and query latency.
+
+Usage: python benchmarks/bench_fuzzy_search.py [--cars 100000] [--queries 200]
+
+The target is a p95 query latency under 10 ms at 100k cars once the index is
+built (changes patch the index instead of rebuilding it).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from synthetic import MANUFACTURERS, percentile, write_store
+
+from app import CarTracker
+
+
+def typo(word, rng):
+    """Apply one random transposition, deletion or substitution"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("swap", "drop", "sub"))
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    return word[:i] + rng.choice("aeiourstn") + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    queries = []
+    for _ in range(args.queries):
+        manufacturer = rng.choice(list(MANUFACTURERS))
+        model = rng.choice(MANUFACTURERS[manufacturer][1])
+        words = f"{manufacturer} {model}".split()
+        queries.append(" ".join(typo(word, rng) for word in rng.sample(words, min(2, len(words)))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = CarTracker(write_store(os.path.join(tmp, "car.json"), args.cars))
+
+        start = time.perf_counter()
+        tracker.fuzzySearch("warmup")
+        build = time.perf_counter() - start
+
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            tracker.fuzzySearch(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+        example = tracker.fuzzySearch(queries[0], limit=1)
+
+    print(f"cars:            {args.cars}")
+    print(f"load + index:    {build:.2f} s")
+    print(f"query p50:       {percentile(timings, 0.50):.2f} ms")
+    print(f"query p95:       {percentile(timings, 0.95):.2f} ms")
+    print(f"query max:       {max(timings):.2f} ms")
+    if example:
+        print(f"example:         {queries[0]!r} -> {example[0]['model']!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Link checker against local stub HTTP servers: throughput, limits and cache.
+
+Usage: python benchmarks/bench_links.py [--cars 2000] [--hosts 4] [--delay 0.05]
+
+Runs against the stub hosts of tests/stubs.py, which answer after --delay
+seconds. The store gets one car per URL; every path kind's result is
+verified, the highest number of concurrent requests seen per host is
+compared with the limit, and a second run must be answered entirely from
+the result cache.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+import synthetic  # noqa: F401  (puts the repository root on sys.path)
+from app import CarTracker
+from tests.stubs import serve_stubs
+
+KINDS = {"ok": "ok", "gone": "broken", "nohead": "ok", "moved": "ok", "flaky": "error"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds each stub response takes")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0, help="requests per second per host (default: unlimited)")
+    args = parser.parse_args()
+
+    stubs, stop = serve_stubs(args.hosts, args.delay)
+
+    kinds = list(KINDS)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "car.json")
+        cars, expected = [], {}
+        for i in range(args.cars):
+            kind = kinds[i % len(kinds)]
+            _, port = stubs[i % len(stubs)]
+            url = f"http://127.0.0.1:{port}/{kind}/{i}"
+            cars.append({"id": f"car-{i}", "model": f"Model {i}", "manufacturer": "Stub", "info": url})
+            expected[f"Model {i}"] = KINDS[kind]
+        with open(store, "w", encoding="utf-8") as f:
+            json.dump(cars, f)
+
+        tracker = CarTracker(store)
+        start = time.perf_counter()
+        rows = tracker.checkLinks(connections=args.connections, per_host=args.per_host, rate=args.rate)
+        elapsed = time.perf_counter() - start
+        wrong = [row for row in rows if row["state"] != expected[row["model"]]]
+        head = sum(stub.requests["HEAD"] for stub, _ in stubs)
+        get = sum(stub.requests["GET"] for stub, _ in stubs)
+
+        start = time.perf_counter()
+        cached = tracker.checkLinks(connections=args.connections, per_host=args.per_host, rate=args.rate)
+        cached_elapsed = time.perf_counter() - start
+        requests_after = sum(sum(stub.requests.values()) for stub, _ in stubs)
+    stop()
+
+    sequential = (head + get) * args.delay
+    print(f"urls:            {len(rows)} on {args.hosts} hosts ({args.delay * 1000:.0f} ms per response)")
+    print(f"limits:          {args.connections} connections, {args.per_host} per host"
+          + (f", {args.rate:g}/s per host" if args.rate else ""))
+    print(f"first run:       {elapsed:.2f} s, {head} HEAD + {get} GET "
+          f"(one at a time would take ~{sequential:.0f} s)")
+    print(f"peak per host:   {max(stub.peak for stub, _ in stubs)} concurrent requests")
+    print("states:          " + ", ".join(f"{s}: {n}" for s, n in sorted(Counter(r['state'] for r in rows).items())))
+    print(f"misclassified:   {len(wrong)}")
+    print(f"cached run:      {cached_elapsed:.2f} s, {sum(r['cached'] for r in cached)}/{len(cached)} from cache, "
+          f"{requests_after - head - get} new requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Memory-budgeted mode: resident and peak memory of an app session, with and without a budget.
+
+Usage: python benchmarks/bench_memory_budget.py [--cars 100000] [--budget 8]
+
+Runs the same headless Flet session (see bench_flet_views.py) in a fresh
+process per mode, so each starts from a clean heap: start the app (load the
+store and build the main view), search, open a car's edit view and save it,
+add a car, delete it and show more cards. Reports the resident set (RSS)
+after each step, how long it took and the peak RSS of the whole session,
+once with every car decoded (the default) and once with --budget MiB of
+decoded cars (CarTracker(memory_budget=...), as mobile_app.py sets it).
+Both runs start with the secondary index sidecar built, as after a first
+run of the app. Reads /proc/self/status, so it needs Linux (or Android).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import write_store
+
+
+def status(field):
+    """A VmRSS / VmHWM style field of /proc/self/status, in MiB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise OSError(f"{field} not found in /proc/self/status")
+
+
+def session(store, budget):
+    """Child process: run the session and print one JSON line of (step, RSS MiB, ms)"""
+    from tests.stubs import StubPage
+
+    from app import CarTracker
+    from interfaces.flet_app import FletApp
+
+    steps = [("imports", status("VmRSS"), 0.0)]
+    app = FletApp(CarTracker(store, memory_budget=budget))
+    page = StubPage()
+    tracker = app.car_tracker
+
+    def step(name, action):
+        start = time.perf_counter()
+        action()
+        steps.append((name, status("VmRSS"), (time.perf_counter() - start) * 1000))
+
+    step("start", lambda: app.main(page))
+    car = app._live_current_cars()[3]
+    step("search", lambda: app.create_main_view(search_term=car["model"][:-1]))
+
+    def edit():
+        page.go(f"/edit_car/{car['id']}")
+        tracker.updateData(car["model"], car["manufacturer"], "1999", car["country_of_origin"], car["category"],
+                           car["replica_model"], car["info"])
+
+    step("edit", edit)
+    page.go("/")
+    step("add", lambda: tracker.addData("Budget Test", "Ford", "2001", "USA", "Racing", "Matchbox", ""))
+    step("delete", lambda: tracker.deleteData("Budget Test"))
+
+    def scroll():
+        for _ in range(5):
+            app._load_more_cars_improved(None)
+
+    step("more cards", scroll)
+    records = tracker._current_cars()
+    cache = getattr(records, "_store", None)
+    print(json.dumps({
+        "steps": steps,
+        "peak": status("VmHWM"),
+        "cached": [len(cache.cache), cache.size] if cache is not None else None,
+    }))
+
+
+def run(store, budget):
+    command = [sys.executable, os.path.abspath(__file__), "--child", store]
+    if budget:
+        command += ["--budget", str(budget)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=100_000)
+    parser.add_argument("--budget", type=float, default=8, help="MiB of decoded cars in budgeted mode")
+    parser.add_argument("--child", metavar="STORE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        session(args.child, args.budget if "--budget" in sys.argv else 0)
+        return
+
+    from app import CarTracker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template")
+        store = write_store(os.path.join(template, "car.json"), args.cars)
+        tracker = CarTracker(store)
+        tracker._rebuild_index("secondary", tracker._current_cars(), tracker._sidecar_store().stamp())
+        results = {}
+        for mode, budget in (("full", 0), ("budget", args.budget)):
+            shutil.copytree(template, os.path.join(tmp, mode))
+            results[mode] = run(os.path.join(tmp, mode, "car.json"), budget)
+
+    full, budgeted = results["full"], results["budget"]
+    print(f"cars:            {args.cars}, budget {args.budget:g} MiB of decoded cars")
+    print(f"{'step':<12} {'full RSS':>10} {'budget RSS':>11} {'full ms':>9} {'budget ms':>10}   (RSS in MiB)")
+    for (name, full_rss, full_ms), (_, budget_rss, budget_ms) in zip(full["steps"], budgeted["steps"]):
+        print(f"{name:<12} {full_rss:>10.1f} {budget_rss:>11.1f} {full_ms:>9.1f} {budget_ms:>10.1f}")
+    print(f"{'peak':<12} {full['peak']:>10.1f} {budgeted['peak']:>11.1f}")
+    entries, size = budgeted["cached"]
+    print(f"cached cars:     {entries} decoded, {size / 2**20:.2f} of {args.budget:g} MiB")
+
+
+if __name__ == "__main__":
+    main()
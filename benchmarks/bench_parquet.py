@@ -0,0 +1,88 @@
+"""Parquet export/import against the JSON store and CSV: load time, size and types.
+
+Usage: python benchmarks/bench_parquet.py [--cars 1000000] [--rounds 3]
+
+Needs pyarrow. Exports a synthetic collection to Parquet and CSV, then
+times what an analyst does to get a DataFrame: pandas reading car.json,
+the CSV export or the Parquet export (medians over --rounds), and
+reports file sizes, the column types pandas ends up with and the memory of
+each DataFrame. Finally imports both exports into an empty store with
+importMany and checks the Parquet round trip kept every car.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from synthetic import percentile, write_store
+
+import pandas as pd
+from app import CarTracker
+from app.car_handler import _pyarrow
+
+
+def timed(action, rounds):
+    timings, result = [], None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = action()
+        timings.append(time.perf_counter() - start)
+    return percentile(timings, 0.5), result
+
+
+def read_store(path):
+    with open(path, encoding="utf-8") as f:
+        return pd.DataFrame(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    try:
+        _pyarrow()
+    except OSError as e:
+        raise SystemExit(f"This benchmark needs pyarrow: {e}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = write_store(os.path.join(tmp, "car.json"), args.cars)
+        tracker = CarTracker(store)
+        paths = {"json": store, "csv": os.path.join(tmp, "cars.csv"), "parquet": os.path.join(tmp, "cars.parquet")}
+        export_times = {}
+        for kind in ("csv", "parquet"):
+            start = time.perf_counter()
+            tracker.export(paths[kind])
+            export_times[kind] = time.perf_counter() - start
+
+        readers = {"json": read_store, "csv": pd.read_csv, "parquet": pd.read_parquet}
+        loads = {kind: timed(lambda kind=kind: readers[kind](paths[kind]), args.rounds) for kind in readers}
+
+        import_times = {}
+        for kind in ("csv", "parquet"):
+            target = CarTracker(os.path.join(tmp, f"import-{kind}", "car.json"))
+            start = time.perf_counter()
+            results = target.importMany(paths[kind], workers=1)
+            import_times[kind] = (time.perf_counter() - start, sum(r["imported"] for r in results))
+        round_trip = CarTracker(os.path.join(tmp, "import-parquet", "car.json")).displayData()
+        kept = sorted(map(json.dumps, round_trip)) == sorted(map(json.dumps, tracker.displayData()))
+
+        print(f"cars:            {args.cars}")
+        print(f"{'':<10} {'size MiB':>10} {'export s':>10} {'to pandas s':>12} {'DataFrame MiB':>14} "
+              f"{'import s':>10}")
+        for kind in ("json", "csv", "parquet"):
+            seconds, frame = loads[kind]
+            frame_mib = frame.memory_usage(deep=True).sum() / 2**20
+            export = f"{export_times[kind]:.2f}" if kind in export_times else "-"
+            imported = f"{import_times[kind][0]:.2f}" if kind in import_times else "-"
+            print(f"{kind:<10} {os.path.getsize(paths[kind]) / 2**20:>10.1f} {export:>10} {seconds:>12.2f} "
+                  f"{frame_mib:>14.1f} {imported:>10}")
+        dtypes = loads["parquet"][1].dtypes.items()
+        print("parquet dtypes:  " + ", ".join(f"{column}={dtype}" for column, dtype in dtypes))
+        print(f"round trip:      {import_times['parquet'][1]} cars imported from Parquet, "
+              f"{'identical to the store' if kept else 'DIFFERENT FROM THE STORE'}")
+
+
+if __name__ == "__main__":
+    main()
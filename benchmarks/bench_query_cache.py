@@ -0,0 +1,104 @@
+"""Query result cache: repeated searches, hit rate and memory bound.
+
+Usage: python benchmarks/bench_query_cache.py [--cars 50000] [--queries 2000] [--distinct 100]
+
+Runs --queries lookups drawn from --distinct different searches with a
+skewed (Zipf-like) popularity, the way bookmarked and back-navigated
+searches repeat, through search, query, fullTextSearch and fuzzySearch.
+Reports cold (first) and warm (repeated) latency per kind, the hit rate of
+the whole run, the cache's size against its limits, and that a change to
+the collection makes the next lookup miss.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from synthetic import MANUFACTURERS, make_cars, percentile, write_store
+
+from app import CarTracker
+
+
+def make_workload(cars, distinct, count, rng):
+    """(kind, argument) lookups: distinct searches, the most popular repeated most often"""
+    searches = []
+    for i in range(distinct):
+        car = rng.choice(cars)
+        kind = ("search", "query", "fulltext", "fuzzy")[i % 4]
+        if kind == "search":
+            searches.append((kind, car["model"][:-1]))
+        elif kind == "query":
+            searches.append((kind, {"manufacturer": car["manufacturer"], "year": car["year"]}))
+        elif kind == "fulltext":
+            searches.append((kind, f'{car["manufacturer"]} {car["category"]}'))
+        else:
+            searches.append((kind, car["model"][:-2].replace("a", "e", 1)))
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return searches, rng.choices(searches, weights=weights, k=count)
+
+
+def run(tracker, kind, argument):
+    if kind == "search":
+        return tracker.search(argument)
+    if kind == "query":
+        return tracker.query(argument)
+    if kind == "fulltext":
+        return tracker.fullTextSearch(argument)
+    return tracker.fuzzySearch(argument)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    cars = make_cars(args.cars)
+    searches, workload = make_workload(cars, args.distinct, args.queries, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = CarTracker(write_store(os.path.join(tmp, "car.json"), args.cars))
+        # Build the search indexes up front so cold timings measure queries, not index builds
+        tracker.fullTextSearch(next(iter(MANUFACTURERS)))
+        tracker.fuzzySearch(next(iter(MANUFACTURERS)))
+        tracker._query_cache.clear()
+        tracker._query_cache.hits = tracker._query_cache.misses = 0
+
+        cold, warm = defaultdict(list), defaultdict(list)
+        seen = set()
+        start = time.perf_counter()
+        for kind, argument in workload:
+            key = (kind, repr(argument))
+            began = time.perf_counter()
+            run(tracker, kind, argument)
+            (warm if key in seen else cold)[kind].append((time.perf_counter() - began) * 1000)
+            seen.add(key)
+        elapsed = time.perf_counter() - start
+        stats = tracker.queryCacheStats()
+
+        kind, argument = searches[0]
+        tracker.addData("Cache Buster", "Ford", "1999", "USA", "Racing", "Matchbox", "")
+        misses = tracker.queryCacheStats()["misses"]
+        run(tracker, kind, argument)
+        invalidated = tracker.queryCacheStats()["misses"] == misses + 1
+
+    print(f"workload:        {args.queries} lookups of {args.distinct} distinct searches on {args.cars} cars, "
+          f"{elapsed:.2f} s")
+    print(f"{'kind':<10} {'cold p50':>10} {'warm p50':>10} {'warm p95':>10}   (ms)")
+    for kind in ("search", "query", "fulltext", "fuzzy"):
+        if cold[kind] and warm[kind]:
+            print(f"{kind:<10} {percentile(cold[kind], 0.5):>10.3f} {percentile(warm[kind], 0.5):>10.3f} "
+                  f"{percentile(warm[kind], 0.95):>10.3f}")
+    cache = tracker._query_cache
+    print(f"hit rate:        {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses, "
+          f"{stats['evictions']} evictions)")
+    print(f"cache size:      {stats['entries']}/{cache.max_entries} entries, "
+          f"{stats['bytes'] / 2**20:.1f}/{cache.max_bytes / 2**20:.0f} MiB")
+    print(f"after a change:  next lookup {'missed (invalidated)' if invalidated else 'HIT A STALE ENTRY'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Pivot reports: pandas group-bys against a per-dict loop, cold and cached.
+
+Usage: python benchmarks/bench_reports.py [--sizes 10000 100000 500000] [--rounds 3]
+
+For each collection size, times (medians over --rounds) building the
+DataFrame, each report from it, the same manufacturer x decade table counted
+with a Counter over displayData() dicts (the way the app counted before),
+and a repeated CarTracker.report call served from the per-version cache.
+The Counter and pandas tables are checked to agree.
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+from synthetic import percentile, write_store
+
+from app import CarTracker
+from app.reports import BUILDERS, UNKNOWN, collection_frame
+
+
+def timed(action, rounds):
+    timings, result = [], None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return percentile(timings, 0.5), result
+
+
+def counter_pivot(records):
+    counts = Counter()
+    for record in records:
+        year = record["year"]
+        decade = f"{int(year) // 10 * 10}s" if year.isdigit() else UNKNOWN
+        counts[(record["manufacturer"].strip() or UNKNOWN, decade)] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    header = ["cars", "frame", *BUILDERS, "dict loop", "cached"]
+    print(f"{header[0]:>8} " + " ".join(f"{h:>20}" for h in header[1:]) + "   (ms)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            tracker = CarTracker(write_store(os.path.join(tmp, f"car-{size}.json"), size))
+            cars = tracker._current_cars()
+            frame_ms, frame = timed(lambda: collection_frame(cars), args.rounds)
+            report_ms = [timed(lambda build=build: build(frame), args.rounds)[0] for build in BUILDERS.values()]
+            records = tracker.displayData()
+            loop_ms, counts = timed(lambda: counter_pivot(records), args.rounds)
+
+            tracker.report("manufacturer_decade")
+            cached_ms, rows = timed(lambda: tracker.report("manufacturer_decade"), args.rounds)
+            pandas_counts = {(row["manufacturer"], column): count for row in rows[:-1]
+                             for column, count in row.items() if column not in ("manufacturer", "total") and count}
+            agree = pandas_counts == dict(counts)
+            print(f"{size:>8} " + " ".join(f"{value:>20.2f}" for value in [frame_ms, *report_ms, loop_ms, cached_ms])
+                  + ("" if agree else "   MISMATCH"))
+
+
+if __name__ == "__main__":
+    main()
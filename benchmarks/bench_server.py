@@ -0,0 +1,151 @@
+"""Load test for the HTTP API (main.py --serve): throughput and latency under concurrent clients.
+
+Usage: python benchmarks/bench_server.py [--cars 10000] [--clients 32] [--requests 200]
+       python benchmarks/bench_server.py --url http://127.0.0.1:8080   # an already running server
+
+Without --url a server is started in a subprocess on a synthetic store. Each
+client keeps one connection open and sends a mix of requests: list pages,
+fuzzy searches, revalidations of a page with If-None-Match (answered 304
+while nothing changed) and, with --write-share, adds followed by deletes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from urllib.parse import quote, urlsplit
+
+from synthetic import MANUFACTURERS, percentile, write_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def request(reader, writer, host, method, path, body=None, headers=None):
+    """Send one HTTP/1.1 request on an open connection; returns (status, headers, body)"""
+    data = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n"
+    for name, value in (headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    writer.write(head.encode() + b"\r\n" + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        response_headers[name.lower()] = value.strip()
+    length = int(response_headers.get("content-length", 0))
+    return status, response_headers, await reader.readexactly(length) if length else b""
+
+
+async def client(number, host, port, args, total_cars, timings, statuses):
+    rng = random.Random(number)
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for i in range(args.requests):
+            roll = rng.random()
+            if roll < args.write_share:
+                kind = "write"
+                model = f"Load Test {number}-{i}"
+                path, method, body = "/cars", "POST", {"model": model, "manufacturer": "Ford", "year": "1967"}
+            elif roll < args.write_share + 0.15:
+                kind = "search"
+                maker = rng.choice(list(MANUFACTURERS))
+                path, method, body = f"/search?mode=fuzzy&limit=10&q={quote(maker.lower()[:-1])}", "GET", None
+            elif roll < args.write_share + 0.35:
+                kind = "revalidate"
+                path, method, body = "/cars?offset=0&limit=20", "GET", None
+            else:
+                kind = "list"
+                offset = rng.randrange(max(1, total_cars - 20))
+                path, method, body = f"/cars?offset={offset}&limit=20", "GET", None
+            headers = {"If-None-Match": etags[path]} if kind == "revalidate" and path in etags else None
+
+            start = time.perf_counter()
+            status, response_headers, _ = await request(reader, writer, host, method, path, body, headers)
+            if kind == "write":
+                await request(reader, writer, host, "DELETE", f"/cars/{quote(model)}")
+            timings[kind].append((time.perf_counter() - start) * 1000)
+            statuses[status] += 1
+            if "etag" in response_headers and method == "GET":
+                etags[path] = response_headers["etag"]
+    finally:
+        writer.close()
+
+
+async def load(host, port, args, total_cars):
+    timings = defaultdict(list)
+    statuses = Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n, host, port, args, total_cars, timings, statuses) for n in range(args.clients)))
+    return time.perf_counter() - start, timings, statuses
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_listening(host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="test this server instead of starting one")
+    parser.add_argument("--cars", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--write-share", type=float, default=0.02, help="share of requests that add (then delete) a car")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+            total_cars = args.cars
+        else:
+            host, port = "127.0.0.1", free_port()
+            store = write_store(os.path.join(tmp, "car.json"), args.cars)
+            server = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "--serve",
+                                       "--port", str(port), "--store", store],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            total_cars = args.cars
+        try:
+            wait_until_listening(host, port)
+            elapsed, timings, statuses = asyncio.run(load(host, port, args, total_cars))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    count = sum(len(values) for values in timings.values())
+    print(f"cars:            {total_cars}")
+    print(f"clients:         {args.clients} x {args.requests} requests")
+    print(f"throughput:      {count / elapsed:.0f} req/s ({elapsed:.1f} s)")
+    for kind, values in sorted(timings.items()):
+        print(f"{kind + ':':<16} n={len(values):<6} p50 {percentile(values, 0.5):.1f} ms  "
+              f"p95 {percentile(values, 0.95):.1f} ms  p99 {percentile(values, 0.99):.1f} ms")
+    print("statuses:        " + ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
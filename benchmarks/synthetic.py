@@ -0,0 +1,60 @@
+"""Synthetic car collections for the benchmark scripts."""
+import json
+import os
+import random
+import sys
+import uuid
+
+# Make the project importable when a benchmark is run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MANUFACTURERS = {
+    "Aston Martin": ("UK", ["DB5", "DBR1", "DBS Volante", "Vantage", "Vanquish"]),
+    "Ford": ("USA", ["Mustang GT", "Bronco", "Model T", "GT40", "Thunderbird"]),
+    "Chevrolet": ("USA", ["Corvette", "Camaro SS", "Bel Air", "Impala", "Chevelle"]),
+    "Porsche": ("Germany", ["911 Carrera", "356 Speedster", "Cayenne", "917K", "Boxster"]),
+    "Ferrari": ("Italy", ["250 GTO", "F40", "Testarossa", "Enzo", "Dino 246"]),
+    "Volkswagen": ("Germany", ["Beetle", "Karmann Ghia", "Golf GTI", "T1 Bus", "Scirocco"]),
+    "Toyota": ("Japan", ["2000GT", "Supra", "Land Cruiser", "Corolla AE86", "Celica"]),
+    "Jaguar": ("UK", ["E-Type", "XK120", "D-Type", "XJ220", "Mark 2"]),
+    "Lamborghini": ("Italy", ["Miura", "Countach", "Diablo", "Murcielago", "Huracan"]),
+    "Citroen": ("France", ["DS 19", "2CV", "SM", "Traction Avant", "H Van"]),
+}
+CATEGORIES = ["Sports Car", "Racing", "SUV", "Sedan", "Coupe", "Convertible", "Truck", "Luxury"]
+REPLICA_MAKERS = ["Matchbox", "Hot Wheels", "Corgi", "Dinky", "Maisto", "Bburago", "Tomica"]
+WORDS = ["Special", "Edition", "Turbo", "Classic", "Le Mans", "Rally", "Custom", "Police", "Taxi", "Pickup"]
+
+
+def make_cars(count, seed=42):
+    """Return count distinct car records as plain dicts"""
+    rng = random.Random(seed)
+    makers = list(MANUFACTURERS)
+    cars = []
+    for i in range(count):
+        manufacturer = rng.choice(makers)
+        country, models = MANUFACTURERS[manufacturer]
+        model = f"{manufacturer} {rng.choice(models)} {rng.choice(WORDS)} {i}"
+        cars.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "model": model,
+            "manufacturer": manufacturer,
+            "year": str(rng.randint(1930, 2024)),
+            "country_of_origin": country,
+            "category": rng.choice(CATEGORIES),
+            "replica_model": rng.choice(REPLICA_MAKERS),
+            "info": f"https://en.wikipedia.org/wiki/{model.replace(' ', '_')}",
+        })
+    return cars
+
+
+def write_store(path, count, seed=42):
+    """Write a synthetic car.json with count records and return its path"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(make_cars(count, seed), f, indent=2, ensure_ascii=False)
+    return path
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
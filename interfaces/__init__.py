@@ -1,2 +1,3 @@
 from .cli import Cli 
-from .flet_app import run_flet_app
\ No newline at end of file
+from .flet_app import run_flet_app
+from .server import run_server
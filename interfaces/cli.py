@@ -1,9 +1,469 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from itertools import chain, islice
 from app import CarTracker
+from app.models import ALLOWED_KEYS
+from app.query import FACET_FIELDS
+from app.reports import REPORTS
+from app.dedup import DEFAULT_THRESHOLD, MERGE_POLICIES
+from app.data import COMPRESSIONS
+from app.links import DEFAULT_CONNECTIONS, DEFAULT_PER_HOST, DEFAULT_RATE, DEFAULT_TIMEOUT, LINK_STATES
 from tabulate import tabulate
 
+OUTPUT_FORMATS = ("table", "json", "jsonl", "csv", "tsv")
+PUBLIC_FIELDS = [key for key in ALLOWED_KEYS if key != "id"]
+DISPLAY_PAGE_SIZE = 20
+TABLE_SAMPLE_ROWS = 50
+TABLE_MAX_WIDTH = 40
+
+
+def write_table(rows, out, fields=None, sample_size=TABLE_SAMPLE_ROWS, max_width=TABLE_MAX_WIDTH):
+    """Print rows as an aligned text table without reading them all first.
+
+    Column widths come from the header and a sample of the first rows, capped
+    at max_width; longer values are truncated. Output starts as soon as the
+    sample is read. Returns the number of rows written.
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, sample_size))
+    if not sample:
+        return 0
+    fields = fields or list(sample[0])
+    widths = {
+        field: min(max_width, max([len(field)] + [len(str(row.get(field, ""))) for row in sample]))
+        for field in fields
+    }
+
+    def line(values):
+        cells = []
+        for field in fields:
+            text = str(values.get(field, ""))
+            if len(text) > widths[field]:
+                text = text[:widths[field] - 1] + "…"
+            cells.append(text.ljust(widths[field]))
+        return " | ".join(cells).rstrip() + "\n"
+
+    out.write(line({field: field for field in fields}))
+    out.write("-+-".join("-" * widths[field] for field in fields) + "\n")
+    count = 0
+    for row in chain(sample, rows):
+        out.write(line(row))
+        count += 1
+    return count
+
+
+def write_rows(rows, fmt, out, fields=None):
+    """Write rows (dicts) to out in the requested format, one row at a time.
+
+    Every format streams, so output starts immediately and works on
+    arbitrarily large results. Returns the number of rows written.
+    """
+    count = 0
+    if fmt == "table":
+        return write_table(rows, out, fields)
+
+    if fmt in ("csv", "tsv"):
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=fields or list(row), extrasaction="ignore",
+                                        delimiter="\t" if fmt == "tsv" else ",", lineterminator="\n")
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    elif fmt == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    elif fmt == "json":
+        out.write("[")
+        for row in rows:
+            out.write(("," if count else "") + "\n  " + json.dumps(row, ensure_ascii=False))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return count
+
+
+def _parse_where(values):
+    """Turn repeated --where field=value options into a query dict"""
+    query = {}
+    for item in values or []:
+        field, sep, value = item.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected field=value, got '{item}'")
+        query[field.strip()] = value.strip()
+    return query
+
+
+def _parse_facets(values):
+    """Turn repeated --facet field=value options into facet filters; a repeated field means any of"""
+    filters = {}
+    for item in values or []:
+        field, sep, value = item.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected field=value, got '{item}'")
+        filters.setdefault(field.strip(), []).append(value.strip())
+    return filters
+
+
+def build_parser():
+    """Argument parser for one-shot commands: main.py --cli <command> [options]"""
+    parser = argparse.ArgumentParser(prog="main.py --cli", description="CarDb command-line interface")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def with_format(sub, default="table"):
+        sub.add_argument("--format", "-f", choices=OUTPUT_FORMATS, default=default,
+                         help=f"output format (default: {default})")
+        return sub
+
+    add = with_format(commands.add_parser("add", help="add a car"), default="jsonl")
+    add.add_argument("--model", required=True)
+    add.add_argument("--manufacturer", default="")
+    add.add_argument("--year", default="")
+    add.add_argument("--country", dest="country_of_origin", default="")
+    add.add_argument("--category", default="")
+    add.add_argument("--replica", dest="replica_model", default="")
+    add.add_argument("--info", default="")
+
+    search = with_format(commands.add_parser("search", help="find cars by model name and/or field filters"))
+    search.add_argument("term", nargs="?", default="", help="substring of the model name")
+    search.add_argument("--where", action="append", metavar="FIELD=VALUE",
+                        help="additional filter, may be repeated (year accepts ranges like 1950-1970)")
+    search.add_argument("--fuzzy", action="store_true",
+                        help="ranked, typo-tolerant search over model, manufacturer and replica names")
+    search.add_argument("--text", action="store_true",
+                        help='BM25 full-text search over all fields ("phrases", OR, -exclude)')
+    search.add_argument("--limit", type=int, default=10, help="maximum ranked results (default: 10)")
+
+    display = with_format(commands.add_parser("display", help="list all cars, optionally one page at a time"))
+    display.add_argument("--where", action="append", metavar="FIELD=VALUE")
+    display.add_argument("--page-size", type=int, default=None, help="number of cars per page (default: all)")
+    display.add_argument("--offset", type=int, default=0, help="number of cars to skip")
+    display.add_argument("--sort", choices=PUBLIC_FIELDS, default=None, help="field to sort by")
+    display.add_argument("--desc", action="store_true", help="sort in descending order")
+
+    delete = with_format(commands.add_parser("delete", help="delete cars by model name"), default="jsonl")
+    delete.add_argument("models", nargs="+")
+
+    imp = with_format(commands.add_parser("import", help="import files, directories or globs"), default="jsonl")
+    imp.add_argument("paths", nargs="+")
+    imp.add_argument("--incremental", action="store_true",
+                     help="apply only rows changed since the last incremental import of each file")
+    imp.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+
+    export = commands.add_parser("export", help="export cars to a file")
+    export.add_argument("path")
+    export.add_argument("--as", dest="export_format", choices=("csv", "jsonl", "xlsx", "parquet"),
+                        help="file format (default: from the extension)")
+    export.add_argument("--where", action="append", metavar="FIELD=VALUE")
+
+    with_format(commands.add_parser("stats", help="collection counts per category, manufacturer and country"))
+
+    report = with_format(commands.add_parser("report", help="pivot reports: " + ", ".join(REPORTS)))
+    report.add_argument("name", choices=list(REPORTS))
+
+    facets = with_format(commands.add_parser("facets", help="exact-value filtering with per-value counts"))
+    facets.add_argument("--facet", action="append", metavar="FIELD=VALUE",
+                        help="exact value of category, manufacturer, country_of_origin or replica_model; "
+                             "repeat a field to accept any of several values")
+    facets.add_argument("--field", action="append", choices=FACET_FIELDS,
+                        help="only count these fields (default: all facet fields)")
+    facets.add_argument("--cars", action="store_true", help="list the matching cars instead of counts")
+    facets.add_argument("--limit", type=int, default=None, help="maximum cars listed with --cars")
+
+    dedup = with_format(commands.add_parser("dedup", help="find (and optionally merge) near-duplicate cars"))
+    dedup.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help=f"minimum similarity of model names, 0-1 (default: {DEFAULT_THRESHOLD})")
+    dedup.add_argument("--merge", action="store_true", help="merge each cluster into one car (undoable)")
+    dedup.add_argument("--policy", choices=MERGE_POLICIES, default="most_complete",
+                       help="which car of a cluster is kept (default: most_complete)")
+
+    links = with_format(commands.add_parser("links", help="check the info URLs of all cars"))
+    links.add_argument("--refresh", action="store_true", help="check again even where a recent result is stored")
+    links.add_argument("--state", action="append", choices=LINK_STATES,
+                       help="only list links in this state, may be repeated (e.g. --state broken)")
+    links.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                       help=f"maximum open requests (default: {DEFAULT_CONNECTIONS})")
+    links.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                       help=f"maximum open requests per host (default: {DEFAULT_PER_HOST})")
+    links.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                       help=f"maximum requests started per second per host (default: {DEFAULT_RATE:g})")
+    links.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                       help=f"seconds to wait for each response (default: {DEFAULT_TIMEOUT:g})")
+
+    photos = with_format(commands.add_parser("photos", help="list, attach or detach a car's photos"))
+    photos.add_argument("model", nargs="?", help="model name of the car")
+    photos.add_argument("--add", nargs="+", metavar="IMAGE", help="attach image files (identical images are stored once)")
+    photos.add_argument("--remove", metavar="HASH", help="detach this photo ('all' detaches every photo)")
+    photos.add_argument("--prune", action="store_true", help="drop the photos of cars that were deleted")
+
+    commands.add_parser("undo", help="revert the most recent change")
+    commands.add_parser("redo", help="re-apply the most recently undone change")
+    history = with_format(commands.add_parser("history", help="recent undoable changes, newest first"))
+    history.add_argument("--limit", type=int, default=20)
+
+    snapshot = with_format(commands.add_parser("snapshot", help="save, list or restore point-in-time snapshots"))
+    snapshot.add_argument("name", nargs="?", default="", help="name of the new snapshot (default: timestamp)")
+    snapshot.add_argument("--list", action="store_true", help="list saved snapshots instead of saving one")
+    snapshot.add_argument("--restore", metavar="ID", help="bring the collection back to this snapshot")
+
+    compress = commands.add_parser("compress", help="store the collection compressed, or back as plain JSON")
+    compress.add_argument("compression", choices=list(COMPRESSIONS) + ["none"])
+
+    with_format(commands.add_parser(
+        "batch", help="apply JSON-lines operations from stdin, e.g. {\"op\": \"add\", \"model\": ...}"),
+        default="jsonl")
+    return parser
+
+
 class Cli: 
     def __init__(self):
         self.tracker = CarTracker()     
+
+    def run_command(self, argv):
+        """Execute a single command from argv and return a process exit code.
+
+        Results go to stdout in the selected format; progress messages from the
+        data layer are redirected to stderr so the output stays parseable.
+        """
+        parser = build_parser()
+        args = parser.parse_args(argv)
+        out = sys.stdout
+        handler = getattr(self, f"_command_{args.command}")
+        try:
+            with redirect_stdout(sys.stderr):
+                return handler(args, out)
+        except (argparse.ArgumentTypeError, ValueError) as e:
+            parser.error(str(e))
+        except BrokenPipeError:
+            # Downstream consumer (e.g. head) closed the pipe; that's not an error
+            sys.stderr.close()
+            return 0
+
+    @staticmethod
+    def _public_rows(cars):
+        for car in cars:
+            row = car.to_dict()
+            row.pop("id", None)
+            yield row
+
+    def _command_add(self, args, out):
+        fields = {key: getattr(args, key) for key in PUBLIC_FIELDS}
+        results = self.tracker.applyBatch([dict(fields, op="add")])
+        write_rows(results, args.format, out)
+        return 0 if results and results[0]["status"] == "ok" else 1
+
+    def _command_search(self, args, out):
+        if args.fuzzy or args.text:
+            search = self.tracker.fuzzySearch if args.fuzzy else self.tracker.fullTextSearch
+            results = search(args.term, limit=args.limit)
+            write_rows(results, args.format, out, ["score"] + PUBLIC_FIELDS)
+            return 0 if results else 1
+        query = _parse_where(args.where)
+        if args.term:
+            query["model"] = args.term
+        count = write_rows(self._public_rows(self.tracker.iterCars(query or None)),
+                           args.format, out, PUBLIC_FIELDS)
+        return 0 if count else 1
+
+    def _command_display(self, args, out):
+        query = _parse_where(args.where) or None
+        if args.page_size is None and not args.sort and not args.offset:
+            write_rows(self._public_rows(self.tracker.iterCars(query)), args.format, out, PUBLIC_FIELDS)
+            return 0
+
+        limit = args.page_size if args.page_size is not None else DISPLAY_PAGE_SIZE
+        rows, total = self.tracker.displayPage(args.offset, limit, sort_by=args.sort,
+                                               descending=args.desc, query=query)
+        write_rows(rows, args.format, out, PUBLIC_FIELDS)
+        if rows:
+            print(f"Showing {args.offset + 1}-{args.offset + len(rows)} of {total} cars")
+        else:
+            print(f"No cars at offset {args.offset} ({total} total)")
+        return 0
+
+    def _command_delete(self, args, out):
+        results = self.tracker.applyBatch([{"op": "delete", "model": model} for model in args.models])
+        write_rows(results, args.format, out)
+        return 0 if results and all(r["status"] == "ok" for r in results) else 1
+
+    def _command_import(self, args, out):
+        if args.incremental:
+            results = []
+            for path in args.paths:
+                summary = self.tracker.importData(path, incremental=True)
+                results.append(dict(summary, file=path, error=None) if summary
+                               else {"file": path, "error": "import failed"})
+        else:
+            results = self.tracker.importMany(args.paths, workers=args.workers)
+        write_rows(results, args.format, out)
+        return 0 if results and not any(r["error"] for r in results) else 1
+
+    def _command_export(self, args, out):
+        count = self.tracker.export(args.path, format=args.export_format,
+                                    query=_parse_where(args.where) or None)
+        if count is None:
+            return 1
+        print(f"Exported {count} cars to {args.path}")
+        return 0
+
+    def _command_stats(self, args, out):
+        stats = self.tracker.stats()
+        if args.format == "json":
+            out.write(json.dumps(stats, indent=2, ensure_ascii=False) + "\n")
+            return 0
+        rows = [{"field": "total", "value": "", "count": stats["total"]}]
+        for field, counts in stats.items():
+            if field != "total":
+                rows.extend({"field": field, "value": value, "count": count} for value, count in counts.items())
+        write_rows(rows, args.format, out)
+        return 0
+
+    def _command_report(self, args, out):
+        count = write_rows(self.tracker.report(args.name), args.format, out)
+        if not count:
+            print("No cars to report on")
+        return 0
+
+    def _command_facets(self, args, out):
+        filters = _parse_facets(args.facet)
+        if args.cars:
+            write_rows(self.tracker.facetFilter(filters, limit=args.limit), args.format, out, PUBLIC_FIELDS)
+            return 0
+        counts = self.tracker.facetCounts(filters, fields=args.field)
+        if args.format == "json":
+            out.write(json.dumps(counts, indent=2, ensure_ascii=False) + "\n")
+            return 0
+        rows = [{"field": "total", "value": "", "count": counts["total"]}]
+        for field, values in counts.items():
+            if field != "total":
+                rows.extend({"field": field, "value": value, "count": count} for value, count in values.items())
+        write_rows(rows, args.format, out)
+        return 0
+
+    def _command_dedup(self, args, out):
+        if args.merge:
+            result = self.tracker.mergeDuplicates(args.threshold, args.policy)
+            if result is None:
+                return 1
+            print(f"Merged {result['clusters']} clusters, removed {result['removed']} cars (use 'undo' to revert)")
+            return 0
+        rows = (
+            dict(cluster=number, action="keep" if i == cluster["keep"] else "merge",
+                 similarity=cluster["similarity"], **car)
+            for number, cluster in enumerate(self.tracker.findDuplicates(args.threshold, args.policy), start=1)
+            for i, car in enumerate(cluster["cars"])
+        )
+        count = write_rows(rows, args.format, out)
+        if not count:
+            print("No duplicates found")
+        return 0
+
+    def _command_links(self, args, out):
+        def progress(done, total):
+            if done % 50 == 0 or done == total:
+                print(f"Checked {done}/{total} URLs")
+
+        rows = self.tracker.checkLinks(args.refresh, args.connections, args.per_host, args.rate, args.timeout,
+                                       progress=progress)
+        counts = Counter(row["state"] for row in rows)
+        if args.state:
+            rows = [row for row in rows if row["state"] in args.state]
+        for row in rows:
+            row["checked"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["checked"]))
+        write_rows(rows, args.format, out)
+        print(", ".join(f"{state}: {counts[state]}" for state in LINK_STATES))
+        return 0 if not counts["broken"] else 1
+
+    def _command_photos(self, args, out):
+        if args.prune:
+            print(f"Dropped the photos of {self.tracker.prunePhotos()} deleted cars")
+            return 0
+        if not args.model:
+            raise ValueError("a model name is required (or --prune)")
+        if self.tracker.getCar(args.model) is None:
+            print(f"Car '{args.model}' not found")
+            return 1
+        failed = 0
+        for path in args.add or []:
+            if self.tracker.addPhoto(args.model, path) is None:
+                failed += 1
+        if args.remove:
+            removed = self.tracker.removePhoto(args.model, None if args.remove == "all" else args.remove)
+            print(f"Detached {removed} photos")
+        rows = [{"photo": photo} for photo in self.tracker.photos(args.model)]
+        write_rows(rows, args.format, out)
+        return 1 if failed else 0
+
+    def _command_undo(self, args, out):
+        entry = self.tracker.undo()
+        if entry is None:
+            print("Nothing to undo")
+            return 1
+        print(f"Undid: {entry['label']}")
+        return 0
+
+    def _command_redo(self, args, out):
+        entry = self.tracker.redo()
+        if entry is None:
+            print("Nothing to redo")
+            return 1
+        print(f"Redid: {entry['label']}")
+        return 0
+
+    def _command_history(self, args, out):
+        write_rows(self.tracker.history(args.limit), args.format, out)
+        return 0
+
+    def _command_snapshot(self, args, out):
+        if args.list:
+            write_rows(self.tracker.snapshots(), args.format, out)
+            return 0
+        if args.restore:
+            if not self.tracker.restoreSnapshot(args.restore):
+                return 1
+            print(f"Restored snapshot {args.restore} (use 'undo' to go back)")
+            return 0
+        snapshot = self.tracker.snapshot(args.name)
+        if snapshot is None:
+            return 1
+        write_rows([snapshot], args.format, out)
+        return 0
+
+    def _command_compress(self, args, out):
+        before = self.tracker.fileHandler.target
+        path = self.tracker.setCompression(None if args.compression == "none" else args.compression)
+        if path is None:
+            return 1
+        size = os.path.getsize(path)
+        print(f"Store is now {path} ({size / 1024:.0f} KiB)" if path != before else f"Store is already {path}")
+        return 0
+
+    def _command_batch(self, args, out):
+        operations = []
+        for number, line in enumerate(sys.stdin, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                operation = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"stdin line {number}: invalid JSON ({e})")
+            if not isinstance(operation, dict):
+                raise ValueError(f"stdin line {number}: expected a JSON object")
+            operations.append(operation)
+        results = self.tracker.applyBatch(operations)
+        write_rows(results, args.format, out)
+        return 0 if all(r["status"] == "ok" for r in results) else 1
     
     def run(self): 
         while True:
@@ -26,6 +486,15 @@ class Cli:
             self.delete_car()
         elif command == "import": 
             self.import_data()
+        elif command == "reimport":
+            self.reimport_data()
+        elif command == "export":
+            self.export_data()
+        elif command == "report":
+            self.show_report()
+        elif command in ("undo", "redo"):
+            entry = self.tracker.undo() if command == "undo" else self.tracker.redo()
+            print(f"{command.capitalize()}: {entry['label']}" if entry else f"Nothing to {command}")
         else:
             print("Invalid command. Type '--help' to see the available commands.")
 
@@ -40,25 +509,69 @@ class Cli:
         self.tracker.addData(modelname, manufacturer, year, origincountry, category, modelmanufact, more)
 
     def import_data(self):
-        filename = input("Enter filename to import data: ")
-        if (self.tracker.importData(filename)):
+        filename = input("Enter filename, directory or glob to import data: ")
+        if os.path.isdir(filename) or glob.has_magic(filename):
+            results = self.tracker.importMany(filename)
+            for result in results:
+                status = result["error"] or "ok"
+                print(f"{result['file']}: {result['imported']} imported, "
+                      f"{result['duplicates']} duplicates, {result['invalid']} invalid ({status})")
+        elif (self.tracker.importData(filename)):
             print("Data imported successfully!")
+
+    def reimport_data(self):
+        filename = input("Enter filename to re-import: ")
+        if self.tracker.importData(filename, incremental=True):
+            print("Data re-imported successfully!")
+
+    def export_data(self):
+        filename = input("Enter export filename (.csv, .jsonl, .xlsx or .parquet): ")
+        model = input("Only models containing (leave empty for all): ").strip()
+        count = self.tracker.export(filename, query=model or None)
+        if count is not None:
+            print(f"Exported {count} cars to {filename}")
    
     def display_all_cars(self):
-        cars = self.tracker.displayData()
-        if cars:
-            print(tabulate(cars, headers="keys", tablefmt="grid"))
-        else:
-            print("No cars found.")
+        offset = 0
+        while True:
+            # Pages come from the collection in memory, so paging doesn't re-read the store
+            cars, total = self.tracker.displayPage(offset, DISPLAY_PAGE_SIZE, cached=True)
+            if not cars:
+                if not total:
+                    print("No cars found.")
+                return
+            write_table(cars, sys.stdout, PUBLIC_FIELDS)
+            offset += len(cars)
+            if offset >= total:
+                return
+            answer = input(f"Showing {offset} of {total} cars. Press Enter for more, 'q' to stop: ")
+            if answer.strip().lower() == "q":
+                return
 
     def search_car(self):
         modelname = input("Enter model name to search: ")
         car = self.tracker.search(modelname)
         if car:
             print(tabulate(car, headers="keys", tablefmt="grid"))
+            return
+        suggestions = self.tracker.fuzzySearch(modelname, limit=5)
+        if suggestions:
+            print("No exact match. Closest cars:")
+            print(tabulate(suggestions, headers="keys", tablefmt="grid"))
         else:
             print("Car not found.")
 
+    def show_report(self):
+        names = list(REPORTS)
+        for number, name in enumerate(names, start=1):
+            print(f"  {number}. {REPORTS[name]}")
+        answer = input("Report number: ").strip()
+        if not answer.isdigit() or not 1 <= int(answer) <= len(names):
+            print("Invalid report number.")
+            return
+        if not write_rows(self.tracker.report(names[int(answer) - 1]), "table", sys.stdout):
+            print("No cars to report on.")
+
     def delete_car(self):
         modelname = input("Enter model name to delete: ")
         if self.tracker.deleteData(modelname):
@@ -70,4 +583,10 @@ class Cli:
         print("  display - Display all cars")
         print("  search  - Search for a car")
         print("  delete  - Delete a car")
+        print("  import  - Import a file, a directory or a glob of files")
+        print("  reimport - Re-import a file, applying only rows changed since the last re-import")
+        print("  export  - Export cars to CSV, JSON-lines, Excel or Parquet")
+        print("  report  - Show a breakdown by manufacturer and decade, country and category, or replica maker")
+        print("  undo    - Revert the most recent change")
+        print("  redo    - Re-apply the most recently undone change")
         print("  exit    - Exit the program")
@@ -1,9 +1,19 @@
 import flet as ft
 from app import CarTracker
+from app.query import normalize_facets
+from app.reports import REPORTS
+from app.profiling import checkpoint
+import base64
+import queue
 import threading
 import time
+from collections import Counter, OrderedDict
 from functools import lru_cache
 
+# Routes whose views are reused while the collection is unchanged (the main
+# view is kept separately and patched in place by change events)
+CACHED_ROUTES = ("/search", "/stats")
+
 # UI Constants for better maintainability
 class UIConstants:
     # Colors
@@ -35,15 +45,52 @@ class UIConstants:
     FONT_SIZE_LARGE = 16
     FONT_SIZE_HEADER = 22
 
+# Form field keys that get autocomplete, mapped to the Car field they complete
+SUGGESTION_FIELDS = {
+    "manufacturer": "manufacturer",
+    "originCountry": "country_of_origin",
+    "category": "category",
+    "modelManufact": "replica_model",
+}
+
+# Facet fields offered as filter chips on the main view, and how many values each shows
+FACET_BAR_FIELDS = {"category": "Category", "country_of_origin": "Country"}
+FACET_BAR_VALUES = 8
+
+# Stats page: tab label per report, and how many rows each table shows
+REPORT_TABS = {"manufacturer_decade": "Decades", "country_category": "Countries", "replica_makers": "Replicas"}
+REPORT_TABLE_ROWS = 50
+# Attributes describing the car list on screen, kept aside for the home view while search results are shown
+LIST_STATE = ("_car_list", "_list_search_term", "_current_cars", "_card_by_key", "_stat_texts", "_facet_bar")
+
 class FletApp:
-    def __init__(self):
-        self.car_tracker = CarTracker()
+    def __init__(self, car_tracker=None):
+        self.car_tracker = car_tracker or CarTracker()
         self._cars_cache = None
         self._cache_dirty = True
         self._loading = False
         self._max_cards_initial = 10  # Load only 10 cars initially
         self._cards_loaded = 0
         self._current_cars = []  # Store current cars for pagination
+        self._facet_filters = {}  # field -> selected values on the main view
+        # Controls of the last built car list, patched in place on change events
+        self._main_view = None
+        self._car_list = None
+        self._list_search_term = None
+        self._card_by_key = {}
+        self._stat_texts = {}
+        self._facet_bar = None
+        # LIST_STATE of the home view while a search result list is on screen
+        self._home_state = None
+        self._search_field = None
+        self._category_counts = Counter()
+        # Avatars waiting for their photo thumbnail, filled in by a background thread
+        self._thumbnail_queue = queue.Queue()
+        self._thumbnail_worker = None
+        self._picker = None
+        # route -> (collection version, view) for CACHED_ROUTES
+        self._view_cache = OrderedDict()
+        self.car_tracker.subscribe(self._on_car_change)
 
     def main(self, page: ft.Page):
         self.page = page
@@ -82,6 +129,11 @@ class FletApp:
                     selected_icon=ft.Icons.ADD_CIRCLE,
                     label="Add Car"
                 ),
+                ft.NavigationBarDestination(
+                    icon=ft.Icons.INSIGHTS_OUTLINED,
+                    selected_icon=ft.Icons.INSIGHTS,
+                    label="Stats"
+                ),
             ],
             on_change=self.nav_change,
             selected_index=0,
@@ -167,19 +219,35 @@ class FletApp:
         self.page.snack_bar.open = True
         self.page.update()
 
+    def _show_undo_message(self, message):
+        """Success message with an Undo action that reverts the last change"""
+        def undo(e):
+            entry = self.car_tracker.undo()
+            if entry:
+                self.show_success(f"Undone: {entry['label']}")
+            else:
+                self.show_error("Nothing to undo")
+
+        self.page.snack_bar = ft.SnackBar(ft.Text(message), bgcolor=UIConstants.SUCCESS_COLOR,
+                                          action="Undo", on_action=undo)
+        self.page.snack_bar.open = True
+        self.page.update()
+
     @lru_cache(maxsize=1)
     def _get_cars_data_cached(self, cache_key):
         """Cached data retrieval to avoid repeated file reads"""
         try:
-            return self.car_tracker.displayData()
+            return self.car_tracker.displayData(with_ids=True)
         except Exception as e:
             print(f"Error loading cars data: {e}")
             return []
 
     def _get_cars_data(self, force_refresh=False):
         """Get cars data with optimized caching for better performance"""
+        if self.car_tracker.memory_budget_bytes:
+            return self._get_cars_view()
         if self._loading and not force_refresh and not self._cache_dirty:
-            return self._cars_cache or []
+            return list((self._cars_cache or {}).values())
             
         if self._cache_dirty or force_refresh or self._cars_cache is None:
             try:
@@ -189,19 +257,44 @@ class FletApp:
                 # Use timestamp for cache key to ensure fresh data
                 cache_key = int(time.time())
                 
-                self._cars_cache = self._get_cars_data_cached(cache_key)
+                # Keyed by car id so change events patch single entries
+                cars = self._get_cars_data_cached(cache_key)
+                self._cars_cache = {car['id']: car for car in cars}
+                self._category_counts = Counter(car.get('category', 'Other') for car in cars)
                 self._cache_dirty = False
             except Exception as e:
                 print(f"Error loading cars data: {e}")
-                self._cars_cache = []
-        return self._cars_cache
+                self._cars_cache = {}
+        return list(self._cars_cache.values())
+
+    def _get_cars_view(self):
+        """Cars as a sequence read from the tracker on demand, for a memory-budgeted tracker.
+
+        No copy of the collection is kept (_cars_cache stays None), so the
+        list shows what the tracker holds and only the cards on screen
+        decode their cars.
+        """
+        try:
+            cars = self.car_tracker.displayView(with_ids=True)
+            categories = self.car_tracker.facetCounts(fields=["category"]).get("category", {})
+            self._category_counts = Counter(categories)
+            self._cache_dirty = False
+            return cars
+        except Exception as e:
+            print(f"Error loading cars data: {e}")
+            return []
 
     def _invalidate_cache(self):
         """Mark cache as dirty to force refresh on next access"""
         self._cache_dirty = True
+        self._drop_home_view()
         # Clear LRU cache
         self._get_cars_data_cached.cache_clear()
 
+    def _drop_home_view(self):
+        self._main_view = None
+        self._home_state = None
+
     def _create_modern_button(self, text, icon, on_click, bgcolor=ft.Colors.INDIGO_600, color=ft.Colors.WHITE, expand=False):
         """Create a modern styled button with consistent design"""
         return ft.ElevatedButton(
@@ -256,6 +349,33 @@ class FletApp:
             bgcolor=UIConstants.BACKGROUND_COLOR
         )
 
+    def _with_suggestions(self, field, car_field):
+        """Wrap a text field with tappable autocomplete chips for existing values"""
+        suggestions = ft.Row(wrap=True, spacing=UIConstants.SPACING_SMALL, visible=False)
+
+        def pick(value):
+            field.value = value
+            suggestions.visible = False
+            self.page.update()
+
+        def on_change(e):
+            text = (field.value or "").strip()
+            matches = self.car_tracker.suggest(car_field, text, limit=5) if text else []
+            matches = [m for m in matches if m["value"] != text]
+            suggestions.controls = [
+                ft.Chip(
+                    label=ft.Text(m["value"], size=UIConstants.FONT_SIZE_SMALL),
+                    on_click=lambda e, value=m["value"]: pick(value),
+                    bgcolor=UIConstants.PRIMARY_SURFACE
+                )
+                for m in matches
+            ]
+            suggestions.visible = bool(matches)
+            suggestions.update()
+
+        field.on_change = on_change
+        return ft.Column([field, suggestions], spacing=4)
+
     def _load_data_async(self):
         """Load data in background thread to avoid blocking UI"""
         if self._loading:
@@ -294,11 +414,8 @@ class FletApp:
                 success = self.car_tracker.deleteData(model_name)
                 close_dialog(e)
                 if success:
-                    # Invalidate cache to ensure fresh data
-                    self._invalidate_cache()
-                    self.show_success(f"'{model_name}' deleted successfully!")
-                    # Navigate to refresh the main view properly
-                    self.page.go("/")
+                    # The change event already removed the card
+                    self._show_undo_message(f"'{model_name}' deleted")
                 else:
                     self.show_error(f"Failed to delete '{model_name}'")
             except Exception as ex:
@@ -328,11 +445,25 @@ class FletApp:
                 
             # Use cached data for better performance
             cars_data = self._get_cars_data()
-            
+            if search_term and self._main_view is not None and self._home_state is None:
+                # Keep the home list to go back to; the search results replace it on screen
+                self._home_state = {name: getattr(self, name) for name in LIST_STATE}
+
             if search_term:
-                cars = [car for car in cars_data if search_term.lower() in car.get('model', '').lower()]
+                # Served from the tracker's query cache while the collection is unchanged
+                cars = self.car_tracker.search(search_term, with_ids=True)
+                if not cars:
+                    # Then words anywhere (category, country, info), then typo-tolerant matches
+                    cars = (self.car_tracker.fullTextSearch(search_term, limit=100)
+                            or self.car_tracker.fuzzySearch(search_term, limit=self._max_cards_initial))
+            elif self._facet_filters:
+                cars = self.car_tracker.facetFilter(self._facet_filters)
             else:
                 cars = cars_data
+            if search_term and self._facet_filters:
+                filters = normalize_facets(self._facet_filters)
+                cars = [car for car in cars
+                        if all(car.get(field, '').strip().casefold() in wanted for field, wanted in filters.items())]
             
             # Store cars for load more functionality
             self._current_cars = cars
@@ -341,12 +472,18 @@ class FletApp:
             car_cards = self._create_car_cards_optimized(cars)
             
             # Modern header with stats
+            self._stat_texts = {
+                "total": ft.Text(f"{len(cars_data)}", size=UIConstants.FONT_SIZE_HEADER,
+                                 weight=ft.FontWeight.BOLD, color=UIConstants.PRIMARY_COLOR),
+                "categories": ft.Text(f"{len(self._category_counts)}", size=UIConstants.FONT_SIZE_HEADER,
+                                      weight=ft.FontWeight.BOLD, color=UIConstants.SUCCESS_COLOR),
+            }
             header = ft.Container(
                 content=ft.Row([
                     ft.Container(
                         content=ft.Column([
                             ft.Icon(ft.Icons.DIRECTIONS_CAR, size=UIConstants.ICON_SIZE_LARGE, color=UIConstants.PRIMARY_COLOR),
-                            ft.Text(f"{len(cars_data)}", size=UIConstants.FONT_SIZE_HEADER, weight=ft.FontWeight.BOLD, color=UIConstants.PRIMARY_COLOR),
+                            self._stat_texts["total"],
                             ft.Text("Total Cars", size=UIConstants.FONT_SIZE_SMALL, color=UIConstants.TEXT_SECONDARY)
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=2),
                         padding=ft.padding.all(UIConstants.PADDING_STANDARD),
@@ -358,8 +495,7 @@ class FletApp:
                     ft.Container(
                         content=ft.Column([
                             ft.Icon(ft.Icons.CATEGORY, size=UIConstants.ICON_SIZE_LARGE, color=UIConstants.SUCCESS_COLOR),
-                            ft.Text(f"{len(set(car.get('category', 'Other') for car in cars_data))}", 
-                                   size=UIConstants.FONT_SIZE_HEADER, weight=ft.FontWeight.BOLD, color=UIConstants.SUCCESS_COLOR),
+                            self._stat_texts["categories"],
                             ft.Text("Categories", size=UIConstants.FONT_SIZE_SMALL, color=UIConstants.TEXT_SECONDARY)
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=2),
                         padding=ft.padding.all(UIConstants.PADDING_STANDARD),
@@ -373,15 +509,19 @@ class FletApp:
             )
 
             # Use ListView with auto_scroll=False to maintain scroll position
+            self._facet_bar = ft.Column(self._create_facet_bar(), spacing=4)
             car_list = ft.ListView(
-                controls=[header] + car_cards,
+                controls=[header, self._facet_bar] + car_cards,
                 spacing=6,
                 padding=ft.padding.symmetric(horizontal=8, vertical=4),
                 expand=True,
                 auto_scroll=False  # This prevents auto-scrolling to top
             )
 
-            return ft.View(
+            self._car_list = car_list
+            self._list_search_term = search_term
+
+            view = ft.View(
                 "/",
                 [car_list],
                 floating_action_button=ft.FloatingActionButton(
@@ -397,10 +537,149 @@ class FletApp:
                 padding=0,
                 bgcolor=UIConstants.BACKGROUND_COLOR  # Light background
             )
+            # The unfiltered home view is kept and patched by change events
+            if not search_term:
+                self._main_view = view
+                self._home_state = None
+            checkpoint("after main view build")
+            return view
         except Exception as e:
             print(f"Error creating main view: {e}")
             return self._create_error_view(f"Error loading cars: {e}")
 
+    def _create_facet_bar(self):
+        """Filter chips with live counts, computed from the tracker's facet bitmaps"""
+        try:
+            counts = self.car_tracker.facetCounts(self._facet_filters, fields=list(FACET_BAR_FIELDS))
+        except ValueError:
+            return []
+        rows = []
+        for field, label in FACET_BAR_FIELDS.items():
+            selected = set(self._facet_filters.get(field, []))
+            values = [value for value in counts.get(field, {}) if value][:FACET_BAR_VALUES]
+            values += [value for value in selected if value not in values]
+            if not values:
+                continue
+            chips = [
+                ft.Chip(
+                    label=ft.Text(f"{value} ({counts.get(field, {}).get(value, 0)})", size=UIConstants.FONT_SIZE_SMALL),
+                    selected=value in selected,
+                    on_select=lambda e, field=field, value=value: self._toggle_facet(field, value),
+                    selected_color=UIConstants.PRIMARY_ACCENT,
+                    bgcolor=UIConstants.PRIMARY_SURFACE
+                )
+                for value in values
+            ]
+            rows.append(ft.Row(
+                [ft.Text(label, size=UIConstants.FONT_SIZE_SMALL, color=UIConstants.TEXT_SECONDARY)] + chips,
+                scroll=ft.ScrollMode.AUTO,
+                spacing=UIConstants.SPACING_SMALL
+            ))
+        return rows
+
+    def _toggle_facet(self, field, value):
+        selected = self._facet_filters.setdefault(field, [])
+        if value in selected:
+            selected.remove(value)
+        else:
+            selected.append(value)
+        if not selected:
+            del self._facet_filters[field]
+        self._cards_loaded = 0
+        self._drop_home_view()
+        self.route_change(None)
+
+    def _matches_facets(self, car):
+        filters = normalize_facets(self._facet_filters)
+        return all(car.get(field, '').strip().casefold() in wanted for field, wanted in filters.items())
+
+    def _live_current_cars(self):
+        """Cars of the current list with deleted ones dropped and edited ones up to date"""
+        if self._cars_cache is None:
+            if not isinstance(self._current_cars, list):
+                return self._current_cars  # the tracker's view, replaced on every change
+            # Memory-budgeted: look the listed cars up by id instead
+            live = []
+            for car in self._current_cars:
+                current = self.car_tracker.getCarById(car['id']) if 'id' in car else car
+                if current is not None:
+                    live.append(current)
+            return live
+        # Ranked search results carry no id and are kept as they are
+        return [self._cars_cache.get(car['id'], car) for car in self._current_cars
+                if 'id' not in car or car['id'] in self._cars_cache]
+
+    @staticmethod
+    def _card_key(car):
+        return car.get('id') or car.get('model', '').lower()
+
+    def _on_car_change(self, event):
+        """Patch the cached cars and the visible list for one change instead of reloading everything.
+
+        Only the affected card, the header counters and the filter chips are
+        touched; changes that can't be described car by car fall back to a
+        full reload on the next visit to the main view.
+        """
+        budgeted = self.car_tracker.memory_budget_bytes
+        if event.kind == "reloaded" or (self._cars_cache is None and not budgeted) or self._cache_dirty:
+            self._invalidate_cache()
+            return
+        if self._home_state is not None:
+            # Only the list on screen is patched, so the home list put aside is built again
+            self._drop_home_view()
+        car = event.car.to_dict()
+        key = car['id']
+        if budgeted:
+            # Nothing cached to patch: take a fresh view (and counts) from the tracker
+            cars = self._get_cars_view()
+            if not isinstance(self._current_cars, list):
+                self._current_cars = cars
+        else:
+            old = self._cars_cache.pop(key, None)
+            if old is not None:
+                self._category_counts[old.get('category', 'Other')] -= 1
+                if self._category_counts[old.get('category', 'Other')] <= 0:
+                    del self._category_counts[old.get('category', 'Other')]
+            if event.kind != "deleted":
+                self._cars_cache[key] = car
+                self._category_counts[car.get('category', 'Other')] += 1
+
+        if self._car_list is None:
+            return
+        try:
+            controls = self._car_list.controls
+            card = self._card_by_key.pop(key, None) or self._card_by_key.pop(car['model'].lower(), None)
+            if card is not None and card in controls:
+                position = controls.index(card)
+                if event.kind == "deleted" or not self._matches_facets(car):
+                    del controls[position]
+                else:
+                    controls[position] = self._card_by_key[key] = self._create_car_card(car)
+            elif event.kind == "added" and not self._list_search_term and self._matches_facets(car):
+                if isinstance(self._current_cars, list):
+                    self._current_cars.append(car)
+                if not self._card_by_key:
+                    # Replace the empty-collection placeholder
+                    controls[2:] = self._create_car_cards_optimized(self._current_cars)
+                elif len(self._card_by_key) < self._max_cards_initial:
+                    new_card = self._card_by_key[key] = self._create_car_card(car)
+                    last = controls[-1] if controls else None
+                    if last is not None and getattr(last, "key", None) == "load_more_container":
+                        controls.insert(len(controls) - 1, new_card)
+                    else:
+                        controls.append(new_card)
+                elif getattr(controls[-1], "key", None) != "load_more_container":
+                    controls.append(self._create_load_more_button(1))
+
+            self._stat_texts["total"].value = f"{len(cars) if budgeted else len(self._cars_cache)}"
+            self._stat_texts["categories"].value = f"{len(self._category_counts)}"
+            self._facet_bar.controls = self._create_facet_bar()
+            if self.page.views and self.page.views[-1].controls and self.page.views[-1].controls[0] is self._car_list:
+                self.page.update()
+        except Exception as e:
+            print(f"Error patching car list: {e}")
+            self._invalidate_cache()
+
     def _create_car_cards_optimized(self, cars):
         """Create modern car cards with enhanced UI"""
         if not cars:
@@ -438,155 +717,198 @@ class FletApp:
         # Use the current limit from instance variable
         display_limit = min(len(cars), self._max_cards_initial)
         
-        for i, car in enumerate(cars[:display_limit]):
-            # Get category color
-            category_colors = {
-                'Sports Car': ft.Colors.RED_400,
-                'Racing': ft.Colors.ORANGE_400,
-                'SUV': ft.Colors.GREEN_400,
-                'Sedan': ft.Colors.BLUE_400,
-                'Coupe': ft.Colors.PURPLE_400,
-                'Convertible': ft.Colors.PINK_400,
-                'Truck': ft.Colors.BROWN_400,
-                'Luxury': ft.Colors.AMBER_400,
-            }
-            category = car.get('category', 'Other')
-            category_color = category_colors.get(category, ft.Colors.GREY_400)
-            
-            # Modern card design
-            card = ft.Card(
-                content=ft.Container(
-                    content=ft.Column([
-                        # Header with car avatar and category badge
-                        ft.Row([
-                            ft.Container(
-                                content=ft.Text(car.get('model', 'C')[0].upper(), 
-                                              color=ft.Colors.WHITE, 
-                                              size=16, 
-                                              weight=ft.FontWeight.BOLD),
-                                bgcolor=ft.Colors.INDIGO_600,
-                                border_radius=20,
-                                width=40,
-                                height=40,
-                                alignment=ft.alignment.center
-                            ),
-                            ft.Container(
-                                content=ft.Column([
-                                    ft.Text(car.get('model', 'Unknown'), 
-                                           size=16, 
-                                           weight=ft.FontWeight.BOLD,
-                                           color=ft.Colors.GREY_800),
-                                    ft.Text(f"{car.get('manufacturer', '')} • {car.get('year', '')}", 
-                                           size=13, 
-                                           color=ft.Colors.GREY_600)
-                                ], spacing=2),
-                                expand=True,
-                                padding=ft.padding.only(left=12)
-                            ),
-                            ft.Container(
-                                content=ft.Text(category, size=10, color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD),
-                                bgcolor=category_color,
-                                border_radius=8,
-                                padding=ft.padding.symmetric(horizontal=8, vertical=4)
-                            )
-                        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                        
-                        # Country and additional info
+        self._card_by_key = {}
+        for car in cars[:display_limit]:
+            card = self._create_car_card(car)
+            self._card_by_key[self._card_key(car)] = card
+            cards.append(card)
+        
+        # Modern "Load More" button
+        if len(cars) > display_limit:
+            cards.append(self._create_load_more_button(len(cars) - display_limit))
+        
+        return cards
+
+    def _create_car_card(self, car):
+        """Create one modern car card"""
+        # Get category color
+        category_colors = {
+            'Sports Car': ft.Colors.RED_400,
+            'Racing': ft.Colors.ORANGE_400,
+            'SUV': ft.Colors.GREEN_400,
+            'Sedan': ft.Colors.BLUE_400,
+            'Coupe': ft.Colors.PURPLE_400,
+            'Convertible': ft.Colors.PINK_400,
+            'Truck': ft.Colors.BROWN_400,
+            'Luxury': ft.Colors.AMBER_400,
+        }
+        category = car.get('category', 'Other')
+        category_color = category_colors.get(category, ft.Colors.GREY_400)
+
+        # Initial of the model, replaced by the car's photo once its thumbnail is loaded
+        avatar = ft.Container(
+            content=ft.Text(car.get('model', 'C')[0].upper(), 
+                          color=ft.Colors.WHITE, 
+                          size=16, 
+                          weight=ft.FontWeight.BOLD),
+            bgcolor=ft.Colors.INDIGO_600,
+            border_radius=20,
+            width=40,
+            height=40,
+            alignment=ft.alignment.center,
+            clip_behavior=ft.ClipBehavior.ANTI_ALIAS
+        )
+        if car.get('id'):
+            self._queue_thumbnail(car['id'], avatar)
+
+        # Modern card design
+        return ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    # Header with car avatar and category badge
+                    ft.Row([
+                        avatar,
                         ft.Container(
-                            content=ft.Row([
-                                ft.Icon(ft.Icons.PUBLIC, size=14, color=ft.Colors.GREY_500),
-                                ft.Text(car.get('country_of_origin', 'Unknown'), 
-                                       size=12, 
-                                       color=ft.Colors.GREY_600),
-                                ft.Container(expand=True),
-                                ft.Icon(ft.Icons.TOYS, size=14, color=ft.Colors.GREY_500),
-                                ft.Text(car.get('replica_model', 'N/A'), 
-                                       size=12, 
+                            content=ft.Column([
+                                ft.Text(car.get('model', 'Unknown'), 
+                                       size=16, 
+                                       weight=ft.FontWeight.BOLD,
+                                       color=ft.Colors.GREY_800),
+                                ft.Text(f"{car.get('manufacturer', '')} • {car.get('year', '')}", 
+                                       size=13, 
                                        color=ft.Colors.GREY_600)
-                            ], spacing=4),
-                            margin=ft.margin.only(top=8)
+                            ], spacing=2),
+                            expand=True,
+                            padding=ft.padding.only(left=12)
                         ),
-                        
-                        # Action buttons with modern design
                         ft.Container(
-                            content=ft.Row([
-                                ft.IconButton(
-                                    icon=ft.Icons.EDIT_OUTLINED,
-                                    icon_color=ft.Colors.INDIGO_600,
-                                    tooltip="Edit Car",
-                                    on_click=lambda e, model=car.get('model'): self.page.go(f"/edit_car/{model}"),
-                                    style=ft.ButtonStyle(
-                                        shape=ft.CircleBorder(),
-                                        bgcolor=ft.Colors.INDIGO_50
-                                    )
-                                ),
-                                ft.IconButton(
-                                    icon=ft.Icons.DELETE_OUTLINE,
-                                    icon_color=ft.Colors.RED_600,
-                                    tooltip="Delete Car",
-                                    on_click=lambda e, model=car.get('model'): self.show_delete_dialog(model),
-                                    style=ft.ButtonStyle(
-                                        shape=ft.CircleBorder(),
-                                        bgcolor=ft.Colors.RED_50
-                                    )
-                                ),
-                                ft.Container(expand=True),
-                                ft.IconButton(
-                                    icon=ft.Icons.OPEN_IN_NEW,
-                                    icon_color=ft.Colors.GREEN_600 if car.get('info') else ft.Colors.GREY_400,
-                                    tooltip="More Info",
-                                    on_click=lambda e, url=car.get('info', ''): self.page.launch_url(url) if url else None,
-                                    disabled=not car.get('info'),
-                                    style=ft.ButtonStyle(
-                                        shape=ft.CircleBorder(),
-                                        bgcolor=ft.Colors.GREEN_50 if car.get('info') else ft.Colors.GREY_100
-                                    )
-                                )
-                            ], alignment=ft.MainAxisAlignment.START),
-                            margin=ft.margin.only(top=8)
+                            content=ft.Text(category, size=10, color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD),
+                            bgcolor=category_color,
+                            border_radius=8,
+                            padding=ft.padding.symmetric(horizontal=8, vertical=4)
                         )
-                    ], spacing=0),
-                    padding=ft.padding.all(16),
-                    border_radius=12
-                ),
-                elevation=2,
-                margin=ft.margin.symmetric(horizontal=4, vertical=4),
-                surface_tint_color=ft.Colors.INDIGO_50
-            )
-            cards.append(card)
-        
-        # Modern "Load More" button
-        if len(cars) > display_limit:
-            cards.append(
-                ft.Container(
-                    content=ft.ElevatedButton(
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+
+                    # Country and additional info
+                    ft.Container(
                         content=ft.Row([
-                            ft.Icon(ft.Icons.EXPAND_MORE, size=20),
-                            ft.Text(f"Load {min(15, len(cars) - display_limit)} more cars", size=14)
-                        ], alignment=ft.MainAxisAlignment.CENTER, spacing=8),
-                        on_click=lambda e: self._load_more_cars_improved(e),
-                        style=ft.ButtonStyle(
-                            bgcolor=ft.Colors.INDIGO_100,
-                            color=ft.Colors.INDIGO_700,
-                            padding=ft.padding.symmetric(horizontal=24, vertical=12),
-                            shape=ft.RoundedRectangleBorder(radius=20),
-                            elevation=1
-                        ),
-                        key="load_more_btn"
+                            ft.Icon(ft.Icons.PUBLIC, size=14, color=ft.Colors.GREY_500),
+                            ft.Text(car.get('country_of_origin', 'Unknown'), 
+                                   size=12, 
+                                   color=ft.Colors.GREY_600),
+                            ft.Container(expand=True),
+                            ft.Icon(ft.Icons.TOYS, size=14, color=ft.Colors.GREY_500),
+                            ft.Text(car.get('replica_model', 'N/A'), 
+                                   size=12, 
+                                   color=ft.Colors.GREY_600)
+                        ], spacing=4),
+                        margin=ft.margin.only(top=8)
                     ),
-                    alignment=ft.alignment.center,
-                    padding=ft.padding.all(12),
-                    key="load_more_container"
-                )
-            )
-        
-        return cards
+
+                    # Action buttons with modern design
+                    ft.Container(
+                        content=ft.Row([
+                            ft.IconButton(
+                                icon=ft.Icons.EDIT_OUTLINED,
+                                icon_color=ft.Colors.INDIGO_600,
+                                tooltip="Edit Car",
+                                on_click=lambda e, key=self._card_key(car): self.page.go(f"/edit_car/{key}"),
+                                style=ft.ButtonStyle(
+                                    shape=ft.CircleBorder(),
+                                    bgcolor=ft.Colors.INDIGO_50
+                                )
+                            ),
+                            ft.IconButton(
+                                icon=ft.Icons.DELETE_OUTLINE,
+                                icon_color=ft.Colors.RED_600,
+                                tooltip="Delete Car",
+                                on_click=lambda e, model=car.get('model'): self.show_delete_dialog(model),
+                                style=ft.ButtonStyle(
+                                    shape=ft.CircleBorder(),
+                                    bgcolor=ft.Colors.RED_50
+                                )
+                            ),
+                            ft.Container(expand=True),
+                            ft.IconButton(
+                                icon=ft.Icons.OPEN_IN_NEW,
+                                icon_color=ft.Colors.GREEN_600 if car.get('info') else ft.Colors.GREY_400,
+                                tooltip="More Info",
+                                on_click=lambda e, url=car.get('info', ''): self.page.launch_url(url) if url else None,
+                                disabled=not car.get('info'),
+                                style=ft.ButtonStyle(
+                                    shape=ft.CircleBorder(),
+                                    bgcolor=ft.Colors.GREEN_50 if car.get('info') else ft.Colors.GREY_100
+                                )
+                            )
+                        ], alignment=ft.MainAxisAlignment.START),
+                        margin=ft.margin.only(top=8)
+                    )
+                ], spacing=0),
+                padding=ft.padding.all(16),
+                border_radius=12
+            ),
+            elevation=2,
+            margin=ft.margin.symmetric(horizontal=4, vertical=4),
+            surface_tint_color=ft.Colors.INDIGO_50
+        )
+
+    def _queue_thumbnail(self, car_id, avatar):
+        """Load a card's photo in the background; only cards actually built (the visible page) get here"""
+        self._thumbnail_queue.put((car_id, avatar))
+        if self._thumbnail_worker is None or not self._thumbnail_worker.is_alive():
+            self._thumbnail_worker = threading.Thread(target=self._load_thumbnails, daemon=True)
+            self._thumbnail_worker.start()
+
+    def _load_thumbnails(self):
+        """Fill in queued avatars with thumbnails, updating the page once per batch"""
+        while True:
+            try:
+                batch = [self._thumbnail_queue.get(timeout=1)]
+            except queue.Empty:
+                return
+            while not self._thumbnail_queue.empty():
+                batch.append(self._thumbnail_queue.get_nowait())
+            changed = False
+            for car_id, avatar in batch:
+                thumb = self.car_tracker.thumbnail(car_id)
+                if thumb is not None:
+                    avatar.content = ft.Image(src_base64=base64.b64encode(thumb).decode("ascii"),
+                                              width=40, height=40, fit=ft.ImageFit.COVER)
+                    changed = True
+            if changed and getattr(self, "page", None) is not None:
+                try:
+                    self.page.update()
+                except Exception as e:
+                    print(f"Error showing thumbnails: {e}")
+
+    def _create_load_more_button(self, remaining):
+        """Button that shows the next batch of cars"""
+        return ft.Container(
+            content=ft.ElevatedButton(
+                content=ft.Row([
+                    ft.Icon(ft.Icons.EXPAND_MORE, size=20),
+                    ft.Text(f"Load {min(15, remaining)} more cars", size=14)
+                ], alignment=ft.MainAxisAlignment.CENTER, spacing=8),
+                on_click=lambda e: self._load_more_cars_improved(e),
+                style=ft.ButtonStyle(
+                    bgcolor=ft.Colors.INDIGO_100,
+                    color=ft.Colors.INDIGO_700,
+                    padding=ft.padding.symmetric(horizontal=24, vertical=12),
+                    shape=ft.RoundedRectangleBorder(radius=20),
+                    elevation=1
+                ),
+                key="load_more_btn"
+            ),
+            alignment=ft.alignment.center,
+            padding=ft.padding.all(12),
+            key="load_more_container"
+        )
 
     def _load_more_cars_improved(self, e):
         """Load more cars without losing scroll position"""
         try:
             # Get current cars and increase display limit
-            current_cars = getattr(self, '_current_cars', self._get_cars_data())
+            current_cars = self._live_current_cars()
             old_limit = self._max_cards_initial
             new_limit = min(len(current_cars), old_limit + 15)
             self._max_cards_initial = new_limit
@@ -599,11 +921,11 @@ class FletApp:
                     for control in current_view.controls:
                         if isinstance(control, ft.ListView):
                             # Get updated car cards
-                            header = control.controls[0]  # Keep the header
+                            header = control.controls[:2]  # Keep the header and filter chips
                             updated_cards = self._create_car_cards_optimized(current_cars)
                             
                             # Update ListView controls while preserving scroll
-                            control.controls = [header] + updated_cards
+                            control.controls = header + updated_cards
                             
                             # Update the page
                             self.page.update()
@@ -639,11 +961,21 @@ class FletApp:
             navigation_bar=self.page.navigation_bar
         )
 
-    def create_edit_car_view(self, model_name):
-        car_to_edit = next((car for car in self.car_tracker.displayData() if car.get('model') == model_name), None)
+    def _photo_picker(self):
+        """The page's file picker, created once (it has to live in the page overlay)"""
+        if self._picker is None:
+            self._picker = ft.FilePicker()
+            self.page.overlay.append(self._picker)
+            self.page.update()
+        return self._picker
+
+    def create_edit_car_view(self, car_key):
+        """Edit form for the car with this id, or this model name (ranked search results carry no id)"""
+        car_to_edit = self.car_tracker.getCarById(car_key) or self.car_tracker.getCar(car_key)
 
         if not car_to_edit:
-            return ft.View(f"/edit_car/{model_name}", [ft.AppBar(title=ft.Text("Edit Car"), bgcolor="#333333"), ft.Text("Car not found.")])
+            return ft.View(f"/edit_car/{car_key}", [ft.AppBar(title=ft.Text("Edit Car"), bgcolor="#333333"), ft.Text("Car not found.")])
+        model_name = car_to_edit["model"]
 
         fields = {
             "modelName": ft.TextField(label="Model Name", value=car_to_edit.get("model", ""), disabled=True),
@@ -655,6 +987,32 @@ class FletApp:
             "more": ft.TextField(label="More Info (URL)", value=car_to_edit.get("info", ""))
         }
 
+        photo_row = ft.Row(wrap=True, spacing=8)
+
+        def show_photos():
+            photo_row.controls = []
+            for photo in self.car_tracker.photos(model_name):
+                thumb = self.car_tracker.photoThumbnail(photo)
+                if thumb is not None:
+                    photo_row.controls.append(ft.Image(src_base64=base64.b64encode(thumb).decode("ascii"),
+                                                       width=80, height=80, fit=ft.ImageFit.COVER,
+                                                       border_radius=8))
+
+        def photos_picked(e):
+            added = 0
+            for picked in e.files or []:
+                if picked.path and self.car_tracker.addPhoto(model_name, picked.path):
+                    added += 1
+            if e.files and not added:
+                self.show_error("Could not add the selected photo.")
+                return
+            show_photos()
+            self.page.update()
+
+        picker = self._photo_picker()
+        picker.on_result = photos_picked
+        show_photos()
+
         def update_car_click(e):
             try:
                 # Create a new dictionary for the updated data
@@ -662,37 +1020,36 @@ class FletApp:
                 # The modelName is disabled, so its value won't be in the dictionary, add it back
                 updated_data['modelName'] = model_name
 
-                # Delete the old record and add the new one
-                delete_success = self.car_tracker.deleteData(model_name)
-                if delete_success:
-                    add_success = self.car_tracker.addData(
-                        modelName=updated_data["modelName"],
-                        manufacturer=updated_data["manufacturer"], 
-                        year=updated_data["year"],
-                        originCountry=updated_data["originCountry"],
-                        category=updated_data["category"],
-                        modelManufact=updated_data["modelManufact"],
-                        more=updated_data["more"]
-                    )
-                    if add_success:
-                        # Invalidate cache and show success
-                        self._invalidate_cache()
-                        self.show_success("Car updated successfully!")
-                        self.page.go("/")
-                    else:
-                        self.show_error("Failed to update car. Please try again.")
+                success = self.car_tracker.updateData(
+                    modelName=updated_data["modelName"],
+                    manufacturer=updated_data["manufacturer"],
+                    year=updated_data["year"],
+                    originCountry=updated_data["originCountry"],
+                    category=updated_data["category"],
+                    modelManufact=updated_data["modelManufact"],
+                    more=updated_data["more"]
+                )
+                if success:
+                    # The change event already patched the car's card
+                    self.show_success("Car updated successfully!")
+                    self.page.go("/")
                 else:
                     self.show_error("Failed to update car. Please try again.")
             except Exception as ex:
                 self.show_error(f"Error updating car: {str(ex)}")
 
         return ft.View(
-            f"/edit_car/{model_name}",
+            f"/edit_car/{car_key}",
             [
                 ft.AppBar(title=ft.Text("Edit Car"), bgcolor="#333333"),
-                *fields.values(),
+                *[self._with_suggestions(field, SUGGESTION_FIELDS[key]) if key in SUGGESTION_FIELDS else field
+                  for key, field in fields.items()],
+                photo_row,
                 ft.Row(
                     [
+                        ft.ElevatedButton("Add Photo", icon=ft.Icons.ADD_A_PHOTO_OUTLINED,
+                                          on_click=lambda _: picker.pick_files(allow_multiple=True,
+                                                                               file_type=ft.FilePickerFileType.IMAGE)),
                         ft.ElevatedButton("Update Car", on_click=update_car_click),
                         ft.ElevatedButton("Cancel", on_click=lambda _: self.page.go("/")),
                     ],
@@ -745,9 +1102,6 @@ class FletApp:
                         field.value = ""
                         field.error_text = None
                     
-                    # Invalidate cache to ensure fresh data
-                    self._invalidate_cache()
-                    
                     # Show success message
                     self.show_success("Car added successfully!")
                     
@@ -769,8 +1123,10 @@ class FletApp:
                         self._create_modern_header("Add New Car", "Add a new car to your collection", ft.Icons.ADD_CIRCLE),
                         
                         # Form fields with improved spacing
-                        *[ft.Container(content=field, margin=ft.margin.only(bottom=16)) 
-                          for field in fields.values()],
+                        *[ft.Container(
+                            content=self._with_suggestions(field, SUGGESTION_FIELDS[key]) if key in SUGGESTION_FIELDS else field,
+                            margin=ft.margin.only(bottom=16))
+                          for key, field in fields.items()],
                         
                         # Action buttons with modern styling using helper method
                         ft.Container(
@@ -799,6 +1155,7 @@ class FletApp:
         search_field = self._create_modern_text_field("Search Cars", "Enter car model to search...", ft.Icons.SEARCH)
         search_field.bgcolor = UIConstants.SURFACE_COLOR
         search_field.on_submit = lambda e: self.perform_search(e.control.value)
+        self._search_field = search_field
         
         search_button = self._create_modern_button("Search", ft.Icons.SEARCH, lambda _: self.perform_search(search_field.value))
         
@@ -829,7 +1186,7 @@ class FletApp:
                             content=ft.Row([
                                 ft.Icon(ft.Icons.INFO_OUTLINE, color=UIConstants.TEXT_SECONDARY, size=UIConstants.ICON_SIZE_SMALL),
                                 ft.Text(
-                                    "Enter a car model name to search through your collection",
+                                    "Search by model name, or any words like a category, country or maker",
                                     color=UIConstants.TEXT_SECONDARY,
                                     size=UIConstants.FONT_SIZE_MEDIUM
                                 )
@@ -853,6 +1210,55 @@ class FletApp:
             navigation_bar=self.page.navigation_bar
         )
     
+    def create_stats_view(self):
+        """Pivot reports of the collection, one tab per report (see app.reports)"""
+        tabs = [ft.Tab(text=REPORT_TABS[name], content=self._report_table(title, self.car_tracker.report(name)))
+                for name, title in REPORTS.items()]
+        return ft.View(
+            "/stats",
+            [
+                ft.Container(
+                    content=ft.Column([
+                        self._create_modern_header("Collection Stats", "Breakdowns of your collection", ft.Icons.INSIGHTS),
+                        ft.Tabs(tabs=tabs, selected_index=0, expand=True),
+                    ], spacing=0, expand=True),
+                    padding=ft.padding.all(UIConstants.PADDING_LARGE),
+                    expand=True
+                )
+            ],
+            appbar=ft.AppBar(
+                title=ft.Text("Stats", color=UIConstants.SURFACE_COLOR),
+                bgcolor=UIConstants.PRIMARY_COLOR,
+                color=UIConstants.SURFACE_COLOR
+            ),
+            bgcolor=UIConstants.BACKGROUND_COLOR,
+            navigation_bar=self.page.navigation_bar
+        )
+
+    def _report_table(self, title, rows):
+        """One report as a scrollable table; long reports show their first rows (and the total row)"""
+        if not rows:
+            return ft.Container(ft.Text("No cars to report on yet", color=UIConstants.TEXT_SECONDARY),
+                                padding=ft.padding.all(UIConstants.PADDING_LARGE))
+        fields = list(rows[0])
+        shown = rows
+        if len(rows) > REPORT_TABLE_ROWS:
+            shown = rows[:REPORT_TABLE_ROWS] + (rows[-1:] if rows[-1][fields[0]] == "Total" else [])
+        table = ft.DataTable(
+            columns=[ft.DataColumn(ft.Text(field.replace("_", " ").capitalize(), weight=ft.FontWeight.BOLD),
+                                   numeric=field != fields[0])
+                     for field in fields],
+            rows=[ft.DataRow(cells=[ft.DataCell(ft.Text(str(row[field]))) for field in fields]) for row in shown],
+            column_spacing=UIConstants.SPACING_LARGE,
+            heading_row_color=UIConstants.PRIMARY_SURFACE,
+        )
+        controls = [ft.Text(title, size=UIConstants.FONT_SIZE_LARGE, color=UIConstants.TEXT_PRIMARY),
+                    ft.Row([table], scroll=ft.ScrollMode.AUTO)]
+        if len(shown) < len(rows):
+            controls.append(ft.Text(f"Showing {len(shown)} of {len(rows)} rows", size=UIConstants.FONT_SIZE_SMALL,
+                                    color=UIConstants.TEXT_SECONDARY))
+        return ft.Column(controls, spacing=UIConstants.SPACING_STANDARD, scroll=ft.ScrollMode.AUTO)
+
     def perform_search(self, search_term):
         if search_term and search_term.strip():
             self.page.go(f"/search/{search_term.strip()}")
@@ -864,23 +1270,46 @@ class FletApp:
         self.page.views.clear()
 
         if route_path == "/":
-            self.page.views.append(self.create_main_view(force_refresh=True))
-        elif self.page.route == "/add_car":
+            # Reading the version picks up changes made outside the app, which drop the cached view
+            self.car_tracker.version
+            if self._main_view is not None and not self._cache_dirty:
+                if self._home_state is not None:
+                    for name, value in self._home_state.items():
+                        setattr(self, name, value)
+                    self._home_state = None
+                self.page.views.append(self._main_view)
+            else:
+                self.page.views.append(self.create_main_view(force_refresh=True))
+        elif route_path == "/add_car":
+            # Built fresh each time like the edit form, so input abandoned with Cancel doesn't come back
             self.page.views.append(self.create_add_car_view())
-        elif self.page.route.startswith("/edit_car/"):
-            model_name = self.page.route.split("/")[-1]
-            self.page.views.append(self.create_edit_car_view(model_name))
+        elif route_path.startswith("/edit_car/"):
+            # Built fresh each time, so changes abandoned with Cancel don't come back
+            self.page.views.append(self.create_edit_car_view(route_path[len("/edit_car/"):]))
         elif route_path == "/search":
-            self.page.views.append(self.create_search_view())
+            view = self._cached_view(route_path, self.create_search_view)
+            # Start from an empty field, not text typed and abandoned on the last visit
+            self._search_field.value = ""
+            self.page.views.append(view)
+        elif route_path == "/stats":
+            self.page.views.append(self._cached_view(route_path, self.create_stats_view))
         elif route_path.startswith("/search/"):
             search_term = route_path.split("/")[-1]
-            self.page.views.append(self.create_main_view(search_term=search_term, force_refresh=True))
+            self.page.views.append(self.create_main_view(search_term=search_term))
         else:
             # Default to main view if route is unknown
             self.page.views.append(self.create_main_view(force_refresh=True))
         
         self.page.update()
 
+    def _cached_view(self, route, build):
+        """View for one of CACHED_ROUTES, rebuilt only when the collection version changed"""
+        version = self.car_tracker.version
+        entry = self._view_cache.get(route)
+        if entry is None or entry[0] != version:
+            entry = self._view_cache[route] = (version, build())
+        return entry[1]
+
     def view_pop(self, view):
         if len(self.page.views) > 1:
             self.page.views.pop()
@@ -894,7 +1323,7 @@ class FletApp:
             self.page.go("/")
 
     def nav_change(self, e):
-        destinations = ["/", "/search", "/add_car"]
+        destinations = ["/", "/search", "/add_car", "/stats"]
         self.page.go(destinations[e.control.selected_index])
 
 def run_flet_app():
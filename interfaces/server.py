@@ -0,0 +1,543 @@
+"""Local HTTP/JSON API over CarTracker: python main.py --serve [--host H] [--port P]
+
+Endpoints (field filters are query parameters named after car fields, e.g.
+``?manufacturer=ford&year=1960-1970``):
+
+- ``GET /cars?offset=&limit=&sort=&desc=`` - one page of cars plus the total
+- ``GET /cars/<model>`` - one car; ``PUT`` updates it, ``DELETE`` removes it
+- ``POST /cars`` - add a car from a JSON object
+- ``GET /search?q=&mode=model|fuzzy|text&limit=`` - the CLI's search modes
+- ``GET /stats`` and ``GET /facets?facet=field=value&field=`` - counts
+- ``POST /import`` - JSON lines, one car (or batch operation) per line, applied
+  in batches as the body arrives
+- ``GET /export?format=jsonl|csv`` - the collection, streamed in chunks from
+  the store file without holding up writes; if it fails part way or the
+  client stops reading, the connection is closed before the final chunk
+
+Connections are handled by asyncio; tracker calls run in a thread pool so a
+slow request never holds up the others. Reads share the in-memory collection
+and run concurrently, writes run one at a time and wait for the reads in
+flight to finish (_ReadWriteLock). GET responses carry an ETag made from the
+collection version, and a request whose If-None-Match is still current gets
+304 Not Modified without running the query.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from http import HTTPStatus
+from itertools import islice
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from app import CarTracker
+from app.models import ALLOWED_KEYS
+from app.records import REPLACES_OPEN_FILES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+# Lines of a POST /import body applied per save
+IMPORT_BATCH = 5000
+# Cars per chunk of a GET /export response
+EXPORT_CHUNK = 1000
+# Seconds a client may take to accept a chunk before its export is dropped
+EXPORT_DRAIN_TIMEOUT = 30
+MAX_HEADER_LINES = 100
+PUBLIC_FIELDS = [key for key in ALLOWED_KEYS if key != "id"]
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Request:
+    __slots__ = ("method", "path", "params", "headers", "body", "keep_alive")
+
+    def __init__(self, method, target, version, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = [unquote(part) for part in url.path.split("/") if part]
+        self.params = parse_qs(url.query, keep_blank_values=True)
+        self.headers = headers
+        self.body = body
+        connection = headers.get("connection", "").lower()
+        self.keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+    def param(self, name, default=None):
+        values = self.params.get(name)
+        return values[-1] if values else default
+
+    def int_param(self, name, default, maximum=None):
+        value = self.param(name)
+        if value in (None, ""):
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise HttpError(400, f"{name} must be an integer") from None
+        if number < 0:
+            raise HttpError(400, f"{name} must not be negative")
+        return min(number, maximum) if maximum is not None else number
+
+    def query(self):
+        """Field filters from the query string, as a tracker query dict"""
+        return {field: values[-1] for field, values in self.params.items() if field in ALLOWED_KEYS} or None
+
+    @staticmethod
+    def json_body(body):
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON") from None
+        if not isinstance(data, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return data
+
+
+class _Body:
+    """A request body read on demand: Content-Length or chunked transfer encoding"""
+
+    def __init__(self, reader, headers):
+        self._reader = reader
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self.consumed = False
+        if self._chunked and "content-length" in headers:
+            # Proxies may frame such a body differently, so refuse to guess
+            raise HttpError(400, "Content-Length is not allowed with chunked Transfer-Encoding")
+        try:
+            self._remaining = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length") from None
+
+    async def chunks(self):
+        if self.consumed:
+            return
+        if self._chunked:
+            while True:
+                try:
+                    size = int((await self._reader.readline()).split(b";")[0].strip() or b"0", 16)
+                except ValueError:
+                    raise HttpError(400, "Invalid chunked body") from None
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                yield await self._reader.readexactly(size)
+                await self._reader.readline()
+        while self._remaining > 0:
+            chunk = await self._reader.read(min(self._remaining, 1 << 16))
+            if not chunk:
+                raise HttpError(400, "Request body ended early")
+            self._remaining -= len(chunk)
+            yield chunk
+        self.consumed = True
+
+    async def read(self):
+        return b"".join([chunk async for chunk in self.chunks()])
+
+    async def lines(self):
+        pending = b""
+        async for chunk in self.chunks():
+            pending += chunk
+            *complete, pending = pending.split(b"\n")
+            for line in complete:
+                yield line
+        if pending:
+            yield pending
+
+
+class _ReadWriteLock:
+    """Any number of readers or one writer; a waiting writer holds back new readers"""
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._condition:
+            self._writers_waiting += 1
+            await self._condition.wait_for(lambda: not self._writing and not self._readers)
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+_NOT_MODIFIED = object()
+
+
+class ApiServer:
+    def __init__(self, tracker=None, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=8):
+        self.tracker = tracker or CarTracker()
+        self.host = host
+        self.port = port
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cardb-api")
+        self._lock = None
+        # ETags are only comparable within one server run
+        self._boot = uuid.uuid4().hex[:8]
+
+    async def start(self):
+        """Start listening and return the asyncio server (port 0 picks a free port)"""
+        self._lock = _ReadWriteLock()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"Serving the CarDb API on http://{self.host}:{self.port} (Ctrl+C to stop)")
+        async with server:
+            await server.serve_forever()
+
+    def _etag(self):
+        return f'"{self._boot}-{self.tracker.version}"'
+
+    def _run(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _read(self, request, produce):
+        """Run produce() under the read lock, or answer 304 if the client's copy is current"""
+        def job():
+            etag = self._etag()
+            if etag in request.headers.get("if-none-match", ""):
+                return etag, _NOT_MODIFIED
+            return etag, produce()
+
+        async with self._lock.read():
+            etag, payload = await self._run(job)
+        if payload is _NOT_MODIFIED:
+            return 304, None, {"ETag": etag}
+        if payload is None:
+            raise HttpError(404, "Not found")
+        return 200, payload, {"ETag": etag, "Cache-Control": "no-cache"}
+
+    async def _write(self, function, *args):
+        async with self._lock.write():
+            return await self._run(function, *args)
+
+    # -- connections -------------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                keep_alive = await self._handle_request(request_line, reader, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, request_line, reader, writer):
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            await self._respond(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+            return False
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            await self._respond(writer, 431, {"error": "Too many header lines"}, keep_alive=False)
+            return False
+
+        request = None
+        try:
+            body = _Body(reader, headers)
+            request = _Request(method.upper(), target, version, headers, body)
+            result = await self._route(request, writer)
+            # Skip any body the endpoint didn't read, so the next request starts cleanly
+            await body.read()
+            if result is None:
+                # The handler streamed its own response
+                return request.keep_alive
+            status, payload, extra = result
+            await self._respond(writer, status, payload, extra, request.keep_alive)
+        except HttpError as e:
+            await self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+            return False
+        except ValueError as e:
+            await self._respond(writer, 400, {"error": str(e)}, keep_alive=False)
+            return False
+        except Exception as e:
+            print(f"Error handling {method} {target}: {e}")
+            await self._respond(writer, 500, {"error": "Internal server error"}, keep_alive=False)
+            return False
+        return request.keep_alive
+
+    @staticmethod
+    def _status_line(status):
+        return f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+
+    async def _respond(self, writer, status, payload=None, headers=None, keep_alive=True):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        head = self._status_line(status)
+        if payload is not None:
+            head += "Content-Type: application/json; charset=utf-8\r\n"
+        head += f"Content-Length: {len(body)}\r\n"
+        head += f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        for name, value in (headers or {}).items():
+            head += f"{name}: {value}\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+    # -- routes ------------------------------------------------------------
+
+    async def _route(self, request, writer):
+        path, method = request.path, request.method
+        if path == ["cars"]:
+            if method == "GET":
+                return await self._list_cars(request)
+            if method == "POST":
+                return await self._add_car(request)
+        elif len(path) == 2 and path[0] == "cars":
+            if method == "GET":
+                return await self._read(request, lambda: self.tracker.getCar(path[1]))
+            if method == "PUT":
+                return await self._update_car(request, path[1])
+            if method == "DELETE":
+                return await self._delete_car(path[1])
+        elif path == ["search"] and method == "GET":
+            return await self._search(request)
+        elif path == ["stats"] and method == "GET":
+            return await self._read(request, self.tracker.stats)
+        elif path == ["facets"] and method == "GET":
+            return await self._facets(request)
+        elif path == ["import"] and method == "POST":
+            return await self._import(request)
+        elif path == ["export"] and method == "GET":
+            return await self._export(request, writer)
+        else:
+            raise HttpError(404, "Unknown endpoint")
+        raise HttpError(405, f"{method} is not supported here")
+
+    async def _list_cars(self, request):
+        offset = request.int_param("offset", 0)
+        limit = request.int_param("limit", DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        sort_by = request.param("sort") or None
+        descending = request.param("desc", "").lower() in ("1", "true", "yes")
+        query = request.query()
+
+        def page():
+            cars, total = self.tracker.displayPage(offset, limit, sort_by, descending, query, cached=True)
+            return {"total": total, "offset": offset, "limit": limit, "cars": cars}
+        return await self._read(request, page)
+
+    async def _search(self, request):
+        text = request.param("q", "")
+        mode = request.param("mode", "model")
+        limit = request.int_param("limit", 20, MAX_PAGE_SIZE)
+        searches = {
+            "model": lambda: self.tracker.search(text)[:limit],
+            "fuzzy": lambda: self.tracker.fuzzySearch(text, limit),
+            "text": lambda: self.tracker.fullTextSearch(text, limit),
+        }
+        if mode not in searches:
+            raise HttpError(400, f"mode must be one of {', '.join(searches)}")
+        return await self._read(request, lambda: {"cars": searches[mode]()})
+
+    async def _facets(self, request):
+        filters = {}
+        for item in request.params.get("facet", []):
+            field, sep, value = item.partition("=")
+            if not sep:
+                raise HttpError(400, f"Expected facet=field=value, got '{item}'")
+            filters.setdefault(field.strip(), []).append(value.strip())
+        fields = request.params.get("field") or None
+        return await self._read(request, lambda: self.tracker.facetCounts(filters, fields))
+
+    async def _add_car(self, request):
+        fields = await self._fields(request)
+
+        def add():
+            results = self.tracker.applyBatch([dict(fields, op="add")])
+            result = results[0] if results else {"status": "error", "model": ""}
+            if result["status"] == "duplicate":
+                raise HttpError(409, f"Car with model '{result['model']}' already exists")
+            if result["status"] != "ok":
+                raise HttpError(400, result.get("error") or "Could not add the car")
+            return self.tracker.getCar(result["model"]), self._etag()
+
+        car, etag = await self._write(add)
+        return 201, car, {"ETag": etag}
+
+    async def _update_car(self, request, model):
+        fields = await self._fields(request)
+
+        def update():
+            existing = self.tracker.getCar(model)
+            if existing is None:
+                raise HttpError(404, f"Car with model '{model}' not found")
+            if str(fields.get("model", existing["model"])).strip().lower() != existing["model"].lower():
+                raise HttpError(400, "The model name of a car cannot be changed")
+            car = dict(existing, **fields)
+            if not self.tracker.updateData(car["model"], car["manufacturer"], car["year"], car["country_of_origin"],
+                                           car["category"], car["replica_model"], car["info"]):
+                raise HttpError(400, "Could not update the car")
+            return self.tracker.getCar(model), self._etag()
+
+        car, etag = await self._write(update)
+        return 200, car, {"ETag": etag}
+
+    async def _delete_car(self, model):
+        def delete():
+            if not self.tracker.deleteData(model):
+                raise HttpError(404, f"Car with model '{model}' not found")
+            return self._etag()
+
+        return 204, None, {"ETag": await self._write(delete)}
+
+    @staticmethod
+    async def _fields(request):
+        fields = request.json_body(await request.body.read())
+        unknown = [key for key in fields if key not in PUBLIC_FIELDS]
+        if unknown:
+            raise HttpError(400, f"Unknown field: {unknown[0]}")
+        return fields
+
+    async def _import(self, request):
+        summary = {}
+        problems = []
+        batch, batch_lines = [], []
+        line_number = 0
+
+        async def flush():
+            results = await self._write(self.tracker.applyBatch, batch)
+            # applyBatch returns no results when it could not run the batch at all
+            rejected = {"status": "rejected", "error": "The batch could not be applied"}
+            results = list(results) + [rejected] * (len(batch) - len(results))
+            for line, result in zip(batch_lines, results):
+                summary[result["status"]] = summary.get(result["status"], 0) + 1
+                if result["status"] != "ok" and len(problems) < 100:
+                    problems.append(dict(result, line=line))
+            batch.clear()
+            batch_lines.clear()
+
+        async for line in request.body.lines():
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                operation = json.loads(line)
+            except ValueError:
+                operation = None
+            if not isinstance(operation, dict):
+                summary["invalid"] = summary.get("invalid", 0) + 1
+                if len(problems) < 100:
+                    problems.append({"line": line_number, "status": "invalid", "error": "Not a JSON object"})
+                continue
+            batch.append(operation)
+            batch_lines.append(line_number)
+            if len(batch) >= IMPORT_BATCH:
+                await flush()
+        if batch:
+            await flush()
+        return 200, {"summary": summary, "problems": problems}, {"ETag": await self._run(self._etag)}
+
+    async def _export(self, request, writer):
+        fmt = request.param("format", "jsonl")
+        if fmt not in ("jsonl", "csv"):
+            raise HttpError(400, "format must be jsonl or csv")
+        query = request.query()
+
+        def encode(cars):
+            if fmt == "jsonl":
+                return "".join(json.dumps({key: getattr(car, key) for key in PUBLIC_FIELDS}, ensure_ascii=False) + "\n"
+                               for car in cars)
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([getattr(car, key) for key in PUBLIC_FIELDS] for car in cars)
+            return buffer.getvalue()
+
+        content_type = "application/x-ndjson" if fmt == "jsonl" else "text/csv"
+
+        def first_chunk():
+            # Reading the first cars opens the store, so later chunks don't need the lock
+            cars = self.tracker.iterCars(query)
+            return self._etag(), cars, encode(list(islice(cars, EXPORT_CHUNK)))
+
+        async with AsyncExitStack() as locked:
+            await locked.enter_async_context(self._lock.read())
+            etag, cars, text = await self._run(first_chunk)
+            if REPLACES_OPEN_FILES:
+                # The export has its own handle on the store, so saves can go ahead
+                # while a slow client reads it; on Windows they wait for the export
+                await locked.aclose()
+            head = (self._status_line(200) + f"Content-Type: {content_type}; charset=utf-8\r\n"
+                    "Transfer-Encoding: chunked\r\n"
+                    f"Connection: {'keep-alive' if request.keep_alive else 'close'}\r\n"
+                    f"ETag: {etag}\r\n\r\n")
+            writer.write(head.encode("latin-1"))
+            try:
+                if fmt == "csv":
+                    self._write_chunk(writer, ",".join(PUBLIC_FIELDS) + "\r\n")
+                while text:
+                    self._write_chunk(writer, text)
+                    await asyncio.wait_for(writer.drain(), EXPORT_DRAIN_TIMEOUT)
+                    text = await self._run(lambda: encode(list(islice(cars, EXPORT_CHUNK))))
+                writer.write(b"0\r\n\r\n")
+                await asyncio.wait_for(writer.drain(), EXPORT_DRAIN_TIMEOUT)
+            except Exception as e:
+                # The 200 is already sent: drop the connection without the final
+                # chunk so the client sees a truncated body, not an error inside it
+                if not isinstance(e, (ConnectionError, asyncio.TimeoutError)):
+                    print(f"Error exporting cars: {e}")
+                writer.transport.abort()
+                request.keep_alive = False
+            finally:
+                cars.close()
+        return None
+
+    @staticmethod
+    def _write_chunk(writer, text):
+        data = text.encode("utf-8")
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+
+def run_server(argv=()):
+    """Run the API server until interrupted: main.py --serve [--host H] [--port P] [--store PATH]"""
+    parser = argparse.ArgumentParser(prog="main.py --serve", description="CarDb local HTTP/JSON API")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"interface to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=8, help="threads running tracker calls (default: 8)")
+    parser.add_argument("--store", help="car store to serve (default: the app's car.json)")
+    args = parser.parse_args(argv)
+    try:
+        server = ApiServer(CarTracker(args.store), host=args.host, port=args.port, workers=args.workers)
+        asyncio.run(server.serve_forever())
+    except OSError as e:
+        print(f"Could not start the server: {e}")
+        return 1
+    return 0
@@ -4,7 +4,14 @@ import os
 # Add the data directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
-from interfaces import Cli, run_flet_app
+from app.profiling import profile_from_argv, trace_memory
+
+# --profile[=cprofile|sample] [--profile-out PATH] can be combined with any interface
+sys.argv[1:] = profile_from_argv(sys.argv[1:])
+
+from interfaces import Cli, run_flet_app, run_server  # noqa: E402
+
+trace_memory()
 
 if __name__ == "__main__":
     try:
@@ -12,14 +19,20 @@ if __name__ == "__main__":
 
         if len(sys.argv) > 1:
             arg = sys.argv[1]
-            if arg in ['--flet', '--cli']:
+            if arg in ['--flet', '--cli', '--serve']:
                 interface = arg[2:]
             else:
                 print(f"Unknown argument: {arg}")
-                print("Usage: python main.py [--flet|--cli]")
+                print("Usage: python main.py [--flet|--cli [command [options]]|--serve [--host H] [--port P]] "
+                      "[--profile[=cprofile|sample]] [--profile-out PATH]")
                 sys.exit(1)
 
-        if interface == 'cli':
+        if interface == 'serve':
+            sys.exit(run_server(sys.argv[2:]))
+        elif interface == 'cli' and len(sys.argv) > 2:
+            # One-shot command, e.g. main.py --cli search Mustang --format json
+            sys.exit(Cli().run_command(sys.argv[2:]))
+        elif interface == 'cli':
             print("Starting CarDb in CLI mode")
             print("Please enter the commands as per the instructions")
             print("Type '--help' to see the available commands")
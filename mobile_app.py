@@ -10,7 +10,19 @@ import os
 # Add the app directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
-from interfaces import run_flet_app
+from app.profiling import profile_from_argv, trace_memory
+
+# --profile[=cprofile|sample] [--profile-out PATH] writes a profile report on exit
+sys.argv[1:] = profile_from_argv(sys.argv[1:])
+
+# Phones have little RAM: decode cars on demand and keep at most this many
+# MiB of them in memory (see app.records), unless configured otherwise
+MOBILE_MEMORY_BUDGET_MIB = 8
+os.environ.setdefault("CARDB_MEMORY_BUDGET", str(MOBILE_MEMORY_BUDGET_MIB))
+
+from interfaces import run_flet_app  # noqa: E402
+
+trace_memory()
 
 # This is the entry point for the Flet mobile app
 if __name__ == "__main__":
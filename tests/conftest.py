@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import CarTracker  # noqa: E402
+
+
+def car(car_id, model, **fields):
+    record = {"id": car_id, "model": model, "manufacturer": "", "year": "", "country_of_origin": "",
+              "category": "", "replica_model": "", "info": ""}
+    record.update(fields)
+    return record
+
+
+CARS = [
+    car("a", "Alpha", manufacturer="Ferrari", year="1960", country_of_origin="Italy", category="Racing"),
+    car("b", "Beta", manufacturer="Lotus", year="1965", country_of_origin="UK", category="Racing"),
+    car("c", "Gamma", manufacturer="Ferrari", year="1970", country_of_origin="Italy", category="Racing"),
+    car("d", "Delta", manufacturer="Ford", year="1964", country_of_origin="USA", category="Muscle"),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Path of a store holding CARS"""
+    path = tmp_path / "car.json"
+    path.write_text(json.dumps(CARS, indent=4))
+    return str(path)
+
+
+@pytest.fixture
+def tracker(store):
+    tracker = CarTracker(store)
+    yield tracker
+    tracker.close()
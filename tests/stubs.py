@@ -0,0 +1,96 @@
+"""Stubs for the tests and benchmarks: HTTP hosts for the link checker and a Flet page.
+
+Each stub host (a port on 127.0.0.1) answers /ok/N with 200, /gone/N with
+404, /nohead/N with 405 to HEAD and 200 to GET, /moved/N with a redirect to
+/ok/N, /loop/N with a redirect to itself and /flaky/N with 503, after a
+delay. It counts requests per method and the most it had open at once.
+"""
+import asyncio
+import threading
+from collections import Counter
+
+
+class StubHost:
+    def __init__(self, delay):
+        self.delay = delay
+        self.open = 0
+        self.peak = 0
+        self.requests = Counter()
+        self.paths = []
+
+    async def handle(self, reader, writer):
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        try:
+            method, path, _ = (await reader.readline()).decode().split(" ", 2)
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            self.requests[method] += 1
+            self.paths.append((method, path))
+            await asyncio.sleep(self.delay)
+            kind = path.split("/")[1]
+            status, extra = 200, ""
+            if kind == "gone":
+                status = 404
+            elif kind == "nohead" and method == "HEAD":
+                status = 405
+            elif kind == "moved":
+                status, extra = 301, "Location: " + path.replace("/moved/", "/ok/") + "\r\n"
+            elif kind == "loop":
+                status, extra = 302, f"Location: {path}\r\n"
+            elif kind == "flaky":
+                status = 503
+            writer.write(f"HTTP/1.1 {status} Stub\r\n{extra}Content-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+        finally:
+            self.open -= 1
+            writer.close()
+
+
+def serve_stubs(hosts, delay):
+    """Start stub hosts on a loop in a daemon thread (the tracker runs its own with asyncio.run).
+
+    Returns ([(StubHost, port)], stop) where stop() shuts the loop down.
+    """
+    started = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        stubs = []
+        for _ in range(hosts):
+            stub = StubHost(delay)
+            server = loop.run_until_complete(asyncio.start_server(stub.handle, "127.0.0.1", 0))
+            stubs.append((stub, server.sockets[0].getsockname()[1]))
+        state.update(stubs=stubs, loop=loop)
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    loop = state["loop"]
+    return state["stubs"], lambda: loop.call_soon_threadsafe(loop.stop)
+
+
+class StubPage:
+    """Just enough of ft.Page for FletApp to build and swap views"""
+
+    def __init__(self):
+        self.route = "/"
+        self.views = []
+        self.overlay = []
+        self.appbar = self.navigation_bar = self.snack_bar = None
+        self.on_route_change = self.on_view_pop = None
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+    def go(self, route):
+        self.route = route
+        if self.on_route_change is not None:
+            self.on_route_change(route)
+
+    def launch_url(self, url):
+        pass
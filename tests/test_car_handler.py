@@ -0,0 +1,70 @@
+import csv
+import sys
+
+from app.car_handler import _WHITESPACE
+
+
+def test_whitespace_matches_str_isspace():
+    assert _WHITESPACE == "".join(c for c in map(chr, range(sys.maxunicode + 1)) if c.isspace())
+
+
+def write_csv(path, rows):
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def models(tracker):
+    return [car["model"] for car in tracker.displayData()]
+
+
+def summary(result):
+    return {key: result[key] for key in ("inserted", "updated", "removed", "unchanged", "duplicates")}
+
+
+def test_incremental_import_reports_updates_of_existing_cars(tracker, tmp_path):
+    source = write_csv(tmp_path / "dealer.csv", [
+        {"model": "Alpha", "manufacturer": "Ferrari", "year": "1960", "country_of_origin": "Italy",
+         "category": "Racing"},
+        {"model": "Beta", "manufacturer": "Lotus", "year": "1966", "country_of_origin": "UK", "category": "Racing"},
+        {"model": "Zeta", "manufacturer": "Ford", "year": "1999", "country_of_origin": "USA", "category": ""},
+    ])
+    result = tracker.importData(source, incremental=True)
+    assert summary(result) == {"inserted": 1, "updated": 1, "removed": 0, "unchanged": 1, "duplicates": 0}
+    assert tracker.getCar("Beta")["year"] == "1966"
+
+    again = tracker.importData(source, incremental=True)
+    assert summary(again) == {"inserted": 0, "updated": 0, "removed": 0, "unchanged": 3, "duplicates": 0}
+
+
+def test_incremental_import_only_deletes_cars_it_created(tracker, tmp_path):
+    path = tmp_path / "dealer.csv"
+    write_csv(path, [{"model": "Alpha", "manufacturer": "Ferrari", "year": "1961"},
+                     {"model": "Zeta", "manufacturer": "Ford", "year": "1999"}])
+    tracker.importData(str(path), incremental=True)
+    assert tracker.addData("Zeta Spider", "Ford", "2001", "USA", "Racing", "", "")
+
+    write_csv(path, [{"model": "Beta", "manufacturer": "Lotus", "year": "1965"}])
+    result = tracker.importData(str(path), incremental=True)
+    assert summary(result) == {"inserted": 0, "updated": 1, "removed": 1, "unchanged": 0, "duplicates": 0}
+    assert models(tracker) == ["Alpha", "Beta", "Gamma", "Delta", "Zeta Spider"]
+
+
+def test_incremental_import_keys_rows_by_id_and_warns_on_duplicates(tracker, tmp_path, capsys):
+    path = tmp_path / "dealer.csv"
+    write_csv(path, [{"id": "z1", "model": "Zeta", "manufacturer": "Ford", "year": "1999"},
+                     {"id": "z2", "model": "zeta", "manufacturer": "Ford", "year": "2000"},
+                     {"id": "z1", "model": "Eta", "manufacturer": "Ford", "year": "2001"}])
+    result = tracker.importData(str(path), incremental=True)
+    assert summary(result) == {"inserted": 1, "updated": 0, "removed": 0, "unchanged": 0, "duplicates": 2}
+    assert "2 rows skipped" in capsys.readouterr().out
+
+    # Renaming the model of an id-keyed row updates the same car
+    write_csv(path, [{"id": "z1", "model": "Zeta II", "manufacturer": "Ford", "year": "1999"}])
+    result = tracker.importData(str(path), incremental=True)
+    assert summary(result) == {"inserted": 0, "updated": 1, "removed": 0, "unchanged": 0, "duplicates": 0}
+    assert tracker.getCarById("z1")["model"] == "Zeta II"
+    assert models(tracker) == ["Alpha", "Beta", "Gamma", "Delta", "Zeta II"]
@@ -0,0 +1,109 @@
+import gc
+import time
+import weakref
+
+import pytest
+
+from app import CarTracker
+from app.indexes import SecondaryIndexes
+
+
+def load_secondary_index(tracker):
+    tracker._rebuild_index("secondary", tracker._current_cars(), tracker._sidecar_store().stamp(), tracker.version)
+
+
+def without_secondary_index(tracker, monkeypatch):
+    persisted_index = tracker._persisted_index
+    monkeypatch.setattr(tracker, "_persisted_index",
+                        lambda name: None if name == "secondary" else persisted_index(name))
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+@pytest.mark.parametrize("memory_budget", [None, 1])
+def test_query_keeps_store_order_after_update(store, monkeypatch, indexed, memory_budget):
+    tracker = CarTracker(store, memory_budget=memory_budget)
+    if indexed:
+        load_secondary_index(tracker)
+    else:
+        without_secondary_index(tracker, monkeypatch)
+    query = {"category": "racing"}
+    before = [car["model"] for car in tracker.query(query)]
+    assert before == ["Alpha", "Beta", "Gamma"]
+
+    assert tracker.updateData("Alpha", "Ferrari", "1961", "Italy", "Racing", "", "")
+    assert [car["model"] for car in tracker.query(query)] == before
+    assert [car["model"] for car in tracker.query(query, limit=2)] == ["Alpha", "Beta"]
+    assert [car["model"] for car in tracker.query({"year": "1955-1975", "manufacturer": "ferrari"})] == \
+        ["Alpha", "Gamma"]
+    assert (tracker._persisted_index("secondary") is not None) == indexed
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_facet_filter_keeps_store_order_after_update(store, monkeypatch, indexed):
+    tracker = CarTracker(store)
+    if indexed:
+        load_secondary_index(tracker)
+    else:
+        without_secondary_index(tracker, monkeypatch)
+    filters = {"manufacturer": ["Ferrari", "Lotus"]}
+    assert [car["model"] for car in tracker.facetFilter(filters)] == ["Alpha", "Beta", "Gamma"]
+
+    assert tracker.updateData("Alpha", "Ferrari", "1961", "Italy", "Racing", "", "")
+    assert [car["model"] for car in tracker.facetFilter(filters)] == ["Alpha", "Beta", "Gamma"]
+    assert [car["model"] for car in tracker.facetFilter(filters, limit=1)] == ["Alpha"]
+    assert tracker.facetCounts(filters)["total"] == 3
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def wait_for_index(tracker):
+    wait_for(lambda: tracker._persisted_index("secondary") is not None)
+
+
+def test_failed_background_rebuild_is_retried(tracker, monkeypatch, capsys):
+    build = SecondaryIndexes.build
+
+    def failing_build(cars):
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(SecondaryIndexes, "build", failing_build)
+    assert tracker._persisted_index("secondary") is None
+    wait_for(lambda: "secondary" not in tracker._indexes)
+    assert "disk on fire" in capsys.readouterr().out
+
+    monkeypatch.setattr(SecondaryIndexes, "build", build)
+    wait_for_index(tracker)
+
+
+def test_tracker_can_be_garbage_collected(store):
+    tracker = CarTracker(store)
+    wait_for_index(tracker)
+    ref = weakref.ref(tracker)
+    del tracker
+    gc.collect()
+    assert ref() is None
+
+
+def test_close_keeps_indexes_of_a_store_changed_elsewhere(store):
+    first = CarTracker(store)
+    load_secondary_index(first)
+    assert first.updateData("Alpha", "Ferrari", "1961", "Italy", "Racing", "", "")
+    assert first._persisted_index("secondary").dirty
+
+    # Another process adds a car after this tracker's last save
+    other = CarTracker(store)
+    assert other.addData("Epsilon", "Fiat", "1972", "Italy", "Racing", "", "")
+    other.close()
+    first.close()
+
+    reopened = CarTracker(store)
+    wait_for_index(reopened)
+    assert reopened.getCar("Epsilon") is not None
+    assert [car["model"] for car in reopened.query({"manufacturer": "fiat"})] == ["Epsilon"]
+    assert not reopened.addData("Epsilon", "Fiat", "1972", "Italy", "Racing", "", "")
+    reopened.close()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from interfaces import cli
+
+
+@pytest.fixture
+def run(tracker, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "CarTracker", lambda: tracker)
+    command_line = cli.Cli()
+
+    def run(*argv):
+        code = command_line.run_command(list(argv))
+        return code, capsys.readouterr().out
+
+    return run
+
+
+def test_add_search_and_delete(run):
+    code, out = run("add", "--model", "Mustang GT", "--manufacturer", "Ford", "--year", "1967")
+    assert code == 0 and json.loads(out)["status"] == "ok"
+    code, out = run("search", "--where", "manufacturer=ford", "--format", "jsonl")
+    assert [json.loads(line)["model"] for line in out.splitlines()] == ["Delta", "Mustang GT"]
+    code, out = run("search", "mustnag", "--fuzzy", "--format", "json")
+    assert json.loads(out)[0]["model"] == "Mustang GT"
+    assert run("delete", "Mustang GT")[0] == 0
+    assert run("delete", "Mustang GT")[0] == 1
+
+
+def test_display_pages_and_formats(run):
+    code, out = run("display", "--page-size", "2", "--offset", "1", "--sort", "year", "--format", "csv")
+    assert code == 0
+    assert [line.split(",")[0] for line in out.splitlines()] == ["model", "Delta", "Beta"]
+    code, out = run("display", "--format", "table")
+    assert "Alpha" in out and "Gamma" in out
+
+
+def test_stats_command(run):
+    code, out = run("stats", "--format", "json")
+    assert code == 0 and json.loads(out)
+
+
+def test_report_command(run):
+    code, out = run("report", "country_category", "--format", "json")
+    assert code == 0 and json.loads(out)[-1]["total"] == 4
+
+
+def test_facets_command(run):
+    code, out = run("facets", "--facet", "category=Racing", "--cars", "--format", "jsonl")
+    assert [json.loads(line)["model"] for line in out.splitlines()] == ["Alpha", "Beta", "Gamma"]
+
+
+def test_interactive_display_pages_from_memory(tracker, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "CarTracker", lambda: tracker)
+    monkeypatch.setattr(cli, "DISPLAY_PAGE_SIZE", 3)
+    command_line = cli.Cli()
+    tracker.search("")  # loads the collection, as the menu's other commands do
+
+    def no_rescan(query=None):
+        raise AssertionError("paging re-read the store")
+
+    monkeypatch.setattr(tracker, "iterCars", no_rescan)
+    prompts = []
+    monkeypatch.setattr("builtins.input", lambda prompt: prompts.append(prompt) or "")
+    command_line.display_all_cars()
+    out = capsys.readouterr().out
+    assert all(model in out for model in ("Alpha", "Beta", "Gamma", "Delta"))
+    assert prompts == ["Showing 3 of 4 cars. Press Enter for more, 'q' to stop: "]
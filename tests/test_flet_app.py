@@ -0,0 +1,81 @@
+import flet as ft
+import pytest
+
+from interfaces.flet_app import FletApp
+from stubs import StubPage
+
+
+def controls(control):
+    yield control
+    for child in control._get_children():
+        yield from controls(child)
+
+
+def text_field(page, label):
+    return next(c for c in controls(page.views[-1]) if isinstance(c, ft.TextField) and c.label == label)
+
+
+@pytest.fixture
+def app(tracker):
+    app = FletApp(tracker)
+    app.main(StubPage())
+    return app
+
+
+def test_add_form_starts_empty_after_cancel(app):
+    page = app.page
+    page.go("/add_car")
+    text_field(page, "Model Name *").value = "Half-typed"
+    page.go("/")
+    page.go("/add_car")
+    assert not text_field(page, "Model Name *").value
+
+
+def test_search_and_stats_views_are_reused_until_a_change(app, tracker):
+    page = app.page
+    page.go("/search")
+    search = page.views[-1]
+    page.go("/")
+    page.go("/search")
+    assert page.views[-1] is search
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    page.go("/search")
+    assert page.views[-1] is not search
+
+
+def test_main_view_follows_changes(app, tracker):
+    assert [car["model"] for car in app._live_current_cars()] == ["Alpha", "Beta", "Gamma", "Delta"]
+    assert tracker.updateData("Beta", "Lotus", "1966", "UK", "Racing", "", "")
+    assert tracker.deleteData("Gamma")
+    live = app._live_current_cars()
+    assert [car["model"] for car in live] == ["Alpha", "Beta", "Delta"]
+    assert live[1]["year"] == "1966"
+
+
+def test_home_view_survives_a_search(app, tracker):
+    page = app.page
+    page.go("/")
+    home = page.views[-1]
+    page.go("/search/gamma")
+    assert [car["model"] for car in app._live_current_cars()] == ["Gamma"]
+    page.go("/")
+    assert page.views[-1] is home
+    assert [car["model"] for car in app._live_current_cars()] == ["Alpha", "Beta", "Gamma", "Delta"]
+
+    # A change made while the results are shown rebuilds the home list on return
+    page.go("/search/gamma")
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    page.go("/")
+    assert page.views[-1] is not home
+    assert "Epsilon" in [car["model"] for car in app._live_current_cars()]
+
+
+def test_search_field_starts_empty_on_return(app):
+    page = app.page
+    page.go("/search")
+    search = page.views[-1]
+    text_field(page, "Search Cars").value = "abandoned"
+    page.go("/")
+    page.go("/search")
+    assert page.views[-1] is search
+    assert not text_field(page, "Search Cars").value
@@ -0,0 +1,29 @@
+from app.fuzzy import FuzzyIndex
+from app.models import Car
+
+from conftest import CARS, car
+
+
+def ranked(index, query):
+    return [(score, found.id) for score, found in index.search(query, 10)]
+
+
+def test_patched_index_matches_a_fresh_build():
+    cars = [Car.from_dict(record) for record in CARS]
+    index = FuzzyIndex(cars)
+    added = Car.from_dict(car("e", "Alphetta", manufacturer="Alfa Romeo", replica_model="Ferrari"))
+    updated = Car.from_dict(car("b", "Betta", manufacturer="Lotus Ferrari"))
+    index.add(added)
+    index.remove(cars[1])
+    index.add(updated)
+    index.remove(cars[3])
+    live = [cars[0], cars[2], added, updated]
+
+    fresh = FuzzyIndex(live)
+    assert index.count == fresh.count == 4
+    for query in ("alpha", "ferari", "beta", "delta", "ford", "lotus alfa", "gamma"):
+        assert sorted(ranked(index, query)) == sorted(ranked(fresh, query))
+    # Tokens only the removed cars had are gone, deletion variants included
+    assert index.doc_counts == fresh.doc_counts
+    assert index.deletes == fresh.deletes
+    assert all(found is not None for _, found in index.search("ferrari", 10))
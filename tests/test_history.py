@@ -0,0 +1,50 @@
+def models(tracker):
+    return [car["model"] for car in tracker.displayData()]
+
+
+def test_undo_and_redo(tracker):
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    assert tracker.updateData("Beta", "Lotus", "1966", "UK", "Racing", "", "")
+    assert tracker.deleteData("Gamma")
+    assert len(tracker.history()) == 3
+
+    assert tracker.undo() is not None
+    assert sorted(models(tracker)) == ["Alpha", "Beta", "Delta", "Epsilon", "Gamma"]
+    assert tracker.undo() is not None
+    assert tracker.getCar("Beta")["year"] == "1965"
+    assert tracker.redo() is not None
+    assert tracker.getCar("Beta")["year"] == "1966"
+    assert tracker.undo() is not None
+    assert tracker.undo() is not None
+    assert tracker.undo() is None
+    assert sorted(models(tracker)) == ["Alpha", "Beta", "Delta", "Gamma"]
+
+
+def test_snapshots(tracker):
+    first = tracker.snapshot("before")
+    assert tracker.deleteData("Alpha")
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    tracker.snapshot("after")
+    assert [snapshot["name"] for snapshot in tracker.snapshots()] == ["before", "after"]
+
+    assert tracker.restoreSnapshot(first["id"])
+    assert sorted(models(tracker)) == ["Alpha", "Beta", "Delta", "Gamma"]
+    assert tracker.undo() is not None
+    assert sorted(models(tracker)) == ["Beta", "Delta", "Epsilon", "Gamma"]
+    assert not tracker.restoreSnapshot("no-such-snapshot")
+
+
+def test_change_events(tracker):
+    events = []
+    unsubscribe = tracker.subscribe(events.append)
+    tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    tracker.updateData("Epsilon", "Ford", "2000", "USA", "Muscle", "", "")
+    tracker.deleteData("Epsilon")
+    assert [(event.kind, event.car.year) for event in events] == [("added", "1999"), ("updated", "2000"),
+                                                                  ("deleted", "2000")]
+    assert events[1].previous.year == "1999"
+    assert events[0].version < events[1].version < events[2].version
+
+    unsubscribe()
+    tracker.addData("Zeta", "Ford", "1999", "USA", "Muscle", "", "")
+    assert len(events) == 3
@@ -0,0 +1,91 @@
+import csv
+
+import pandas as pd
+import pytest
+
+from app import CarTracker
+from app import car_handler, car_tracker
+from app.car_tracker import BrokenProcessPool
+
+
+def write_csv(path, models, manufacturer="Ford"):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["model", "manufacturer", "year"])
+        writer.writeheader()
+        for model in models:
+            writer.writerow({"model": model, "manufacturer": manufacturer, "year": "1970"})
+    return str(path)
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """Two CSV files of 25 rows each, parsed in batches of 10"""
+    monkeypatch.setattr(car_handler, "IMPORT_BATCH", 10)
+    first = write_csv(tmp_path / "a.csv", [f"Model {n}" for n in range(25)])
+    # Overlaps the first file by five models and the store by one
+    second = write_csv(tmp_path / "b.csv", [f"Model {n}" for n in range(20, 44)] + ["Alpha"])
+    return [first, second]
+
+
+def models(tracker):
+    return [car["model"] for car in tracker.displayData()]
+
+
+def check_import(tracker, results, sources):
+    assert [(r["file"], r["imported"], r["duplicates"], r["error"]) for r in results] == [
+        (sources[0], 25, 0, None),
+        (sources[1], 19, 6, None),
+    ]
+    assert models(tracker)[4:] == [f"Model {n}" for n in range(44)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_import_many_streams_batches(tracker, sources, workers):
+    check_import(tracker, tracker.importMany(sources, workers=workers), sources)
+
+
+def test_import_many_without_a_process_pool(tracker, sources, monkeypatch, capsys):
+    def unavailable(*args, **kwargs):
+        raise OSError("no processes here")
+
+    monkeypatch.setattr(car_tracker, "ProcessPoolExecutor", unavailable)
+    check_import(tracker, tracker.importMany(sources, workers=2), sources)
+    assert "no processes here" in capsys.readouterr().out
+
+
+def test_broken_pool_resumes_where_it_stopped(tracker, sources, monkeypatch):
+    def breaking(files, workers):
+        batches = car_handler.parse_import_batches(files[0])
+        yield 0, next(batches)
+        yield 0, next(batches)
+        raise BrokenProcessPool("worker killed")
+
+    monkeypatch.setattr(CarTracker, "_pooled_batches", staticmethod(breaking))
+    check_import(tracker, tracker.importMany(sources, workers=2), sources)
+
+
+def test_file_failing_partway_imports_nothing(tracker, sources, monkeypatch):
+    parse = car_handler.parse_import_batches
+
+    def failing(filename, batch_size=None):
+        batches = parse(filename, batch_size)
+        if filename == sources[1]:
+            yield next(batches)
+            yield {"file": filename, "records": [], "invalid": 0, "error": "truncated"}
+            return
+        yield from batches
+
+    monkeypatch.setattr(car_tracker, "parse_import_batches", failing)
+    results = tracker.importMany(sources, workers=1)
+    assert [(r["imported"], r["duplicates"], r["error"]) for r in results] == [(25, 0, None), (0, 0, "truncated")]
+    assert models(tracker)[4:] == [f"Model {n}" for n in range(25)]
+
+
+def test_excel_gaps_import_as_empty_fields(tracker, tmp_path):
+    path = str(tmp_path / "dealer.xlsx")
+    pd.DataFrame({"Model": ["Epsilon", "Zeta"], "Year": [1999, None], "Info": [None, "https://x.test"]}).to_excel(
+        path, index=False)
+    [result] = tracker.importMany([path], workers=1)
+    assert (result["imported"], result["error"]) == (2, None)
+    assert tracker.getCar("Epsilon")["year"] == "1999" and tracker.getCar("Epsilon")["info"] == ""
+    assert tracker.getCar("Zeta")["year"] == ""
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app import CarTracker
+from app.links import FAILED_TTL, OK_TTL, LinkChecker, is_fresh
+from stubs import serve_stubs
+
+
+@pytest.fixture
+def stubs():
+    stubs, stop = serve_stubs(hosts=2, delay=0.02)
+    yield stubs
+    stop()
+
+
+def check_all(urls, **limits):
+    checker = LinkChecker(**dict({"rate": 0, "timeout": 5}, **limits))
+    return checker, asyncio.run(checker.check_all(urls))
+
+
+def test_states_redirects_and_get_fallback(stubs):
+    stub, port = stubs[0]
+    base = f"http://127.0.0.1:{port}"
+    urls = [f"{base}/ok/1", f"{base}/gone/2", f"{base}/nohead/3", f"{base}/moved/4", f"{base}/loop/5",
+            f"{base}/flaky/6", "ftp://example.com/file"]
+    _, results = check_all(urls)
+
+    assert {url: results[url]["state"] for url in urls} == dict(zip(urls, [
+        "ok", "broken", "ok", "ok", "error", "error", "invalid"]))
+    assert results[f"{base}/moved/4"]["final_url"] == f"{base}/ok/4"
+    assert results[f"{base}/moved/4"]["status"] == 200
+    assert results[f"{base}/loop/5"]["error"] == "Too many redirects"
+    # HEAD rejected with 405, then answered by GET
+    assert [method for method, path in stub.paths if path == "/nohead/3"] == ["HEAD", "GET"]
+    assert [method for method, path in stub.paths if path == "/ok/1"] == ["HEAD"]
+
+
+def test_per_host_and_connection_limits(stubs):
+    urls = [f"http://127.0.0.1:{port}/ok/{n}" for n in range(12) for _, port in stubs]
+    checker, results = check_all(urls, connections=5, per_host=3)
+    assert all(result["state"] == "ok" for result in results.values())
+    assert checker.requests == len(urls)
+    assert [stub.peak for stub, _ in stubs] == [3, 3]
+
+    # The connection limit applies below the per-host one too
+    stub, port = stubs[0]
+    stub.peak = 0
+    check_all([f"http://127.0.0.1:{port}/ok/{n}" for n in range(100, 110)], connections=2, per_host=3)
+    assert stub.peak == 2
+
+
+def test_rate_limit_spaces_out_requests(stubs):
+    _, port = stubs[0]
+    started = time.monotonic()
+    check_all([f"http://127.0.0.1:{port}/ok/{n}" for n in range(5)], per_host=5, rate=50)
+    # Five starts at 50 per second take at least four intervals
+    assert time.monotonic() - started >= 0.08
+
+
+def test_results_are_cached_per_car(tmp_path, stubs):
+    stub, port = stubs[0]
+    cars = [{"id": f"car-{n}", "model": f"Model {n}", "info": f"http://127.0.0.1:{port}/{kind}/{n}"}
+            for n, kind in enumerate(["ok", "gone", "moved"])]
+    store = tmp_path / "car.json"
+    store.write_text(json.dumps(cars))
+    tracker = CarTracker(str(store))
+
+    first = tracker.checkLinks(rate=0)
+    assert [(row["state"], row["cached"]) for row in first] == [("ok", False), ("broken", False), ("ok", False)]
+    requests = sum(stub.requests.values())
+
+    second = tracker.checkLinks(rate=0)
+    assert [row["cached"] for row in second] == [True, True, True]
+    assert sum(stub.requests.values()) == requests
+
+    # A changed URL is checked again; the others still come from the cache
+    assert tracker.updateData("Model 1", "", "", "", "", "", f"http://127.0.0.1:{port}/ok/1")
+    third = tracker.checkLinks(rate=0)
+    assert [(row["state"], row["cached"]) for row in third] == [("ok", True), ("ok", False), ("ok", True)]
+
+    assert not any(row["cached"] for row in tracker.checkLinks(refresh=True, rate=0))
+
+
+def test_is_fresh():
+    now = time.time()
+    ok = {"url": "http://a", "state": "ok", "checked": now - FAILED_TTL * 2}
+    assert is_fresh(ok, "http://a", now)
+    assert not is_fresh(ok, "http://b", now)
+    assert not is_fresh(dict(ok, checked=now - OK_TTL - 1), "http://a", now)
+    assert not is_fresh(dict(ok, state="error"), "http://a", now)
+    assert not is_fresh(None, "http://a", now)
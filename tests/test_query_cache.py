@@ -0,0 +1,54 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from app.query_cache import FrozenRow, QueryCache
+
+
+def test_hits_share_read_only_rows(tracker):
+    first = tracker.search("a")
+    second = tracker.search("a")
+    assert second == first and second is not first
+    assert all(a is b for a, b in zip(first, second))
+    assert tracker.queryCacheStats()["hits"] == 1
+
+    with pytest.raises(TypeError):
+        second[0]["model"] = "Changed"
+    with pytest.raises(TypeError):
+        second[0].pop("model")
+    second.append({"model": "Only in this list"})
+    assert len(tracker.search("a")) == len(first)
+
+
+def test_rows_behave_like_dicts():
+    row = FrozenRow(model="Alpha", year="1960")
+    assert json.loads(json.dumps([row])) == [{"model": "Alpha", "year": "1960"}]
+    assert pickle.loads(pickle.dumps(row)) == row
+    assert copy.deepcopy(row) == row and isinstance(copy.copy(row), FrozenRow)
+    changed = row.copy()
+    changed["year"] = "1961"
+    assert row["year"] == "1960" and type(changed) is dict
+
+
+def test_changes_invalidate(tracker):
+    assert [car["model"] for car in tracker.query({"category": "muscle"})] == ["Delta"]
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    assert [car["model"] for car in tracker.query({"category": "muscle"})] == ["Delta", "Epsilon"]
+    assert tracker.queryCacheStats()["hits"] == 0
+
+
+def test_bounds():
+    cache = QueryCache(max_entries=2)
+    for key in "abc":
+        cache.put(1, key, [{"model": key}])
+    assert cache.get(1, "a") is None and cache.get(1, "c") == [{"model": "c"}]
+    assert cache.stats()["evictions"] == 1
+
+    small = QueryCache(max_bytes=1000)
+    small.put(1, "big", [{"model": "x" * 2000}])
+    assert small.get(1, "big") is None
+    # Entries of older versions are dropped when a newer one is seen
+    cache.put(2, "d", [])
+    assert cache.get(1, "c") is None and cache.stats()["entries"] == 1
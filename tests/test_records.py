@@ -0,0 +1,34 @@
+from app import CarTracker
+from app import records
+from app.records import CarRecords, budget_bytes
+
+
+def test_budget_bytes(monkeypatch):
+    monkeypatch.delenv(records.MEMORY_BUDGET_ENV, raising=False)
+    assert budget_bytes() is None
+    assert budget_bytes(8) == 8 * 2**20
+    assert budget_bytes("0") is None
+    assert budget_bytes("lots") is None
+    monkeypatch.setenv(records.MEMORY_BUDGET_ENV, "0.5")
+    assert budget_bytes() == 2**19
+
+
+def test_budget_is_ignored_where_open_files_cant_be_replaced(store, monkeypatch):
+    monkeypatch.setattr(records, "REPLACES_OPEN_FILES", False)
+    tracker = CarTracker(store, memory_budget=8)
+    assert tracker.memory_budget_bytes is None
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    assert isinstance(tracker._current_cars(), list)
+
+
+def test_budgeted_tracker_reads_and_saves_on_demand(store):
+    tracker = CarTracker(store, memory_budget=1)
+    assert isinstance(tracker._current_cars(), CarRecords)
+    assert tracker.getCar("beta")["manufacturer"] == "Lotus"
+    assert tracker.updateData("Beta", "Lotus", "1966", "UK", "Racing", "", "")
+    assert tracker.deleteData("Gamma")
+    assert isinstance(tracker._current_cars(), CarRecords)
+
+    reopened = CarTracker(store)
+    assert [car["model"] for car in reopened.displayData()] == ["Alpha", "Beta", "Delta"]
+    assert reopened.getCar("Beta")["year"] == "1966"
@@ -0,0 +1,55 @@
+def models(rows):
+    return [row["model"] for row in rows]
+
+
+def test_search_and_query(tracker):
+    assert models(tracker.search("ta")) == ["Beta", "Delta"]
+    assert "id" not in tracker.search("ta")[0]
+    assert models(tracker.query({"year": "1960-1965", "country_of_origin": "italy"})) == ["Alpha"]
+    assert models(tracker.query("amm")) == ["Gamma"]
+
+
+def test_fuzzy_search_tolerates_typos(tracker):
+    results = tracker.fuzzySearch("gamam")
+    assert results[0]["model"] == "Gamma"
+    assert 0 < results[0]["score"] <= 1
+
+
+def test_full_text_search_operators(tracker):
+    assert set(models(tracker.fullTextSearch("ferrari"))) == {"Alpha", "Gamma"}
+    assert models(tracker.fullTextSearch("ferrari -gamma")) == ["Alpha"]
+    assert set(models(tracker.fullTextSearch("lotus OR ford"))) == {"Beta", "Delta"}
+    assert tracker.fullTextSearch("porsche") == []
+
+
+def test_fuzzy_index_follows_changes(tracker):
+    tracker.fuzzySearch("alpha")
+    assert tracker.addData("Zeta Spider", "Alfa Romeo", "1971", "Italy", "Roadster", "Hot Wheels", "")
+    assert tracker.deleteData("Alpha")
+    assert models(tracker.fuzzySearch("zeta spyder"))[0] == "Zeta Spider"
+    assert "Alpha" not in models(tracker.fuzzySearch("alpha"))
+
+
+def test_full_text_index_follows_changes(tracker):
+    tracker.fullTextSearch("alpha")
+    assert tracker.addData("Zeta Spider", "Alfa Romeo", "1971", "Italy", "Roadster", "Hot Wheels", "")
+    assert tracker.deleteData("Alpha")
+    assert models(tracker.fullTextSearch("roadster")) == ["Zeta Spider"]
+    assert models(tracker.fullTextSearch("alpha")) == []
+
+
+def test_suggest(tracker):
+    assert tracker.suggest("manufacturer", "f") == [{"value": "Ferrari", "count": 2}, {"value": "Ford", "count": 1}]
+
+
+def test_facet_counts(tracker):
+    counts = tracker.facetCounts({"category": "Racing"})
+    assert counts["total"] == 3
+    assert counts["manufacturer"] == {"Ferrari": 2, "Lotus": 1}
+    assert counts["category"] == {"Racing": 3, "Muscle": 1}
+
+
+def test_reports(tracker):
+    report = tracker.report("manufacturer_decade")
+    assert report[-1]["manufacturer"] == "Total" and report[-1]["total"] == 4
+    assert report[0] == {"manufacturer": "Ferrari", "1960s": 1, "1970s": 1, "total": 2}
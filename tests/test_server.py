@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.models import Car
+from interfaces import server as api
+
+
+async def read_response(reader):
+    received = b""
+    try:
+        while chunk := await asyncio.wait_for(reader.read(1 << 16), 5):
+            received += chunk
+    except ConnectionResetError:
+        pass
+    return received
+
+
+def exchange(tracker, raw):
+    """Start a server on a free port, send raw request bytes and return everything it sends back"""
+    async def run():
+        app = api.ApiServer(tracker, port=0, workers=2)
+        listener = await app.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", app.port)
+        writer.write(raw)
+        await writer.drain()
+        received = await read_response(reader)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return received
+    return asyncio.run(run())
+
+
+def request(method, path, body=b"", **headers):
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+    for name, value in headers.items():
+        head += f"{name.replace('_', '-')}: {value}\r\n"
+    return head.encode() + b"\r\n" + body
+
+
+def status_and_body(response):
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), body
+
+
+def test_add_and_list(tracker):
+    body = json.dumps({"model": "Epsilon", "manufacturer": "Fiat"}).encode()
+    status, _ = status_and_body(exchange(tracker, request("POST", "/cars", body, Content_Length=len(body))))
+    assert status == 201
+    status, body = status_and_body(exchange(tracker, request("GET", "/cars?manufacturer=fiat")))
+    assert status == 200
+    assert [car["model"] for car in json.loads(body)["cars"]] == ["Epsilon"]
+
+
+def test_content_length_with_chunked_is_rejected(tracker):
+    body = b'{"model": "Epsilon"}'
+    raw = request("POST", "/cars", b"%x\r\n%s\r\n0\r\n\r\n" % (len(body), body),
+                  Content_Length=5, Transfer_Encoding="chunked")
+    status, body = status_and_body(exchange(tracker, raw))
+    assert status == 400
+    assert "chunked" in json.loads(body)["error"]
+    assert tracker.getCar("Epsilon") is None
+
+
+def test_import_reports_lines_of_a_failed_batch(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, "applyBatch", lambda operations: [])
+    body = b'{"model": "Epsilon"}\nnot json\n{"model": "Zeta"}\n'
+    status, body = status_and_body(exchange(tracker, request("POST", "/import", body, Content_Length=len(body))))
+    result = json.loads(body)
+    assert status == 200
+    assert result["summary"] == {"invalid": 1, "rejected": 2}
+    assert [problem["line"] for problem in result["problems"] if problem["status"] == "rejected"] == [1, 3]
+
+
+def test_export_failure_truncates_the_stream(tracker, monkeypatch):
+    cars = tracker.iterCars
+
+    def failing(query=None):
+        yield next(cars(query))
+        raise OSError("store went away")
+
+    monkeypatch.setattr(tracker, "iterCars", failing)
+    monkeypatch.setattr(api, "EXPORT_CHUNK", 1)
+    response = exchange(tracker, request("GET", "/export?format=jsonl"))
+    status, body = status_and_body(response)
+    assert status == 200
+    assert b"Alpha" in body
+    # No error document inside the body and no final chunk: the client can tell it was cut short
+    assert b"Internal server error" not in response
+    assert not body.endswith(b"0\r\n\r\n")
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_streams_every_car(tracker, fmt):
+    status, body = status_and_body(exchange(tracker, request("GET", f"/export?format={fmt}")))
+    assert status == 200
+    assert body.endswith(b"0\r\n\r\n")
+    for model in (b"Alpha", b"Beta", b"Gamma", b"Delta"):
+        assert model in body
+
+
+def test_slow_export_does_not_hold_up_writes(tracker, monkeypatch):
+    resume = threading.Event()
+    cars = tracker.iterCars
+
+    def stalled(query=None):
+        iterator = cars(query)
+        yield next(iterator)
+        resume.wait(10)
+        yield from iterator
+
+    monkeypatch.setattr(tracker, "iterCars", stalled)
+    monkeypatch.setattr(api, "EXPORT_CHUNK", 1)
+    body = json.dumps({"model": "Epsilon"}).encode()
+
+    async def run():
+        app = api.ApiServer(tracker, port=0, workers=4)
+        listener = await app.start()
+        exporter = await asyncio.open_connection("127.0.0.1", app.port)
+        exporter[1].write(request("GET", "/export"))
+        # Wait until the export has sent its first car and is stuck on the next one
+        assert b"Alpha" in await asyncio.wait_for(exporter[0].readuntil(b"Alpha"), 5)
+        reader, writer = await asyncio.open_connection("127.0.0.1", app.port)
+        writer.write(request("POST", "/cars", body, Content_Length=len(body)))
+        added = await read_response(reader)
+        resume.set()
+        exported = await read_response(exporter[0])
+        writer.close()
+        exporter[1].close()
+        listener.close()
+        await listener.wait_closed()
+        return added, exported
+
+    added, exported = asyncio.run(run())
+    assert status_and_body(added)[0] == 201
+    assert exported.endswith(b"0\r\n\r\n")
+
+
+def test_export_to_a_client_that_stops_reading_is_dropped(tracker, monkeypatch):
+    filler = "x" * 10_000
+    monkeypatch.setattr(tracker, "iterCars",
+                        lambda query=None: (Car(id=str(n), model=f"Car {n}", info=filler) for n in range(3000)))
+    monkeypatch.setattr(api, "EXPORT_DRAIN_TIMEOUT", 0.2)
+
+    async def run():
+        app = api.ApiServer(tracker, port=0, workers=2)
+        listener = await app.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", app.port)
+        writer.write(request("GET", "/export"))
+        await asyncio.sleep(1)
+        exported = await read_response(reader)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return exported
+
+    exported = asyncio.run(run())
+    assert exported.startswith(b"HTTP/1.1 200")
+    assert len(exported) < 30_000_000 and not exported.endswith(b"0\r\n\r\n")
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from app import CarTracker
+from conftest import CARS
+
+
+def models(tracker):
+    return [car["model"] for car in tracker.displayData()]
+
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl", ".xlsx", ".parquet"])
+def test_export_round_trip(tracker, tmp_path, extension):
+    path = str(tmp_path / f"cars{extension}")
+    assert tracker.export(path) == len(CARS)
+    assert tracker.export(str(tmp_path / f"ferraris{extension}"), query={"manufacturer": "ferrari"}) == 2
+
+    target = CarTracker(str(tmp_path / "imported" / "car.json"))
+    if extension == ".jsonl":
+        with open(path) as f, open(str(tmp_path / "cars.json"), "w") as out:
+            json.dump([json.loads(line) for line in f], out)
+        path = str(tmp_path / "cars.json")
+    [result] = target.importMany([path], workers=1)
+    assert (result["imported"], result["error"]) == (len(CARS), None)
+    assert target.displayData() == tracker.displayData()
+
+
+def test_csv_export_has_a_header(tracker, tmp_path):
+    path = str(tmp_path / "cars.csv")
+    tracker.export(path)
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["model"] for row in rows] == ["Alpha", "Beta", "Gamma", "Delta"]
+
+
+def test_compressed_store(tracker, store):
+    path = tracker.setCompression("gzip")
+    assert path == store + ".gz" and not os.path.exists(store)
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    assert models(CarTracker(store)) == ["Alpha", "Beta", "Gamma", "Delta", "Epsilon"]
+    assert tracker.setCompression(None) == store
+    assert models(CarTracker(store)) == ["Alpha", "Beta", "Gamma", "Delta", "Epsilon"]
+
+
+def test_damaged_store_is_recovered(store, tmp_path):
+    tracker = CarTracker(store)
+    assert tracker.addData("Epsilon", "Ford", "1999", "USA", "Muscle", "", "")
+    text = open(store).read()
+    with open(store, "w") as f:
+        f.write(text[:text.index('"Gamma"')])
+
+    # Records before the damage are salvaged, the rest come from the previous generation
+    recovered = CarTracker(store)
+    assert sorted(models(recovered)) == ["Alpha", "Beta", "Delta", "Gamma"]
+    assert any(name.startswith("car.json.corrupt-") for name in os.listdir(tmp_path))
+
+
+def test_duplicates_are_found_and_merged(tracker):
+    assert tracker.addData("Alpha ", "Ferrari", "1960", "Italy", "", "Matchbox", "") is False
+    assert tracker.addData("Alpha GT", "Ferrari", "1960", "Italy", "Racing", "Matchbox", "")
+    clusters = tracker.findDuplicates(threshold=0.5)
+    assert [sorted(car["model"] for car in cluster["cars"]) for cluster in clusters] == [["Alpha", "Alpha GT"]]
+
+    assert tracker.mergeDuplicates(threshold=0.5) == {"clusters": 1, "removed": 1}
+    assert len(models(tracker)) == 4
+    assert tracker.undo() is not None
+    assert len(models(tracker)) == 5
+
+
+def test_photo_attachments(tracker, tmp_path):
+    image = str(tmp_path / "alpha.png")
+    Image.new("RGB", (800, 600), "red").save(image)
+    photo = tracker.addPhoto("Alpha", image)
+    assert photo and tracker.photos("Alpha") == [photo]
+    assert tracker.addPhoto("Alpha", image) == photo
+    assert tracker.photos("Alpha") == [photo]
+
+    thumbnail = tracker.photoThumbnail(photo)
+    assert thumbnail.startswith(b"\xff\xd8")
+    assert tracker.thumbnail(tracker.getCarById("a")["id"]) == thumbnail
+
+    assert tracker.deleteData("Alpha")
+    assert tracker.prunePhotos() == 1
+    assert tracker.removePhoto("Beta") == 0